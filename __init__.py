@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 """
-Loads models and wizards.
+Loads controllers, models and wizards.
 """
 
+from . import controllers
 from . import models
 from . import wizard
@@ -1,6 +1,6 @@
 {
     'name': "hr_hospital",
-    'version': '1.2',
+    'version': '1.3',
     'summary': "Hospital Management Module",
     'author': "Max Tyshchuk",
     'category': 'Productivity/Hospital',
@@ -8,22 +8,35 @@
         'base',
     ],
     'data': [
+        'security/hr_hospital_security.xml',
         'security/ir.model.access.csv',
         'data/disease_data.xml',
+        'data/ir_cron_data.xml',
+        'data/ir_config_parameter_data.xml',
+        'data/workload_data.xml',
         'views/doctor_speciality_view.xml',
         'views/contact_person_view.xml',
         'views/doctor_view.xml',
         'views/patient_view.xml',
         'views/disease_view.xml',
+        'views/disease_incidence_view.xml',
+        'views/allergen_view.xml',
         'views/patient_visit_view.xml',
+        'views/visit_feedback_view.xml',
+        'views/visit_revenue_view.xml',
+        'views/claim_batch_view.xml',
         'views/medical_diagnosis_view.xml',
         'views/patient_doctor_history_view.xml',
         'views/doctor_schedule_view.xml',
+        'views/hospital_job_view.xml',
+        'views/hospital_profile_log_view.xml',
+        'views/hospital_benchmark_result_view.xml',
         'wizard/mass_reassign_doctor_view.xml',
         'wizard/disease_report_wizard_view.xml',
         'wizard/reschedule_visit_wizard_view.xml',
         'wizard/doctor_schedule_wizard_view.xml',
         'wizard/patient_card_export_wizard_view.xml',
+        'wizard/doctor_archive_wizard_view.xml',
         'views/menu.xml',
 
     ],
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""Imports all controllers."""
+
+from . import main
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Defines the hr_hospital HTTP controllers."""
+
+import json
+
+from werkzeug.exceptions import Unauthorized
+
+from odoo import http
+from odoo.http import request
+
+from ..models.abstract_person import DERIVED_IMAGE_SIZES
+
+PERSON_MODELS = ('hr.hospital.doctor', 'hr.hospital.patient',
+                 'contact.person')
+IMAGE_FIELDS = ('image_1920',) + tuple(
+    name for name, _size in DERIVED_IMAGE_SIZES)
+
+
+class HospitalController(http.Controller):
+    """Routes used by the hr_hospital views."""
+
+    @http.route('/hr_hospital/image/<string:model>/<int:res_id>/<string:field>',
+                type='http', auth='user', methods=['GET'])
+    def person_image(self, model, res_id, field, **kwargs):
+        """
+        Serves a person photo. Deferred sizes that are not generated yet
+        are resized from image_1920 on the fly, without writing them; the
+        cron stores them. The URL carries a 'unique' key, so it is cached
+        as immutable.
+        """
+        if model not in PERSON_MODELS or field not in IMAGE_FIELDS:
+            raise request.not_found()
+        record = request.env[model].browse(res_id).exists()
+        if not record:
+            raise request.not_found()
+        record.check_access_rights('read')
+        record.check_access_rule('read')
+        size = dict(DERIVED_IMAGE_SIZES).get(field)
+        if record.image_pending and size:
+            stream = request.env['ir.binary']._get_image_stream_from(
+                record.sudo(), 'image_1920', width=size, height=size)
+        else:
+            stream = request.env['ir.binary']._get_image_stream_from(
+                record.sudo(), field)
+        return stream.get_response(immutable=bool(kwargs.get('unique')))
+
+    @http.route('/hr_hospital/ingest/visits', type='http', auth='public',
+                methods=['POST'], csrf=False)
+    def ingest_visits(self, **kwargs):
+        """
+        Bulk ingestion of visits with diagnoses. The body is NDJSON, one
+        visit per line (see hr.hospital.ingest); the response is NDJSON
+        with one result per non-empty input line, in the same order.
+
+        The caller authenticates with an API key in the Authorization
+        header ('Bearer <key>'), never with the session cookie, so a page
+        open in the user's browser cannot forge an ingest.
+        """
+        scheme, _sep, key = request.httprequest.headers.get(
+            'Authorization', '').partition(' ')
+        uid = scheme.lower() == 'bearer' and key and request.env[
+            'res.users.apikeys']._check_credentials(scope='rpc', key=key)
+        if not uid:
+            raise Unauthorized()
+        request.update_env(user=uid)
+        body = request.httprequest.get_data().decode('utf-8')
+        results = request.env['hr.hospital.ingest'].ingest_ndjson(body)
+        payload = '\n'.join(json.dumps(result, default=str)
+                            for result in results)
+        return request.make_response(payload, headers=[
+            ('Content-Type', 'application/x-ndjson')])
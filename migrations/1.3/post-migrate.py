@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Moves the stored visit days to the clinic timezone."""
+
+from odoo import api, tools, SUPERUSER_ID
+
+from odoo.addons.hr_hospital.models.hospital_archive import ARCHIVE_TABLES
+
+VISIT_TABLE = 'hr_hospital_patient_visit'
+
+
+def migrate(cr, version):
+    """
+    Recomputes visit_day, previously the UTC date, as the date in the
+    clinic timezone, in the archive too. Visits that would then fall on
+    the same day for one patient and doctor fail the upgrade on the
+    patient_doctor_day_uniq constraint instead of being merged silently.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    tz = env['hr.hospital.patient.visit']._get_visit_tz().zone
+    for table in (VISIT_TABLE, ARCHIVE_TABLES[VISIT_TABLE]):
+        if not tools.table_exists(cr, table):
+            continue
+        cr.execute(f"""
+            UPDATE {table}
+               SET visit_day = (visit_date AT TIME ZONE 'UTC'
+                                AT TIME ZONE %(tz)s)::date
+             WHERE visit_day IS DISTINCT FROM
+                   (visit_date AT TIME ZONE 'UTC' AT TIME ZONE %(tz)s)::date
+        """, {'tz': tz})
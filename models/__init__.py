@@ -3,13 +3,29 @@
 Imports all models in dependency order.
 """
 
+from . import hospital_profiler
+from . import hospital_cache
+from . import hospital_job
 from . import abstract_person
+from . import hospital_access
+from . import hospital_name_cache
 from . import doctor_speciality
 from . import disease
+from . import allergen
+from . import disease_incidence
 from . import contact_person
 from . import doctor
 from . import patient
 from . import medical_diagnosis
 from . import patient_visit
+from . import visit_feedback
+from . import visit_revenue
+from . import claim_batch
+from . import res_currency_rate
 from . import doctor_schedule
+from . import doctor_schedule_rule
 from . import patient_doctor_history
+from . import hospital_benchmark
+from . import hospital_archive
+from . import hospital_content
+from . import hospital_ingest
@@ -1,11 +1,36 @@
 # -*- coding: utf-8 -*-
 """Defines the Abstract Person model."""
 
+import base64
+import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from odoo import models, fields, api, _
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
 
+_logger = logging.getLogger(__name__)
+
+# Похідні розміри фото, що генеруються з image_1920
+DERIVED_IMAGE_SIZES = [
+    ('image_1024', 1024),
+    ('image_512', 512),
+    ('image_256', 256),
+    ('image_128', 128),
+]
+IMAGE_WORKERS = 4
+
+
+def _resize_image(image_b64):
+    """Builds all derived sizes of one image; safe to run in a thread."""
+    source = base64.b64decode(image_b64)
+    return {
+        field_name: base64.b64encode(
+            tools.image_process(source, size=(size, size)))
+        for field_name, size in DERIVED_IMAGE_SIZES
+    }
+
 
 class AbstractPerson(models.AbstractModel):
     """Abstract model for a person."""
@@ -13,6 +38,18 @@ class AbstractPerson(models.AbstractModel):
     _description = 'Abstract Person'
     _inherit = ['image.mixin']
 
+    # Похідні розміри не пов'язані з image_1920 (related), а заповнюються
+    # явно: одразу при звичайному записі або пізніше - при імпорті.
+    image_1024 = fields.Image("Image 1024", max_width=1024, max_height=1024)
+    image_512 = fields.Image("Image 512", max_width=512, max_height=512)
+    image_256 = fields.Image("Image 256", max_width=256, max_height=256)
+    image_128 = fields.Image("Image 128", max_width=128, max_height=128)
+    image_pending = fields.Boolean(
+        readonly=True,
+        copy=False,
+        help="Похідні розміри фото ще не згенеровані."
+    )
+
     first_name = fields.Char(required=True)
     last_name = fields.Char(required=True)
     middle_name = fields.Char()
@@ -44,13 +81,89 @@ class AbstractPerson(models.AbstractModel):
     )
     country_id = fields.Many2one(
         comodel_name='res.country',
-        string='Country of Citizenship'
+        string='Country of Citizenship',
+        index=True
     )
     language_id = fields.Many2one(
         comodel_name='res.lang',
-        string='Communication Language'
+        string='Communication Language',
+        index=True
     )
 
+    def init(self):
+        """Partial index for the deferred image batch."""
+        if self._abstract:
+            return
+        tools.create_index(
+            self._cr, f'{self._table}_image_pending_idx', self._table,
+            ['id'], where='image_pending'
+        )
+
+    def _defer_images(self):
+        return self.env.context.get('import_file') or \
+            self.env.context.get('hr_hospital_defer_images')
+
+    def _prepare_image_vals(self, vals):
+        """
+        Returns a copy of vals with the derived sizes filled from
+        image_1920, or only flagged as pending during imports so the
+        resizing happens later.
+        """
+        if 'image_1920' not in vals:
+            return vals
+        vals = dict(vals)
+        image = vals['image_1920']
+        if image and self._defer_images():
+            vals.update({name: False for name, _size in DERIVED_IMAGE_SIZES})
+            vals['image_pending'] = True
+        else:
+            vals.update({name: image for name, _size in DERIVED_IMAGE_SIZES})
+            vals['image_pending'] = False
+        return vals
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Overrides create to defer derived image sizes on import."""
+        return super().create(
+            [self._prepare_image_vals(vals) for vals in vals_list])
+
+    def write(self, vals):
+        """Overrides write to defer derived image sizes on import."""
+        return super().write(self._prepare_image_vals(vals))
+
+    def _generate_pending_images(self, workers=IMAGE_WORKERS):
+        """
+        Generates derived sizes of pending records. Resizing runs in a
+        thread pool; the ORM writes stay in the calling thread.
+        """
+        records = self.filtered('image_pending')
+        if not records:
+            return 0
+        images = [record.image_1920 for record in records]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            resized = list(pool.map(
+                lambda image: _resize_image(image) if image else {}, images))
+        for record, vals in zip(records, resized):
+            record.write({**vals, 'image_pending': False})
+        return len(records)
+
+    @api.model
+    def _cron_generate_pending_images(self, batch_size=200):
+        """Cron: generates deferred image sizes for all person models."""
+        for model_name in ('hr.hospital.doctor', 'hr.hospital.patient',
+                           'contact.person'):
+            model = self.env[model_name]
+            while True:
+                records = model.search([('image_pending', '=', True)],
+                                       limit=batch_size)
+                if not records:
+                    break
+                count = records._generate_pending_images()
+                _logger.info("Generated deferred images for %s %s records",
+                             count, model_name)
+                if len(records) < batch_size:
+                    break
+
     @api.depends('birthday')
     def _compute_age(self):
         """Computes the age based on birthday."""
@@ -85,23 +198,30 @@ class AbstractPerson(models.AbstractModel):
                                              record.phone):
                 raise ValidationError(_("Invalid phone number format."))
 
+    @api.model
+    @tools.ormcache()
+    def _get_country_lang_map(self):
+        """
+        Returns {country code: res.lang id} for active languages.
+        Cached in the registry; res.lang create/write clear the caches.
+        """
+        by_region = {}
+        by_code = {}
+        for lang in self.env['res.lang'].sudo().search_read(
+                [('active', '=', True)], ['code']):
+            code = lang['code']
+            if '_' in code:
+                by_region.setdefault(code.rsplit('_', 1)[1].upper(),
+                                     lang['id'])
+            else:
+                by_code.setdefault(code.upper(), lang['id'])
+        return {**by_code, **by_region}
+
     @api.onchange('country_id')
     def _onchange_country_set_lang(self):
         """Suggests the country's language when citizenship is changed."""
         if self.country_id and self.country_id.code:
-            lang_code_like = f'%_{self.country_id.code}'
-            lang = self.env['res.lang'].search([
-                ('code', 'ilike', lang_code_like),
-                ('active', '=', True)
-            ], limit=1)
-
-            if not lang:
-                lang_code_short = self.country_id.code.lower()
-                lang = self.env['res.lang'].search([
-                    ('code', '=', lang_code_short),
-                    ('active', '=', True)
-                ], limit=1)
-
-            self.language_id = lang.id if lang else False
+            self.language_id = self._get_country_lang_map().get(
+                self.country_id.code.upper(), False)
         else:
-            self.language_id = False
\ No newline at end of file
+            self.language_id = False
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Defines the Allergen catalogue and the treatment text matcher."""
+
+import html
+import re
+from collections import deque
+
+from odoo import models, fields, api, tools
+
+CATALOGUE_VERSION_PARAM = 'hr_hospital.allergen_catalogue_version'
+
+_TAG_RE = re.compile(r'<[^>]*>')
+_KEYWORD_SPLIT_RE = re.compile(r'[,;\n]+')
+
+
+def normalize_text(value):
+    """Strips HTML tags and entities and folds the case of the text."""
+    if not value:
+        return ''
+    return html.unescape(_TAG_RE.sub(' ', value)).casefold()
+
+
+class AllergenMatcher:
+    """
+    Aho-Corasick automaton over the allergen keywords.
+
+    Finds every keyword in a single pass over the text regardless of the
+    catalogue size; matches inside longer words are ignored.
+    """
+
+    def __init__(self, keywords):
+        """keywords: iterable of (keyword, allergen_id) pairs."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for keyword, allergen_id in keywords:
+            self._add(keyword, allergen_id)
+        self._build()
+
+    def __bool__(self):
+        return len(self._goto) > 1
+
+    def _add(self, keyword, allergen_id):
+        node = 0
+        for char in keyword:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(keyword), allergen_id))
+
+    def _build(self):
+        """Breadth-first computation of the failure links."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """Returns the set of allergen ids mentioned in normalised text."""
+        found = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length, allergen_id in out[node]:
+                if allergen_id in found:
+                    continue
+                start = end - length + 1
+                if (start == 0 or not text[start - 1].isalnum()) and \
+                        (end + 1 == len(text) or not text[end + 1].isalnum()):
+                    found.add(allergen_id)
+        return found
+
+
+class Allergen(models.Model):
+    """Catalogue of allergens with the keywords used for screening."""
+    _name = 'hr.hospital.allergen'
+    _description = 'Allergen'
+    _order = 'name'
+
+    name = fields.Char(required=True)
+    keywords = fields.Text(
+        help="Назви препаратів і синонімів через кому або з нового рядка."
+    )
+    active = fields.Boolean(default=True)
+
+    _sql_constraints = [
+        ('name_uniq', 'unique(name)', 'Allergen name must be unique!')
+    ]
+
+    def _get_keywords(self):
+        """Yields (normalised keyword, allergen id) for the matcher."""
+        for allergen in self:
+            terms = {allergen.name}
+            terms.update(_KEYWORD_SPLIT_RE.split(allergen.keywords or ''))
+            for term in terms:
+                term = normalize_text(term).strip()
+                if term:
+                    yield term, allergen.id
+
+    @api.model
+    def _get_catalogue_version(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            CATALOGUE_VERSION_PARAM, 1))
+
+    @api.model
+    def _bump_catalogue_version(self):
+        """
+        Marks every screened treatment as stale; the matcher is cached per
+        version, so the old one is simply no longer used.
+        """
+        self.env['ir.config_parameter'].sudo().set_param(
+            CATALOGUE_VERSION_PARAM, self._get_catalogue_version() + 1)
+
+    @api.model
+    @tools.ormcache('version')
+    def _get_matcher(self, version):
+        """Precompiled matcher, built once per catalogue version."""
+        return AllergenMatcher(self.sudo().search([])._get_keywords())
+
+    @api.model
+    def get_matcher(self):
+        return self._get_matcher(self._get_catalogue_version())
+
+    @api.model_create_multi
+    def create(self, vals_list):  # Override
+        records = super().create(vals_list)
+        self._bump_catalogue_version()
+        return records
+
+    def write(self, vals):  # Override
+        result = super().write(vals)
+        if {'name', 'keywords', 'active'} & set(vals):
+            self._bump_catalogue_version()
+        return result
+
+    def unlink(self):  # Override
+        result = super().unlink()
+        self._bump_catalogue_version()
+        return result
+
+    def action_rescreen_treatments(self):
+        """Re-screens all open treatments against the current catalogue."""
+        self.env['medical.diagnosis']._cron_rescreen_allergies()
+        return True
@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""Defines the Insurance Claim Batch model."""
+
+import csv
+import io
+import json
+import logging
+import tempfile
+import threading
+
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+CLAIM_CHUNK_SIZE = 2000
+CLAIM_CSV_HEADER = [
+    'VisitId', 'VisitDate', 'Patient', 'PolicyNumber', 'Doctor',
+    'VisitType', 'Cost', 'Currency', 'ICD10', 'Diagnoses',
+]
+
+
+class ClaimBatch(models.Model):
+    """
+    Batch of completed visits billed to one insurer. Visits are reserved
+    for the batch with one UPDATE, so a crashed export is simply re-run
+    for the same visits and nothing is billed twice.
+    """
+    _name = 'hr.hospital.claim.batch'
+    _description = 'Insurance Claim Batch'
+    _order = 'id desc'
+
+    name = fields.Char(required=True, readonly=True,
+                       default=lambda self: _('New'))
+    insurer_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Insurer',
+        required=True,
+        readonly=True
+    )
+    state = fields.Selection(
+        selection=[
+            ('reserved', 'Зарезервовано'),
+            ('done', 'Експортовано'),
+        ],
+        default='reserved',
+        required=True,
+        readonly=True
+    )
+    export_format = fields.Selection(
+        selection=[('csv', 'CSV'), ('jsonl', 'JSONL')],
+        default='csv',
+        required=True,
+        readonly=True
+    )
+    visit_ids = fields.One2many(
+        comodel_name='hr.hospital.patient.visit',
+        inverse_name='claim_batch_id',
+        string='Visits',
+        readonly=True
+    )
+    visit_count = fields.Integer(readonly=True)
+    file_name = fields.Char(readonly=True)
+    file_data = fields.Binary(readonly=True, attachment=True)
+    date_done = fields.Datetime(readonly=True)
+
+    @api.model
+    def _get_pending_insurers(self):
+        """Insurers that have completed visits not billed yet."""
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT DISTINCT p.insurance_partner_id
+              FROM hr_hospital_patient_visit v
+              JOIN hr_hospital_patient p ON p.id = v.patient_id
+             WHERE v.status = 'completed' AND v.claim_batch_id IS NULL
+               AND p.insurance_partner_id IS NOT NULL
+        """)
+        return self.env['res.partner'].browse(
+            [row[0] for row in self.env.cr.fetchall()])
+
+    def _reserve_visits(self):
+        """Assigns all unbilled completed visits of the insurer at once."""
+        self.ensure_one()
+        self.env.cr.execute("""
+            UPDATE hr_hospital_patient_visit v
+               SET claim_batch_id = %(batch)s
+              FROM hr_hospital_patient p
+             WHERE p.id = v.patient_id
+               AND p.insurance_partner_id = %(insurer)s
+               AND v.status = 'completed' AND v.claim_batch_id IS NULL
+        """, {'batch': self.id, 'insurer': self.insurer_id.id})
+        self.env['hr.hospital.patient.visit'].invalidate_model(
+            ['claim_batch_id'])
+        self.visit_count = self.env.cr.rowcount
+        return self.visit_count
+
+    def _iter_claim_rows(self):
+        """Yields the batch's visits with diagnoses, chunk by chunk."""
+        self.ensure_one()
+        last_id = 0
+        lang = self.env.lang or 'en_US'
+        disease_env = self.env['hr.hospital.disease']
+        while True:
+            self.env.cr.execute("""
+                SELECT v.id, v.visit_date, v.visit_type, v.cost,
+                       cur.name AS currency, p.full_name AS patient,
+                       p.insurance_policy_number AS policy_number,
+                       doc.full_name AS doctor,
+                       (SELECT json_agg(json_build_object(
+                                'code', dis.code_icd10,
+                                'disease', d.disease_id,
+                                'severity', d.severity) ORDER BY d.id)
+                          FROM medical_diagnosis d
+                          LEFT JOIN hr_hospital_disease dis
+                                 ON dis.id = d.disease_id
+                         WHERE d.visit_id = v.id) AS diagnoses
+                  FROM hr_hospital_patient_visit v
+                  JOIN hr_hospital_patient p ON p.id = v.patient_id
+                  JOIN hr_hospital_doctor doc ON doc.id = v.doctor_id
+                  LEFT JOIN res_currency cur ON cur.id = v.currency_id
+                 WHERE v.claim_batch_id = %(batch)s AND v.id > %(last)s
+                 ORDER BY v.id
+                 LIMIT %(limit)s
+            """, {'batch': self.id, 'last': last_id,
+                  'limit': CLAIM_CHUNK_SIZE})
+            rows = self.env.cr.dictfetchall()
+            if not rows:
+                return
+            # Назви хвороб з кешу перекладів замість розбору jsonb у рядках
+            names = disease_env.get_translated_names(
+                {diag['disease'] for row in rows
+                 for diag in row['diagnoses'] or []}, lang)
+            for row in rows:
+                for diag in row['diagnoses'] or []:
+                    diag['disease'] = names.get(diag['disease'])
+            yield from rows
+            last_id = rows[-1]['id']
+
+    def _write_claim_file(self, stream):
+        """
+        Writes the batch into a binary stream as CSV or JSONL, chunk by
+        chunk, so the rows are never built up in memory.
+        """
+        self.ensure_one()
+        output = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        if self.export_format == 'csv':
+            writer = csv.writer(output)
+            writer.writerow(CLAIM_CSV_HEADER)
+            for row in self._iter_claim_rows():
+                diagnoses = row['diagnoses'] or []
+                writer.writerow([
+                    row['id'], row['visit_date'], row['patient'],
+                    row['policy_number'] or '', row['doctor'],
+                    row['visit_type'], row['cost'] or 0, row['currency'],
+                    ';'.join(d['code'] or '' for d in diagnoses),
+                    ';'.join(d['disease'] or '' for d in diagnoses),
+                ])
+        else:
+            for row in self._iter_claim_rows():
+                output.write(json.dumps(row, ensure_ascii=False,
+                                        default=str))
+                output.write('\n')
+        output.flush()
+        output.detach()
+
+    def _store_claim_file(self, file_name, raw):
+        """Replaces the batch's file attachment, without base64 encoding."""
+        self.ensure_one()
+        attachment_env = self.env['ir.attachment'].sudo()
+        attachment_env.search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file_data'),
+            ('res_id', '=', self.id),
+        ]).unlink()
+        attachment_env.create({
+            'name': file_name,
+            'res_model': self._name,
+            'res_field': 'file_data',
+            'res_id': self.id,
+            'raw': raw,
+        })
+        self.invalidate_recordset(['file_data'])
+
+    def action_export(self):
+        """(Re)generates the files of reserved batches."""
+        for batch in self.filtered(lambda b: b.state == 'reserved'):
+            file_name = f"claims_{batch.insurer_id.id}_{batch.id}." \
+                        f"{batch.export_format}"
+            # Рядки пишуться у тимчасовий файл, а не в пам'ять
+            with tempfile.TemporaryFile() as stream:
+                batch._write_claim_file(stream)
+                stream.seek(0)
+                batch._store_claim_file(file_name, stream.read())
+            batch.write({
+                'file_name': file_name,
+                'state': 'done',
+                'date_done': fields.Datetime.now(),
+            })
+            _logger.info("Exported claim batch %s: %s visits",
+                         batch.id, batch.visit_count)
+        return True
+
+    @api.model
+    def _run_export(self, export_format='csv', auto_commit=False):
+        """
+        Creates one batch per insurer with unbilled visits and exports it.
+        Batches left 'reserved' by an interrupted run are exported first.
+        With auto_commit, each reservation and export is committed
+        separately, so a crash never loses or duplicates claims.
+        """
+        def commit():
+            if auto_commit:
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+
+        leftovers = self.search([('state', '=', 'reserved')])
+        leftovers.action_export()
+        commit()
+
+        batches = self.browse()
+        for insurer in self._get_pending_insurers():
+            batch = self.create({
+                'name': f"{insurer.display_name} "
+                        f"{fields.Date.context_today(self)}",
+                'insurer_id': insurer.id,
+                'export_format': export_format,
+            })
+            if not batch._reserve_visits():
+                batch.unlink()
+                continue
+            commit()
+            batch.action_export()
+            commit()
+            batches |= batch
+        return leftovers | batches
+
+    @api.model
+    def _cron_export_claims(self):
+        """Cron: exports claims of all insurers."""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        self._run_export(auto_commit=auto_commit)
+
+    @api.model
+    def action_create_batches(self, export_format='csv'):
+        """Button: exports claims of all insurers and shows the batches."""
+        batches = self._run_export(export_format)
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Claim Batches'),
+            'res_model': self._name,
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', batches.ids)],
+        }
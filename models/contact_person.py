@@ -14,6 +14,7 @@ class ContactPerson(models.Model):
     patient_id = fields.Many2one(
         comodel_name='hr.hospital.patient',
         string='Related Patient (with Allergies)',
-        domain="[('allergies', '!=', False)]",
+        domain="['|', ('allergies', '!=', False), "
+               "('allergen_ids', '!=', False)]",
         help="Показує лише пацієнтів із заповненим полем 'Алергії'."
     )
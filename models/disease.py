@@ -9,6 +9,7 @@ class Disease(models.Model):
     Defines the Disease model for storing disease records.
     """
     _name = 'hr.hospital.disease'
+    _inherit = ['hr.hospital.name.cache.mixin']
     _description = 'Disease'
     _rec_name = 'name'
 
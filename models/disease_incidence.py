@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Defines the Disease Incidence time-series model."""
+
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+from .hospital_archive import with_archive
+
+OUTBREAK_THRESHOLD = 10
+
+
+class DiseaseIncidence(models.Model):
+    """
+    Daily number of diagnosed cases per disease and patient country.
+    Maintained incrementally from 'medical.diagnosis'.
+    """
+    _name = 'hr.hospital.disease.incidence'
+    _description = 'Disease Incidence'
+    _order = 'date desc'
+    _log_access = False
+
+    disease_id = fields.Many2one(
+        comodel_name='hr.hospital.disease',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+    country_id = fields.Many2one(
+        comodel_name='res.country',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+    date = fields.Date(required=True, readonly=True, index=True)
+    case_count = fields.Integer(readonly=True, group_operator='sum')
+
+    _sql_constraints = [  # Валідатор SQL
+        ('disease_country_date_uniq',
+         'unique(disease_id, country_id, date)',
+         'Incidence row must be unique per disease, country and day!'),
+    ]
+
+    @api.model
+    def _add_cases(self, deltas):
+        """Upserts {(disease_id, country_id, date): delta} in one query."""
+        deltas = {key: delta for key, delta in deltas.items()
+                  if all(key) and delta}
+        if not deltas:
+            return
+        disease_ids, country_ids, dates = zip(*deltas)
+        self.env.cr.execute("""
+            INSERT INTO hr_hospital_disease_incidence
+                        (disease_id, country_id, date, case_count)
+            SELECT * FROM unnest(%s::int[], %s::int[], %s::date[], %s::int[])
+            ON CONFLICT (disease_id, country_id, date) DO UPDATE
+               SET case_count = hr_hospital_disease_incidence.case_count
+                              + EXCLUDED.case_count
+        """, [list(disease_ids), list(country_ids), list(dates),
+              list(deltas.values())])
+        self.invalidate_model(['case_count'])
+
+    @api.model
+    def action_rebuild(self):
+        """Rebuilds the whole table from diagnoses, archived included."""
+        self.env.flush_all()
+        diagnoses = with_archive('medical_diagnosis', ['visit_id',
+                                                       'disease_id'])
+        visits = with_archive('hr_hospital_patient_visit', [
+            'id', 'patient_id', 'visit_date'])
+        self.env.cr.execute(f"""
+            DELETE FROM hr_hospital_disease_incidence;
+            INSERT INTO hr_hospital_disease_incidence
+                        (disease_id, country_id, date, case_count)
+            SELECT d.disease_id, p.country_id, v.visit_date::date, count(*)
+              FROM {diagnoses} d
+              JOIN {visits} v ON v.id = d.visit_id
+              JOIN hr_hospital_patient p ON p.id = v.patient_id
+             WHERE d.disease_id IS NOT NULL AND p.country_id IS NOT NULL
+             GROUP BY d.disease_id, p.country_id, v.visit_date::date
+        """)
+        self.invalidate_model()
+        return True
+
+    @api.model
+    def get_incidence(self, days=7, disease_ids=None):
+        """
+        Rolling incidence over the last 'days' days:
+        [{'disease_id', 'country_id', 'cases'}, ...].
+        """
+        date_from = fields.Date.context_today(self) - timedelta(days=days - 1)
+        domain = [('date', '>=', date_from)]
+        if disease_ids:
+            domain.append(('disease_id', 'in', disease_ids))
+        groups = self.read_group(
+            domain, ['case_count'], ['disease_id', 'country_id'],
+            lazy=False)
+        return [{
+            'disease_id': group['disease_id'][0],
+            'country_id': group['country_id'][0],
+            'cases': group['case_count'],
+        } for group in groups if group['case_count'] > 0]
+
+    @api.model
+    def get_outbreak_alerts(self, days=7, threshold=None):
+        """
+        Countries where a contagious high/critical disease reached the
+        threshold within 'days' days. 'known_region' tells whether the
+        country is already listed in the disease's spread regions.
+        """
+        if threshold is None:
+            threshold = int(self.env['ir.config_parameter'].sudo().get_param(
+                'hr_hospital.outbreak_threshold', OUTBREAK_THRESHOLD))
+        diseases = self.env['hr.hospital.disease'].search([
+            ('is_contagious', '=', True),
+            ('danger_level', 'in', ['high', 'critical']),
+        ])
+        if not diseases:
+            return []
+        alerts = []
+        for row in self.get_incidence(days, disease_ids=diseases.ids):
+            if row['cases'] < threshold:
+                continue
+            disease = diseases.browse(row['disease_id'])
+            alerts.append({
+                **row,
+                'danger_level': disease.danger_level,
+                'known_region':
+                    row['country_id'] in disease.spread_region_ids.ids,
+            })
+        return sorted(alerts, key=lambda alert: -alert['cases'])
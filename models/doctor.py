@@ -1,9 +1,24 @@
 # -*- coding: utf-8 -*-
 """This file defines the Doctor model."""
 
-from odoo import models, fields, api, _
+import heapq
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError, UserError
 
+from .doctor_schedule_rule import WEEKDAY_FIELDS
+from .hospital_archive import with_archive
+from .visit_feedback import RATING_EPOCH
+
+# Поля, зміна яких робить знімок довідника лікарів застарілим
+DIRECTORY_FIELDS = {
+    'first_name', 'last_name', 'middle_name', 'is_intern', 'rating',
+    'license_date', 'phone', 'email', 'specialty_id', 'mentor_id',
+    'active',
+}
+# Поля імені лікаря, яке показують хронології пацієнтів
+NAME_FIELDS = {'first_name', 'last_name', 'middle_name'}
+
 
 class Doctor(models.Model):
     """Model for storing doctor records."""
@@ -22,20 +37,35 @@ class Doctor(models.Model):
     mentor_id = fields.Many2one(
         comodel_name='hr.hospital.doctor',
         string='Mentor',
-        domain="[('is_intern', '=', False)]"
+        domain="[('is_intern', '=', False)]",
+        index='btree_not_null'
     )
     license_number = fields.Char(required=True, copy=False)
+    active = fields.Boolean(default=True)
     license_date = fields.Date()
     experience_years = fields.Integer(
         compute='_compute_experience_years',
         string='Experience (Years)'
     )
     rating = fields.Float(digits=(3, 2))
+    # Поточні суми відгуків: рейтинг = сума оцінок / сума ваг
+    rating_score_sum = fields.Float(readonly=True, copy=False)
+    rating_weight_sum = fields.Float(readonly=True, copy=False)
+    rating_count = fields.Integer(
+        string='Feedback Count',
+        readonly=True,
+        copy=False
+    )
     schedule_ids = fields.One2many(
         comodel_name='doctor.schedule',
         inverse_name='doctor_id',
         string='Work Schedule'
     )
+    schedule_rule_ids = fields.One2many(
+        comodel_name='doctor.schedule.rule',
+        inverse_name='doctor_id',
+        string='Schedule Rules'
+    )
     study_country_id = fields.Many2one(
         comodel_name='res.country',
         string='Country of Study')
@@ -46,6 +76,21 @@ class Doctor(models.Model):
         string='Interns'
     )
 
+    # Навантаження: оновлюються інкрементально з пацієнтів та візитів
+    panel_size = fields.Integer(
+        string='Patients',
+        default=0,
+        readonly=True,
+        copy=False,
+        help="Кількість пацієнтів, для яких лікар є персональним."
+    )
+    upcoming_visit_count = fields.Integer(
+        string='Planned Visits',
+        default=0,
+        readonly=True,
+        copy=False
+    )
+
     _sql_constraints = [  # Валідатор SQL
         ('license_number_uniq',
          'unique(license_number)',
@@ -55,6 +100,30 @@ class Doctor(models.Model):
          'Rating must be between 0.00 and 5.00.'),
     ]
 
+    def init(self):
+        """Indexes for the least-loaded and the top-rated doctor lookups."""
+        super().init()
+        # Лічильники лікарів, створених до появи default, рахуємо як 0:
+        # NULL сортувався б останнім і такий лікар ніколи не був би обраний
+        self._cr.execute("""
+            UPDATE hr_hospital_doctor
+               SET panel_size = COALESCE(panel_size, 0),
+                   upcoming_visit_count = COALESCE(upcoming_visit_count, 0)
+             WHERE panel_size IS NULL OR upcoming_visit_count IS NULL
+        """)
+        # Попередній індекс не враховував архівованих лікарів
+        self._cr.execute(
+            "DROP INDEX IF EXISTS hr_hospital_doctor_workload_idx")
+        tools.create_index(
+            self._cr, 'hr_hospital_doctor_active_workload_idx', self._table,
+            ['specialty_id', 'panel_size', 'upcoming_visit_count'],
+            where="active AND is_intern IS NOT TRUE"
+        )
+        tools.create_index(
+            self._cr, 'hr_hospital_doctor_specialty_rating_idx', self._table,
+            ['specialty_id', 'rating DESC NULLS LAST', 'id']
+        )
+
     @api.constrains('is_intern', 'mentor_id')  # Валідатор Python
     def _check_mentor_is_not_intern(self):
         """Validator: An intern cannot be selected as a mentor."""
@@ -88,22 +157,232 @@ class Doctor(models.Model):
     @api.depends('full_name', 'specialty_id.name')
     def _compute_display_name(self):
         """Computes the display name to show 'Name (Speciality)'."""
+        specialities = self.env['doctor.speciality'].get_translated_names(
+            self.specialty_id.ids)
         for record in self:
             name = record.full_name
             if record.specialty_id:
-                name = f"{name} ({record.specialty_id.name})"
+                specialty = specialities.get(record.specialty_id.id) or \
+                    record.specialty_id.name
+                name = f"{name} ({specialty})"
             record.display_name = name
 
+    @api.model
+    def _adjust_workload(self, field_name, deltas):
+        """
+        Atomically adds {doctor_id: delta} to a workload counter
+        with a single UPDATE, so concurrent writers don't lose updates.
+        """
+        deltas = {doctor_id: delta for doctor_id, delta in deltas.items()
+                  if doctor_id and delta}
+        if not deltas:
+            return
+        assert field_name in ('panel_size', 'upcoming_visit_count')
+        self.env.cr.execute(f"""
+            UPDATE hr_hospital_doctor d
+               SET {field_name} = COALESCE(d.{field_name}, 0) + v.delta
+              FROM unnest(%s::int[], %s::int[]) AS v(id, delta)
+             WHERE d.id = v.id
+        """, [list(deltas), list(deltas.values())])
+        self.browse(list(deltas)).invalidate_recordset([field_name])
+
+    @api.model
+    def _adjust_rating(self, deltas):
+        """
+        Atomically adds {doctor_id: [score sum, weight sum, count]} of
+        feedback to the running sums and derives the rating from them in
+        the same UPDATE. Doctors without feedback keep their rating.
+        """
+        deltas = {doctor_id: delta for doctor_id, delta in deltas.items()
+                  if doctor_id and any(delta)}
+        if not deltas:
+            return
+        # Усі вирази від d.*, щоб паралельні оновлення не губилися
+        count = "COALESCE(d.rating_count, 0) + v.count"
+        score_sum = "COALESCE(d.rating_score_sum, 0) + v.score"
+        weight_sum = "COALESCE(d.rating_weight_sum, 0) + v.weight"
+        self.env.cr.execute(f"""
+            UPDATE hr_hospital_doctor d
+               SET rating_count = {count},
+                   rating_score_sum = CASE WHEN {count} > 0
+                       THEN {score_sum} ELSE 0 END,
+                   rating_weight_sum = CASE WHEN {count} > 0
+                       THEN {weight_sum} ELSE 0 END,
+                   rating = CASE WHEN {count} > 0 AND {weight_sum} > 0
+                       THEN LEAST(GREATEST(round(
+                           (({score_sum}) / ({weight_sum}))::numeric, 2), 0), 5)
+                       ELSE d.rating END
+              FROM unnest(%s::int[], %s::float8[], %s::float8[], %s::int[])
+                       AS v(id, score, weight, count)
+             WHERE d.id = v.id
+        """, [list(deltas)] + [[delta[index] for delta in deltas.values()]
+                               for index in range(3)])
+        self.browse(list(deltas)).invalidate_recordset(
+            ['rating', 'rating_score_sum', 'rating_weight_sum',
+             'rating_count'])
+        # Рейтинг входить до знімка довідника лікарів
+        self.env['hr.hospital.cache.version'].bump('doctor_directory')
+
+    @api.model
+    def action_recompute_rating(self):
+        """
+        Rebuilds the running sums and ratings of all doctors from the
+        feedback, archived feedback included (backfill, decay change).
+        """
+        feedback_env = self.env['hr.hospital.visit.feedback']
+        feedback_env.flush_model()
+        half_life = feedback_env._get_half_life_days()
+        feedbacks = with_archive('hr_hospital_visit_feedback',
+                                 ['doctor_id', 'score', 'feedback_date'])
+        weight = "power(2, extract(epoch FROM f.feedback_date - %(epoch)s)" \
+            " / (%(half_life)s * 86400))" if half_life else "1.0"
+        self.env.cr.execute(f"""
+            WITH sums AS (
+                SELECT f.doctor_id, sum(f.score * {weight}) AS score_sum,
+                       sum({weight}) AS weight_sum, count(*) AS count
+                  FROM {feedbacks} f
+                 WHERE f.doctor_id IS NOT NULL
+                 GROUP BY f.doctor_id
+            )
+            UPDATE hr_hospital_doctor d
+               SET rating_score_sum = COALESCE(s.score_sum, 0),
+                   rating_weight_sum = COALESCE(s.weight_sum, 0),
+                   rating_count = COALESCE(s.count, 0),
+                   rating = CASE WHEN s.weight_sum > 0
+                       THEN LEAST(GREATEST(round((s.score_sum / s.weight_sum)
+                                                 ::numeric, 2), 0), 5)
+                       ELSE d.rating END
+              FROM hr_hospital_doctor d2
+              LEFT JOIN sums s ON s.doctor_id = d2.id
+             WHERE d2.id = d.id
+        """, {'epoch': RATING_EPOCH, 'half_life': half_life})
+        self.invalidate_model(['rating', 'rating_score_sum',
+                               'rating_weight_sum', 'rating_count'])
+        self.env['hr.hospital.cache.version'].bump('doctor_directory')
+        return True
+
+    @api.model
+    def get_top_rated(self, specialty_id, limit=10):
+        """Best rated non-intern doctors of a speciality (indexed)."""
+        return self.search(
+            [('specialty_id', '=', specialty_id), ('is_intern', '=', False)],
+            order='rating desc nulls last, id', limit=limit)
+
+    @api.model
+    def action_recompute_workload(self):
+        """Recomputes all workload counters from scratch (backfill)."""
+        self.env['hr.hospital.patient'].flush_model(['personal_doctor_id'])
+        self.env['hr.hospital.patient.visit'].flush_model(
+            ['doctor_id', 'status'])
+        self.env.cr.execute("""
+            UPDATE hr_hospital_doctor d
+               SET panel_size = (
+                    SELECT count(*) FROM hr_hospital_patient p
+                     WHERE p.personal_doctor_id = d.id),
+                   upcoming_visit_count = (
+                    SELECT count(*) FROM hr_hospital_patient_visit v
+                     WHERE v.doctor_id = d.id AND v.status = 'planned')
+        """)
+        self.invalidate_model(['panel_size', 'upcoming_visit_count'])
+        return True
+
+    @api.model
+    def _find_least_loaded(self, specialty_id=None, language_id=None,
+                           exclude_ids=None, limit=1):
+        """
+        Returns up to 'limit' eligible active non-intern doctors, the
+        smallest panels first, read in one query from the workload index.
+        """
+        self.check_access_rights('read')
+        self.flush_model(['active', 'is_intern', 'specialty_id', 'language_id',
+                          'panel_size', 'upcoming_visit_count'])
+        # Умова збігається з предикатом індексу навантаження
+        where = ["active", "is_intern IS NOT TRUE"]
+        params = []
+        if specialty_id:
+            where.append("specialty_id = %s")
+            params.append(specialty_id)
+        if language_id:
+            where.append("language_id = %s")
+            params.append(language_id)
+        if exclude_ids:
+            where.append("id != ALL(%s)")
+            params.append(list(exclude_ids))
+        self.env.cr.execute(f"""
+            SELECT id FROM hr_hospital_doctor
+             WHERE {' AND '.join(where)}
+             ORDER BY panel_size, upcoming_visit_count, id
+             LIMIT %s
+        """, params + [limit])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _distribute_patients(self, patients):
+        """
+        Spreads patients over these doctors, least-loaded first.
+        Returns {doctor: patients}; uses a heap keyed on panel size.
+        Only the len(patients) least-loaded doctors can receive any, so
+        callers fetch just those with _find_least_loaded().
+        """
+        heap = [(doctor.panel_size, doctor.upcoming_visit_count, doctor.id)
+                for doctor in self]
+        heapq.heapify(heap)
+        assignment = {}
+        for patient in patients:
+            panel_size, visit_count, doctor_id = heapq.heappop(heap)
+            assignment.setdefault(doctor_id, []).append(patient.id)
+            heapq.heappush(heap, (panel_size + 1, visit_count, doctor_id))
+        return {
+            self.browse(doctor_id): patients.browse(patient_ids)
+            for doctor_id, patient_ids in assignment.items()
+        }
+
+    def _get_doctors_with_planned_visits(self):
+        """
+        Returns the subset of doctors that still have planned visits.
+        Uses an EXISTS probe per doctor, backed by a partial index.
+        """
+        if not self.ids:
+            return self.browse()
+        self.env['hr.hospital.patient.visit'].flush_model(
+            ['doctor_id', 'status'])
+        self.env.cr.execute("""
+            SELECT d.id
+              FROM unnest(%s) AS d(id)
+             WHERE EXISTS (
+                SELECT 1 FROM hr_hospital_patient_visit v
+                 WHERE v.doctor_id = d.id AND v.status = 'planned'
+             )
+        """, [list(self.ids)])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
     def action_archive(self):  # Override
         """Check for active visits before archiving."""
-        active_visits = self.env['hr.hospital.patient.visit'].search([
+        blocking_doctors = self._get_doctors_with_planned_visits()
+        if blocking_doctors:
+            raise ValidationError(_(
+                "Cannot archive doctors with planned visits: %s",
+                ', '.join(blocking_doctors.mapped('full_name'))))
+        return super().action_archive()
+
+    def action_archive_and_reassign(self, replacement_doctor):
+        """
+        Moves all planned visits of these doctors to a replacement doctor
+        with a single write, then archives the doctors.
+        """
+        if replacement_doctor in self:
+            raise ValidationError(_(
+                "The replacement doctor cannot be one of the archived doctors."))
+        planned_visits = self.env['hr.hospital.patient.visit'].search([
             ('doctor_id', 'in', self.ids),
             ('status', '=', 'planned')
         ])
-        if active_visits:
-            raise ValidationError(
-                _("Cannot archive doctors with planned visits."))
-        return super().action_archive()
+        if planned_visits:
+            planned_visits.write({
+                'doctor_id': replacement_doctor.id,
+                'mentor_id': replacement_doctor.mentor_id.id
+                if replacement_doctor.is_intern else False,
+            })
+        return self.action_archive()
 
     def action_view_patients_by_language(self):
         """
@@ -128,6 +407,120 @@ class Doctor(models.Model):
             }
         }
 
+    @api.model
+    def get_patient_language_stats(self, doctor_ids=None):
+        """
+        Returns patients per language per personal doctor in one
+        grouped query: [{'doctor_id', 'language_id', 'count'}, ...].
+        """
+        domain = [('personal_doctor_id', '!=', False)]
+        if doctor_ids:
+            domain.append(('personal_doctor_id', 'in', doctor_ids))
+        groups = self.env['hr.hospital.patient'].read_group(
+            domain, ['personal_doctor_id', 'language_id'],
+            ['personal_doctor_id', 'language_id'], lazy=False)
+        return [{
+            'doctor_id': group['personal_doctor_id'][0],
+            'language_id': group['language_id'] and
+            group['language_id'][0],
+            'count': group['__count'],
+        } for group in groups]
+
+    @api.model
+    @tools.ormcache('company_id', 'lang', 'today', 'version')
+    def _get_directory_snapshot(self, company_id, lang, today, version):
+        """
+        Builds the doctor directory in one query. Cached per company,
+        language, day and the 'doctor_directory' and speciality name cache
+        versions; doctor, schedule and speciality name writes bump them.
+        """
+        self.env.cr.execute("""
+            SELECT d.id, d.full_name, d.is_intern, d.rating,
+                   d.license_date, d.phone, d.email,
+                   s.id AS specialty_id,
+                   COALESCE(s.name->>%(lang)s, s.name->>'en_US')
+                       AS specialty_name,
+                   m.full_name AS mentor_name,
+                   (SELECT count(*) FROM hr_hospital_doctor i
+                     WHERE i.mentor_id = d.id) AS intern_count,
+                   COALESCE(
+                       (SELECT sc.schedule_type FROM doctor_schedule sc
+                         WHERE sc.doctor_id = d.id AND sc.date = %(today)s
+                         ORDER BY sc.schedule_type = 'work'
+                         LIMIT 1),
+                       (SELECT 'work' FROM doctor_schedule_rule r
+                         WHERE r.doctor_id = d.id AND r.active
+                           AND r.{weekday_field}
+                           AND r.date_from <= %(today)s
+                           AND (r.date_to IS NULL OR r.date_to >= %(today)s)
+                           AND r.week_parity IN ('standard', %(parity)s)
+                         LIMIT 1),
+                       (SELECT sc.schedule_type FROM doctor_schedule sc
+                         WHERE sc.doctor_id = d.id AND sc.date IS NULL
+                           AND sc.day_of_week = %(weekday)s
+                         ORDER BY sc.schedule_type = 'work'
+                         LIMIT 1)) AS schedule_status
+              FROM hr_hospital_doctor d
+              LEFT JOIN doctor_speciality s ON s.id = d.specialty_id
+              LEFT JOIN hr_hospital_doctor m ON m.id = d.mentor_id
+             WHERE d.active
+             ORDER BY specialty_name, d.full_name
+        """.format(weekday_field=WEEKDAY_FIELDS[today.weekday()]),
+            {'lang': lang, 'today': today,
+             'weekday': str(today.isoweekday()),
+             'parity': 'even' if today.isocalendar()[1] % 2 == 0 else 'odd'})
+        rows = self.env.cr.dictfetchall()
+        for row in rows:
+            license_date = row.pop('license_date')
+            row['experience_years'] = (today - license_date).days // 365 \
+                if license_date and license_date <= today else 0
+            row['schedule_status'] = row['schedule_status'] or 'off'
+        return tuple(rows)
+
+    @api.model
+    def get_directory(self):
+        """
+        Returns a compact snapshot of all doctors for the directory:
+        speciality, rating, experience, interns, mentor and today's status.
+        """
+        self.check_access_rights('read')
+        self.flush_model()
+        self.env['doctor.schedule'].flush_model()
+        self.env['doctor.schedule.rule'].flush_model()
+        version = self.env['hr.hospital.cache.version'].get(
+            'doctor_directory', 'doctor.speciality')
+        snapshot = self._get_directory_snapshot(
+            self.env.company.id, self.env.lang or 'en_US',
+            fields.Date.context_today(self), version)
+        return [dict(row) for row in snapshot]
+
+    @api.model_create_multi
+    def create(self, vals_list):  # Override
+        """Invalidates the directory cache."""
+        records = super().create(vals_list)
+        self.env['hr.hospital.cache.version'].bump('doctor_directory')
+        return records
+
+    def write(self, vals):  # Override
+        """
+        Invalidates the directory cache when directory fields change, and
+        the patients' timelines when the name changes.
+        """
+        result = super().write(vals)
+        stale = []
+        if set(vals) & DIRECTORY_FIELDS:
+            stale.append('doctor_directory')
+        if set(vals) & NAME_FIELDS:
+            stale.append('doctor_names')
+        self.env['hr.hospital.cache.version'].bump(*stale)
+        return result
+
+    def unlink(self):  # Override
+        """Invalidates the directory cache."""
+        result = super().unlink()
+        self.env['hr.hospital.cache.version'].bump('doctor_directory')
+        return result
+
     def action_create_new_visit(self):
         """Button action for Kanban to create a new visit."""
         self.ensure_one()
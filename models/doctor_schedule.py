@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """This file defines the Doctor Schedule model."""
 
-from odoo import models, fields, _
+from odoo import models, fields, api, _
 
 
 class DoctorSchedule(models.Model):
@@ -13,6 +13,7 @@ class DoctorSchedule(models.Model):
     doctor_id = fields.Many2one(
         comodel_name='hr.hospital.doctor',
         required=True,
+        index=True,
         # Домен: тільки лікарі з заповненою спеціальністю
         domain="[('specialty_id', '!=', False)]"
     )
@@ -47,3 +48,27 @@ class DoctorSchedule(models.Model):
          # pylint: disable=translation-field
          _('End time must be after start time.'))
     ]
+
+    @api.model_create_multi
+    def create(self, vals_list):  # Override
+        """Invalidates the expanded schedule and directory caches."""
+        records = super().create(vals_list)
+        self.env['doctor.schedule.rule']._bump_schedule_caches(
+            records.sudo().doctor_id.ids)
+        return records
+
+    def write(self, vals):  # Override
+        """Invalidates the expanded schedule and directory caches."""
+        if 'doctor_id' in vals:
+            self.env['doctor.schedule.rule']._bump_schedule_caches(
+                self.sudo().doctor_id.ids)
+        result = super().write(vals)
+        self.env['doctor.schedule.rule']._bump_schedule_caches(
+            self.sudo().doctor_id.ids)
+        return result
+
+    def unlink(self):  # Override
+        """Invalidates the expanded schedule and directory caches."""
+        self.env['doctor.schedule.rule']._bump_schedule_caches(
+            self.sudo().doctor_id.ids)
+        return super().unlink()
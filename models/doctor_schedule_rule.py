@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""This file defines the recurring Doctor Schedule Rule model."""
+
+from datetime import timedelta
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import ValidationError
+
+WEEKDAY_FIELDS = ('day_mon', 'day_tue', 'day_wed', 'day_thu', 'day_fri',
+                  'day_sat', 'day_sun')
+
+
+def schedule_cache_key(doctor_id):
+    """Name of the cache version of one doctor's expanded schedule."""
+    return f'doctor_schedule.{doctor_id}'
+
+
+class DoctorScheduleRule(models.Model):
+    """
+    Recurring working hours of a doctor. Days are expanded on read;
+    dated doctor.schedule rows override the rule for their day.
+    """
+    _name = 'doctor.schedule.rule'
+    _description = 'Doctor Schedule Rule'
+    _rec_name = 'doctor_id'
+    _order = 'doctor_id, date_from desc, id desc'
+
+    doctor_id = fields.Many2one(
+        comodel_name='hr.hospital.doctor',
+        required=True,
+        index=True,
+        ondelete='cascade',
+        domain="[('specialty_id', '!=', False)]"
+    )
+    date_from = fields.Date(required=True, default=fields.Date.today)
+    date_to = fields.Date(help="Залиште порожнім для безстрокового правила.")
+    week_parity = fields.Selection(
+        selection=[
+            ('standard', 'Стандартний (кожен тиждень)'),
+            ('even', 'Парний тиждень'),
+            ('odd', 'Непарний тиждень')
+        ],
+        default='standard', required=True, string="Тип розкладу"
+    )
+    day_mon = fields.Boolean(string="Понеділок", default=True)
+    day_tue = fields.Boolean(string="Вівторок", default=True)
+    day_wed = fields.Boolean(string="Середа", default=True)
+    day_thu = fields.Boolean(string="Четвер", default=True)
+    day_fri = fields.Boolean(string="П'ятниця", default=True)
+    day_sat = fields.Boolean(string="Субота")
+    day_sun = fields.Boolean(string="Неділя")
+    start_time = fields.Float(required=True)
+    end_time = fields.Float(required=True)
+    break_start_time = fields.Float()
+    break_end_time = fields.Float()
+    active = fields.Boolean(default=True)
+
+    _sql_constraints = [
+        ('check_time',
+         'CHECK(end_time > start_time)',
+         # pylint: disable=translation-field
+         _('End time must be after start time.')),
+        ('check_dates',
+         'CHECK(date_to IS NULL OR date_to >= date_from)',
+         # pylint: disable=translation-field
+         _('The rule cannot end before it starts.')),
+    ]
+
+    @api.constrains('start_time', 'end_time',
+                    'break_start_time', 'break_end_time')
+    def _check_break(self):
+        for record in self:
+            if record.break_start_time and record.break_end_time and \
+                    not (record.start_time < record.break_start_time <
+                         record.break_end_time < record.end_time):
+                raise ValidationError(
+                    _("Break time must be within working hours."))
+
+    def _get_intervals(self):
+        """Working intervals of one day, split around the break."""
+        self.ensure_one()
+        if self.break_start_time and self.break_end_time:
+            return ((self.start_time, self.break_start_time),
+                    (self.break_end_time, self.end_time))
+        return ((self.start_time, self.end_time),)
+
+    def _applies_on(self, day):
+        self.ensure_one()
+        if day < self.date_from or (self.date_to and day > self.date_to):
+            return False
+        if not self[WEEKDAY_FIELDS[day.weekday()]]:
+            return False
+        if self.week_parity == 'standard':
+            return True
+        is_even_week = day.isocalendar()[1] % 2 == 0
+        return is_even_week == (self.week_parity == 'even')
+
+    @api.model
+    @tools.ormcache('doctor_id', 'date_from', 'date_to', 'version')
+    def _expand(self, doctor_id, date_from, date_to, version):
+        """
+        Expands the doctor's rules and overrides into
+        ((date, ((start, end), ...)), ...). Cached per doctor, range and
+        the doctor's schedule cache version; rule and schedule writes
+        bump it.
+        """
+        rules = self.sudo().search([
+            ('doctor_id', '=', doctor_id),
+            ('date_from', '<=', date_to),
+            '|', ('date_to', '=', False), ('date_to', '>=', date_from),
+        ])
+        overrides = self.env['doctor.schedule'].sudo().search_read([
+            ('doctor_id', '=', doctor_id),
+            '|', ('date', '=', False),
+            '&', ('date', '>=', date_from), ('date', '<=', date_to),
+        ], ['date', 'day_of_week', 'start_time', 'end_time',
+            'schedule_type'])
+
+        absences = set()
+        dated = {}
+        weekly = {}
+        for slot in overrides:
+            if slot['schedule_type'] != 'work':
+                if slot['date']:
+                    absences.add(slot['date'])
+                continue
+            interval = (slot['start_time'], slot['end_time'])
+            if slot['date']:
+                dated.setdefault(slot['date'], []).append(interval)
+            elif slot['day_of_week']:
+                weekly.setdefault(slot['day_of_week'], []).append(interval)
+
+        result = []
+        day = date_from
+        while day <= date_to:
+            if day not in absences:
+                # Пріоритет: датований рядок, найновіше правило, тижневий рядок
+                day_slots = dated.get(day)
+                if not day_slots:
+                    rule = next((rule for rule in rules
+                                 if rule._applies_on(day)), None)
+                    day_slots = rule._get_intervals() if rule else \
+                        weekly.get(str(day.isoweekday()))
+                if day_slots:
+                    result.append((day, tuple(sorted(day_slots))))
+            day += timedelta(days=1)
+        return tuple(result)
+
+    @api.model
+    def get_work_intervals(self, doctor_ids, date_from, date_to):
+        """
+        Returns {(doctor_id, date): [(start_time, end_time), ...]} for the
+        doctors' working days, skipping days marked as absence.
+        """
+        self.check_access_rights('read')
+        self.flush_model()
+        self.env['doctor.schedule'].flush_model()
+        doctor_ids = list(doctor_ids)
+        versions = self.env['hr.hospital.cache.version'].get(
+            *[schedule_cache_key(doctor_id) for doctor_id in doctor_ids])
+        intervals = {}
+        for doctor_id, version in zip(doctor_ids, versions):
+            for day, day_slots in self._expand(doctor_id, date_from, date_to,
+                                               version):
+                intervals[(doctor_id, day)] = list(day_slots)
+        return intervals
+
+    @api.model
+    def _bump_schedule_caches(self, doctor_ids):
+        """Invalidates the doctors' expanded schedules and the directory."""
+        self.env['hr.hospital.cache.version'].bump(
+            'doctor_directory',
+            *[schedule_cache_key(doctor_id) for doctor_id in doctor_ids])
+
+    @api.model_create_multi
+    def create(self, vals_list):  # Override
+        """Invalidates the expanded schedule and directory caches."""
+        records = super().create(vals_list)
+        self._bump_schedule_caches(records.sudo().doctor_id.ids)
+        return records
+
+    def write(self, vals):  # Override
+        """Invalidates the expanded schedule and directory caches."""
+        # Після зміни лікаря застаріває розклад і попереднього лікаря
+        if 'doctor_id' in vals:
+            self._bump_schedule_caches(self.sudo().doctor_id.ids)
+        result = super().write(vals)
+        self._bump_schedule_caches(self.sudo().doctor_id.ids)
+        return result
+
+    def unlink(self):  # Override
+        """Invalidates the expanded schedule and directory caches."""
+        self._bump_schedule_caches(self.sudo().doctor_id.ids)
+        return super().unlink()
@@ -7,6 +7,7 @@ from odoo import models, fields
 class DoctorSpeciality(models.Model):
     """Model for storing doctor specialities."""
     _name = 'doctor.speciality'
+    _inherit = ['hr.hospital.name.cache.mixin']
     _description = 'Doctor Speciality'
     _rec_name = 'name'
 
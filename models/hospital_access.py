@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Denormalized doctor/mentor access columns for record rules."""
+
+from odoo import models, fields, api, tools
+
+
+class HospitalAccessMixin(models.AbstractModel):
+    """
+    Stores the users of the responsible doctor and of an intern's mentor
+    on the record itself, so the doctor record rules are plain indexed
+    column comparisons instead of joins through doctors and visits.
+    """
+    _name = 'hr.hospital.access.mixin'
+    _description = 'Doctor Access Columns'
+
+    # Шлях до відповідального лікаря та той самий шлях у SQL (alias t)
+    _access_doctor_path = 'doctor_id'
+    _access_doctor_sql = 't.doctor_id'
+
+    doctor_user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Doctor User',
+        compute='_compute_access_users',
+        store=True,
+        index='btree_not_null',
+        readonly=True
+    )
+    mentor_user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='Mentor User',
+        compute='_compute_access_users',
+        store=True,
+        index='btree_not_null',
+        readonly=True
+    )
+
+    def _auto_init(self):
+        """
+        On upgrade, fills the new access columns with one UPDATE instead
+        of an ORM recompute over the whole table.
+        """
+        cr = self._cr
+        if tools.table_exists(cr, self._table) and \
+                not tools.column_exists(cr, self._table, 'doctor_user_id'):
+            tools.create_column(cr, self._table, 'doctor_user_id', 'int4')
+            tools.create_column(cr, self._table, 'mentor_user_id', 'int4')
+            self._update_access_users()
+        return super()._auto_init()
+
+    @api.model
+    def _update_access_users(self, ids=None):
+        """
+        Rewrites the access columns from the current doctors with one
+        UPDATE, for the given ids or the whole table; used for rows the
+        ORM did not see change, like visits moved back from the archive.
+        """
+        self._cr.execute(f"""
+            UPDATE {self._table} t
+               SET doctor_user_id = d.user_id,
+                   mentor_user_id = CASE WHEN d.is_intern
+                                         THEN m.user_id END
+              FROM hr_hospital_doctor d
+              LEFT JOIN hr_hospital_doctor m ON m.id = d.mentor_id
+             WHERE d.id = {self._access_doctor_sql}
+               AND (%(all)s OR t.id = ANY(%(ids)s))
+        """, {'all': ids is None, 'ids': ids or []})
+
+    @api.depends(lambda self: (
+        f'{self._access_doctor_path}.user_id',
+        f'{self._access_doctor_path}.is_intern',
+        f'{self._access_doctor_path}.mentor_id.user_id',
+    ))
+    def _compute_access_users(self):
+        for record in self:
+            doctor = record.mapped(self._access_doctor_path)
+            record.doctor_user_id = doctor.user_id
+            record.mentor_user_id = doctor.mentor_id.user_id \
+                if doctor.is_intern else False
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""Hot/cold archival of closed visits and their diagnoses."""
+
+import logging
+import threading
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+from .hospital_content import content_join
+
+_logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 2000
+ARCHIVE_HORIZON_DAYS = 730
+
+# Гаряча таблиця -> холодна таблиця з тими самими колонками
+ARCHIVE_TABLES = {
+    'hr_hospital_patient_visit': 'hr_hospital_patient_visit_archive',
+    'medical_diagnosis': 'medical_diagnosis_archive',
+    'hr_hospital_visit_feedback': 'hr_hospital_visit_feedback_archive',
+}
+
+
+def with_archive(table, columns):
+    """SQL source that reads the hot table and its archive as one."""
+    columns = ', '.join(columns)
+    return (f"(SELECT {columns} FROM {table} UNION ALL "
+            f"SELECT {columns} FROM {ARCHIVE_TABLES[table]})")
+
+
+class HospitalArchive(models.AbstractModel):
+    """
+    Moves completed and cancelled visits older than the horizon, with
+    their diagnoses and feedback, into archive tables and back. The archive tables
+    mirror the columns and foreign keys of the hot tables.
+    """
+    _name = 'hr.hospital.archive'
+    _description = 'Hospital History Archive'
+
+    def init(self):
+        """Creates or extends the archive tables after the hot ones."""
+        # Гарячі таблиці можуть з'явитися пізніше за цю модель
+        self.pool.post_init(self._init_archive_tables)
+        # Зовнішні ключі гарячих таблиць з'являються після init()
+        self.pool.post_constraint(self._sync_foreign_keys)
+
+    def _init_archive_tables(self):
+        cr = self._cr
+        for table, archive in ARCHIVE_TABLES.items():
+            if not tools.table_exists(cr, archive):
+                cr.execute(f"CREATE TABLE {archive} (LIKE {table})")
+                cr.execute(f"ALTER TABLE {archive} ADD PRIMARY KEY (id)")
+            hot_columns = self._get_columns(table)
+            archive_columns = self._get_columns(archive)
+            for column, column_type in hot_columns.items():
+                if column not in archive_columns:
+                    cr.execute(f'ALTER TABLE {archive} '
+                               f'ADD COLUMN "{column}" {column_type}')
+        tools.create_index(
+            cr, 'hr_hospital_patient_visit_archive_patient_date_idx',
+            ARCHIVE_TABLES['hr_hospital_patient_visit'],
+            ['patient_id', 'visit_date DESC', 'id DESC']
+        )
+        tools.create_index(
+            cr, 'medical_diagnosis_archive_visit_idx',
+            ARCHIVE_TABLES['medical_diagnosis'], ['visit_id']
+        )
+        tools.create_index(
+            cr, 'hr_hospital_visit_feedback_archive_visit_idx',
+            ARCHIVE_TABLES['hr_hospital_visit_feedback'], ['visit_id']
+        )
+
+    def _get_columns(self, table):
+        """Returns {column: SQL type} in the table's column order."""
+        self._cr.execute("""
+            SELECT attname, format_type(atttypid, atttypmod)
+              FROM pg_attribute
+             WHERE attrelid = %s::regclass AND attnum > 0
+               AND NOT attisdropped
+             ORDER BY attnum
+        """, [table])
+        return dict(self._cr.fetchall())
+
+    def _sync_foreign_keys(self):
+        """
+        Copies the hot tables' foreign keys to the archive tables, except
+        those between the archived tables themselves, so references from
+        archived rows stay valid and a restore never hits missing rows.
+        """
+        cr = self._cr
+        for table, archive in ARCHIVE_TABLES.items():
+            cr.execute("""
+                SELECT pg_get_constraintdef(oid) FROM pg_constraint
+                 WHERE conrelid = %s::regclass AND contype = 'f'
+                   AND confrelid::regclass::text NOT IN %s
+            """, [table, tuple(ARCHIVE_TABLES)])
+            wanted = {row[0] for row in cr.fetchall()}
+            cr.execute("""
+                SELECT pg_get_constraintdef(oid) FROM pg_constraint
+                 WHERE conrelid = %s::regclass AND contype = 'f'
+            """, [archive])
+            for definition in wanted - {row[0] for row in cr.fetchall()}:
+                cr.execute(f"ALTER TABLE {archive} ADD {definition}")
+
+    def _move_rows(self, source, target, key, ids):
+        """
+        Moves rows whose 'key' is in ids with one DELETE ... RETURNING
+        and returns the ids of the moved rows.
+        """
+        columns = ', '.join(f'"{column}"' for column
+                            in self._get_columns(source))
+        self._cr.execute(f"""
+            WITH moved AS (
+                DELETE FROM {source} WHERE {key} = ANY(%s)
+                RETURNING {columns}
+            )
+            INSERT INTO {target} ({columns}) SELECT {columns} FROM moved
+            RETURNING id
+        """, [ids])
+        return [row[0] for row in self._cr.fetchall()]
+
+    def _invalidate(self, patient_ids):
+        self.env['hr.hospital.patient.visit'].invalidate_model()
+        self.env['medical.diagnosis'].invalidate_model()
+        self.env['hr.hospital.visit.feedback'].invalidate_model()
+        self.env['hr.hospital.patient']._invalidate_timeline(patient_ids)
+
+    @api.model
+    def _archive_chunk(self, horizon, batch_size):
+        """
+        Archives one chunk of closed visits older than the horizon.
+        Visits still needed by hot data stay: pending diagnoses, a
+        rescheduled visit still in the hot table, an unfinished claim.
+        """
+        self.env.cr.execute("""
+            SELECT v.id, v.patient_id
+              FROM hr_hospital_patient_visit v
+             WHERE v.status IN ('completed', 'cancelled')
+               AND v.visit_date < %(horizon)s
+               AND NOT EXISTS (SELECT 1 FROM medical_diagnosis d
+                                WHERE d.visit_id = v.id AND d.is_pending)
+               AND NOT EXISTS (SELECT 1 FROM hr_hospital_patient_visit c
+                                WHERE c.origin_visit_id = v.id)
+               AND (v.status = 'cancelled'
+                    OR EXISTS (SELECT 1 FROM hr_hospital_claim_batch b
+                                WHERE b.id = v.claim_batch_id
+                                  AND b.state = 'done')
+                    OR NOT EXISTS (SELECT 1 FROM hr_hospital_patient p
+                                    WHERE p.id = v.patient_id
+                                      AND p.insurance_partner_id IS NOT NULL))
+             ORDER BY v.visit_date, v.id
+             LIMIT %(batch)s
+               FOR UPDATE OF v SKIP LOCKED
+        """, {'horizon': horizon, 'batch': batch_size})
+        rows = self.env.cr.fetchall()
+        if rows:
+            visit_ids = [row[0] for row in rows]
+            self._move_rows('medical_diagnosis',
+                            ARCHIVE_TABLES['medical_diagnosis'],
+                            'visit_id', visit_ids)
+            self._move_rows('hr_hospital_visit_feedback',
+                            ARCHIVE_TABLES['hr_hospital_visit_feedback'],
+                            'visit_id', visit_ids)
+            self._move_rows('hr_hospital_patient_visit',
+                            ARCHIVE_TABLES['hr_hospital_patient_visit'],
+                            'id', visit_ids)
+            self._invalidate([row[1] for row in rows])
+        return len(rows)
+
+    @api.model
+    def _restore_chunk(self, patient_ids, batch_size):
+        """
+        Moves one chunk of archived visits back, together with the
+        visits they were rescheduled from, then their diagnoses.
+        """
+        self.env.cr.execute("""
+            WITH RECURSIVE chunk AS (
+                SELECT id, origin_visit_id
+                  FROM hr_hospital_patient_visit_archive
+                 WHERE %(all)s OR patient_id = ANY(%(patients)s)
+                 ORDER BY visit_date, id
+                 LIMIT %(batch)s
+            ), closure AS (
+                SELECT id, origin_visit_id FROM chunk
+                 UNION
+                SELECT a.id, a.origin_visit_id
+                  FROM hr_hospital_patient_visit_archive a
+                  JOIN closure c ON a.id = c.origin_visit_id
+            )
+            SELECT c.id, a.patient_id
+              FROM closure c
+              JOIN hr_hospital_patient_visit_archive a ON a.id = c.id
+        """, {'all': patient_ids is None, 'patients': patient_ids or [],
+              'batch': batch_size})
+        rows = self.env.cr.fetchall()
+        if rows:
+            visit_ids = [row[0] for row in rows]
+            self._move_rows(ARCHIVE_TABLES['hr_hospital_patient_visit'],
+                            'hr_hospital_patient_visit', 'id', visit_ids)
+            diagnosis_ids = self._move_rows(
+                ARCHIVE_TABLES['medical_diagnosis'], 'medical_diagnosis',
+                'visit_id', visit_ids)
+            self._move_rows(ARCHIVE_TABLES['hr_hospital_visit_feedback'],
+                            'hr_hospital_visit_feedback', 'visit_id',
+                            visit_ids)
+            # Лікар чи ментор могли змінитися, поки візити були в архіві
+            self.env['hr.hospital.patient.visit']._update_access_users(
+                visit_ids)
+            self.env['medical.diagnosis']._update_access_users(diagnosis_ids)
+            self._invalidate([row[1] for row in rows])
+            # Зв'язки з алергенами не архівуються, відновлюємо скринінгом
+            self.env['medical.diagnosis'].browse(
+                diagnosis_ids)._screen_allergies()
+        return len(rows)
+
+    @api.model
+    def _run_chunks(self, chunk, *args, batch_size=ARCHIVE_BATCH_SIZE):
+        """Runs chunks until none is left, committing between them."""
+        self.env.flush_all()
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        total = 0
+        while True:
+            count = chunk(*args, batch_size)
+            total += count
+            if auto_commit:
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+            if count < batch_size:
+                break
+        return total
+
+    @api.model
+    def action_archive_history(self, horizon_days=None):
+        """Archives closed visits older than the horizon (in days)."""
+        if horizon_days is None:
+            horizon_days = int(
+                self.env['ir.config_parameter'].sudo().get_param(
+                    'hr_hospital.archive_horizon_days',
+                    ARCHIVE_HORIZON_DAYS))
+        horizon = fields.Datetime.now() - timedelta(days=horizon_days)
+        total = self._run_chunks(self._archive_chunk, horizon)
+        _logger.info("Archived %s visits older than %s", total, horizon)
+        return total
+
+    @api.model
+    def action_restore_history(self, patient_ids=None):
+        """Moves archived visits back, for the given patients or all."""
+        total = self._run_chunks(self._restore_chunk, patient_ids)
+        _logger.info("Restored %s archived visits", total)
+        return total
+
+    @api.model
+    def _cron_archive_history(self):
+        """Cron: archives closed visits older than the horizon."""
+        return self.action_archive_history()
+
+    @api.model
+    def _count_archived_visits(self, patient_ids):
+        """Returns {patient_id: number of archived visits}."""
+        if not patient_ids:
+            return {}
+        self.env.cr.execute("""
+            SELECT patient_id, count(*)
+              FROM hr_hospital_patient_visit_archive
+             WHERE patient_id = ANY(%s)
+             GROUP BY patient_id
+        """, [list(patient_ids)])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _read_archived_visits(self, patient_id, date_start=None,
+                              date_end=None, lang=None):
+        """
+        Archived visits of a patient, newest first, with their diagnoses,
+        shaped like the visit and diagnosis read() results. Disease names
+        are translated into 'lang' (the user's language by default).
+        """
+        # Тексти архівних записів лишаються в таблиці вмісту
+        recommendations = content_join('r', 'hr.hospital.patient.visit',
+                                       'recommendations', 'v')
+        treatments = content_join('t', 'medical.diagnosis', 'treatment', 'd')
+        self.env.cr.execute(f"""
+            SELECT v.id, v.visit_date, v.status, v.cost,
+                   v.actual_visit_date, r.body AS recommendations,
+                   doc.full_name AS doctor,
+                   COALESCE(json_agg(json_build_object(
+                       'id', d.id, 'disease_id', d.disease_id,
+                       'description', d.description,
+                       'treatment', t.body, 'severity', d.severity)
+                       ORDER BY d.id) FILTER (WHERE d.id IS NOT NULL),
+                       '[]') AS diagnoses
+              FROM hr_hospital_patient_visit_archive v
+              JOIN hr_hospital_doctor doc ON doc.id = v.doctor_id
+              {recommendations}
+              LEFT JOIN medical_diagnosis_archive d ON d.visit_id = v.id
+              {treatments}
+             WHERE v.patient_id = %(patient)s
+               AND (%(start)s IS NULL OR v.visit_date >= %(start)s)
+               AND (%(end)s IS NULL OR v.visit_date <= %(end)s)
+             GROUP BY v.id, doc.full_name, r.body
+             ORDER BY v.visit_date DESC
+        """, {'patient': patient_id, 'start': date_start, 'end': date_end})
+        rows = self.env.cr.dictfetchall()
+        names = self.env['hr.hospital.disease'].get_translated_names(
+            {diag['disease_id'] for row in rows
+             for diag in row['diagnoses']}, lang)
+        for row in rows:
+            for diag in row['diagnoses']:
+                diag['disease_id'] = diag['disease_id'] and \
+                    (diag['disease_id'], names.get(diag['disease_id']))
+        return rows
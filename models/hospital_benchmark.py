@@ -0,0 +1,537 @@
+# -*- coding: utf-8 -*-
+"""Defines the synthetic data generator and the performance benchmark."""
+
+import base64
+import functools
+import io
+import logging
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from PIL import Image
+from psycopg2.extras import execute_values
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+BENCH_PREFIX = 'BENCH'
+REGRESSION_TOLERANCE = 0.2
+
+# Поля першої сторінки списків для заміру правил доступу
+LIST_VIEW_FIELDS = {
+    'hr.hospital.patient': ['full_name', 'personal_doctor_id', 'blood_type'],
+    'hr.hospital.patient.visit': ['visit_date', 'patient_id', 'doctor_id',
+                                  'visit_type', 'status'],
+    'medical.diagnosis': ['disease_id', 'visit_date', 'severity',
+                          'is_approved'],
+}
+
+FIRST_NAMES = ['Олександр', 'Марія', 'Іван', 'Олена', 'Андрій', 'Наталія',
+               'Петро', 'Ірина', 'Сергій', 'Катерина']
+LAST_NAMES = ['Шевченко', 'Коваленко', 'Бондаренко', 'Ткаченко', 'Кравченко',
+              'Олійник', 'Мельник', 'Поліщук', 'Лисенко', 'Руденко']
+
+
+class HospitalDataGenerator(models.AbstractModel):
+    """Generates production-scale synthetic hospital data with bulk SQL."""
+    _name = 'hr.hospital.data.generator'
+    _description = 'Hospital Synthetic Data Generator'
+
+    def _bulk_insert(self, table, columns, rows):
+        """Inserts rows with a multi-row INSERT and returns the new ids."""
+        if not rows:
+            return []
+        audit = [self.env.uid, fields.Datetime.now()] * 2
+        query = f"""
+            INSERT INTO {table} ({', '.join(columns)},
+                                 create_uid, create_date, write_uid, write_date)
+            VALUES %s RETURNING id
+        """
+        result = execute_values(
+            self.env.cr._obj, query,
+            [tuple(row) + tuple(audit) for row in rows],
+            page_size=5000, fetch=True)
+        return [row[0] for row in result]
+
+    @api.model
+    def generate(self, doctor_count=100, patient_count=1000,
+                 visits_per_patient=5, weeks=4, seed=42):
+        """
+        Generates doctors (with interns and schedules), patients with
+        doctor history, visits and diagnoses over the ICD-10 tree.
+        Returns a dict with the number of rows created per model.
+        """
+        rnd = random.Random(seed)
+        started = time.monotonic()
+        today = fields.Date.context_today(self)
+        currency_id = self.env.company.currency_id.id
+
+        specialities = self.env['doctor.speciality'].search([])
+        if not specialities:
+            raise UserError(_("Create at least one doctor speciality first."))
+        diseases = self.env['hr.hospital.disease'].search_read(
+            [('code_icd10', '!=', False)], ['parent_id'])
+        if not diseases:
+            raise UserError(_("No diseases with ICD-10 codes found."))
+        countries = self.env['res.country'].search([], limit=30).ids
+
+        def person(index):
+            first = rnd.choice(FIRST_NAMES)
+            last = rnd.choice(LAST_NAMES)
+            birthday = date(rnd.randint(1940, 2015), rnd.randint(1, 12),
+                            rnd.randint(1, 28))
+            age = today.year - birthday.year - \
+                ((today.month, today.day) < (birthday.month, birthday.day))
+            return [first, f'{last}-{index}', f'{last}-{index} {first}',
+                    birthday, age, rnd.choice(countries) if countries
+                    else None]
+
+        person_columns = ['first_name', 'last_name', 'full_name', 'birthday',
+                          'age', 'country_id']
+
+        # Лікарі: кожен п'ятий - інтерн з ментором
+        mentor_count = doctor_count - doctor_count // 5
+        doctor_rows = []
+        for index in range(mentor_count):
+            doctor_rows.append(person(index) + [
+                rnd.choice(specialities.ids), False, None,
+                f'{BENCH_PREFIX}-{seed}-{index}',
+                today - timedelta(days=rnd.randint(0, 30 * 365)),
+                round(rnd.uniform(0, 5), 2), True, 0, 0])
+        doctor_columns = person_columns + [
+            'specialty_id', 'is_intern', 'mentor_id', 'license_number',
+            'license_date', 'rating', 'active', 'panel_size',
+            'upcoming_visit_count']
+        mentor_ids = self._bulk_insert(
+            'hr_hospital_doctor', doctor_columns, doctor_rows)
+        intern_rows = []
+        for index in range(mentor_count, doctor_count):
+            intern_rows.append(person(index) + [
+                rnd.choice(specialities.ids), True, rnd.choice(mentor_ids),
+                f'{BENCH_PREFIX}-{seed}-{index}', today, 0.0, True, 0, 0])
+        intern_ids = self._bulk_insert(
+            'hr_hospital_doctor', doctor_columns, intern_rows)
+        doctor_ids = mentor_ids + intern_ids
+
+        # Пн-Пт 9-17 одним правилом на лікаря
+        schedule_rows = [
+            [doctor_id, today, today + timedelta(days=weeks * 7 - 1),
+             'standard', True, True, True, True, True, False, False,
+             9.0, 17.0, True]
+            for doctor_id in doctor_ids]
+        self._bulk_insert(
+            'doctor_schedule_rule',
+            ['doctor_id', 'date_from', 'date_to', 'week_parity', 'day_mon',
+             'day_tue', 'day_wed', 'day_thu', 'day_fri', 'day_sat',
+             'day_sun', 'start_time', 'end_time', 'active'], schedule_rows)
+
+        blood_types = [key for key, _label in self.env[
+            'hr.hospital.patient']._fields['blood_type'].selection]
+        patient_rows = []
+        for index in range(patient_count):
+            patient_rows.append(person(index) + [
+                rnd.choice(mentor_ids), rnd.choice(blood_types)])
+        patient_ids = self._bulk_insert(
+            'hr_hospital_patient',
+            person_columns + ['personal_doctor_id', 'blood_type'],
+            patient_rows)
+
+        history_rows = [[patient_id, row[6], today, True]
+                        for patient_id, row in zip(patient_ids, patient_rows)]
+        self._bulk_insert(
+            'patient_doctor_history',
+            ['patient_id', 'doctor_id', 'assign_date', 'active'],
+            history_rows)
+
+        mentor_of = dict(zip(intern_ids, [row[8] for row in intern_rows]))
+        now = datetime.combine(today, datetime.min.time())
+        visit_env = self.env['hr.hospital.patient.visit']
+        visit_rows = []
+        booked = set()
+        for patient_id in patient_ids:
+            for number in range(visits_per_patient):
+                # Один візит на день клініки для пари пацієнт/лікар,
+                # без накладання годинних слотів лікаря
+                while True:
+                    doctor_id = rnd.choice(doctor_ids)
+                    visit_date = now - timedelta(
+                        days=number * 7 + rnd.randint(0, 6),
+                        hours=-rnd.randint(8, 17))
+                    visit_day = visit_env._visit_day_of(visit_date)
+                    if (doctor_id, visit_date) not in booked and \
+                            (patient_id, doctor_id, visit_day) not in booked:
+                        booked.add((doctor_id, visit_date))
+                        booked.add((patient_id, doctor_id, visit_day))
+                        break
+                status = 'completed' if visit_date < now else 'planned'
+                cost = round(rnd.uniform(200, 3000), 2)
+                visit_rows.append([
+                    patient_id, doctor_id, mentor_of.get(doctor_id),
+                    status, visit_date, 60, visit_day,
+                    visit_date if status == 'completed' else None,
+                    rnd.choice(['primary', 'repeat', 'preventive', 'urgent']),
+                    1 if status == 'completed' else 0,
+                    currency_id, currency_id, cost, cost])
+        visit_ids = self._bulk_insert(
+            'hr_hospital_patient_visit',
+            ['patient_id', 'doctor_id', 'mentor_id', 'status', 'visit_date',
+             'duration', 'visit_day', 'actual_visit_date', 'visit_type',
+             'diagnosis_count',
+             'currency_id', 'company_currency_id', 'cost', 'cost_company'],
+            visit_rows)
+        self.env['hr.hospital.patient.visit'].browse(
+            visit_ids)._snapshot_revenue_keys()
+
+        diagnosis_rows = []
+        for visit_id, row in zip(visit_ids, visit_rows):
+            if row[3] != 'completed':
+                continue
+            disease = rnd.choice(diseases)
+            # Діагнози інтернів чекають на затвердження ментором
+            is_approved = row[2] is None
+            diagnosis_rows.append([
+                visit_id, disease['id'],
+                disease['parent_id'] and disease['parent_id'][0] or None,
+                row[4], rnd.choice(['low', 'medium', 'high', 'severe']),
+                is_approved, not is_approved, row[2] or row[1], 0])
+        self._bulk_insert(
+            'medical_diagnosis',
+            ['visit_id', 'disease_id', 'disease_type_id', 'visit_date',
+             'severity', 'is_approved', 'is_pending', 'approver_id',
+             'allergy_screen_version'],
+            diagnosis_rows)
+
+        self.env.invalidate_all()
+        self.env['hr.hospital.doctor'].action_recompute_workload()
+        self.env['hr.hospital.disease.incidence'].action_rebuild()
+        self.env['hr.hospital.visit.revenue'].action_rebuild()
+        counts = {
+            'hr.hospital.doctor': len(doctor_ids),
+            'doctor.schedule.rule': len(schedule_rows),
+            'hr.hospital.patient': len(patient_ids),
+            'patient.doctor.history': len(history_rows),
+            'hr.hospital.patient.visit': len(visit_ids),
+            'medical.diagnosis': len(diagnosis_rows),
+        }
+        _logger.info("Generated synthetic hospital data in %.1fs: %s",
+                     time.monotonic() - started, counts)
+        return counts
+
+
+class HospitalBenchmarkResult(models.Model):
+    """Stores timings of benchmark runs and the baselines they compare to."""
+    _name = 'hr.hospital.benchmark.result'
+    _description = 'Hospital Benchmark Result'
+    _order = 'create_date desc, id desc'
+
+    flow = fields.Char(required=True, readonly=True)
+    scale = fields.Char(readonly=True,
+                        help="Розмір даних, напр. кількість пацієнтів.")
+    duration = fields.Float(string='Duration (ms)', digits=(16, 2),
+                            readonly=True)
+    query_count = fields.Integer(readonly=True)
+    baseline_duration = fields.Float(string='Baseline (ms)', digits=(16, 2),
+                                     readonly=True)
+    is_baseline = fields.Boolean(readonly=True)
+    is_regression = fields.Boolean(readonly=True)
+
+    def action_set_baseline(self):
+        """Marks these results as the baselines for their flow and scale."""
+        for record in self:
+            self.search([
+                ('flow', '=', record.flow),
+                ('scale', '=', record.scale),
+                ('is_baseline', '=', True),
+                ('id', '!=', record.id),
+            ]).write({'is_baseline': False})
+            record.write({'is_baseline': True, 'is_regression': False})
+        return True
+
+
+class HospitalBenchmark(models.AbstractModel):
+    """Times the key hr_hospital flows; every flow is rolled back."""
+    _name = 'hr.hospital.benchmark'
+    _description = 'Hospital Benchmark'
+
+    def _measure(self, flow, scale, func, setup=None):
+        cr = self.env.cr
+        self.env.flush_all()
+        cr.execute('SAVEPOINT hr_hospital_benchmark')
+        if setup:
+            # Підготовка відкочується разом із потоком, але не вимірюється
+            args = setup()
+            self.env.flush_all()
+            func = functools.partial(func, args)
+        query_count = cr.sql_log_count
+        started = time.perf_counter()
+        try:
+            func()
+            self.env.flush_all()
+            duration = (time.perf_counter() - started) * 1000
+            query_count = cr.sql_log_count - query_count
+        finally:
+            cr.execute('ROLLBACK TO SAVEPOINT hr_hospital_benchmark')
+            self.env.invalidate_all()
+
+        result_env = self.env['hr.hospital.benchmark.result']
+        baseline = result_env.search([
+            ('flow', '=', flow),
+            ('scale', '=', scale),
+            ('is_baseline', '=', True),
+        ], limit=1)
+        is_regression = bool(baseline) and \
+            duration > baseline.duration * (1 + REGRESSION_TOLERANCE)
+        if is_regression:
+            _logger.warning("Benchmark regression in %s: %.2f ms vs "
+                            "baseline %.2f ms", flow, duration,
+                            baseline.duration)
+        return result_env.create({
+            'flow': flow,
+            'scale': scale,
+            'duration': duration,
+            'query_count': query_count,
+            'baseline_duration': baseline.duration,
+            'is_regression': is_regression,
+        })
+
+    def _flow_patient_create(self, doctors, size):
+        self.env['hr.hospital.patient'].create([{
+            'first_name': 'Bench',
+            'last_name': f'Patient {index}',
+            'personal_doctor_id': doctors[index % len(doctors)].id,
+        } for index in range(size)])
+
+    def _flow_mass_reassign(self, doctors):
+        old_doctor = doctors[0]
+        wizard = self.env['mass.reassign.doctor.wizard'].create({
+            'old_doctor_id': old_doctor.id,
+            'new_doctor_id': doctors[-1].id,
+            'patient_ids': [(6, 0, self.env['hr.hospital.patient'].search([
+                ('personal_doctor_id', '=', old_doctor.id)]).ids)],
+            'change_reason': 'Benchmark',
+        })
+        wizard.action_reassign()
+
+    def _flow_schedule_generation(self, doctors):
+        for doctor in doctors[:10]:
+            self.env['doctor.schedule.wizard'].create({
+                'doctor_id': doctor.id,
+                'week_count': 52,
+                'start_time': 8.0,
+                'end_time': 17.0,
+                'break_start_time': 12.0,
+                'break_end_time': 13.0,
+            }).action_generate_schedule()
+
+    def _flow_disease_report(self):
+        today = fields.Date.context_today(self)
+        wizard = self.env['disease.report.wizard'].create({
+            'date_start': today - timedelta(days=365),
+            'date_end': today,
+        })
+        action = wizard.action_generate_report()
+        self.env['medical.diagnosis'].read_group(
+            action['domain'], ['disease_id'], ['disease_id'])
+
+    def _flow_card_export(self):
+        self.env.cr.execute("""
+            SELECT patient_id FROM hr_hospital_patient_visit
+             GROUP BY patient_id ORDER BY count(*) DESC LIMIT 1
+        """)
+        row = self.env.cr.fetchone()
+        if not row:
+            return
+        for export_format in ('json', 'csv'):
+            self.env['patient.card_export_wizard'].create({
+                'patient_id': row[0],
+                'export_format': export_format,
+            }).action_export_card()
+
+    def _flow_doctor_at(self):
+        self.env.cr.execute("SELECT id FROM hr_hospital_patient")
+        self.env['patient.doctor.history'].doctor_at(
+            [row[0] for row in self.env.cr.fetchall()],
+            fields.Date.context_today(self) - timedelta(days=30))
+
+    def _flow_diagnosis_approval(self):
+        diagnoses = self.env['medical.diagnosis'].search([
+            ('is_approved', '=', False),
+            ('visit_id.doctor_id.is_intern', '=', True),
+        ], limit=500)
+        if not diagnoses:
+            return
+        mentor = diagnoses[0].visit_id.doctor_id.mentor_id
+        self.env['hr.hospital.doctor'].search([
+            ('user_id', '=', self.env.uid)]).write({'user_id': False})
+        mentor.user_id = self.env.user
+        diagnoses.filtered(
+            lambda d: d.visit_id.doctor_id.mentor_id == mentor
+        ).action_approve_diagnosis()
+
+    def _setup_doctor_user(self):
+        """Links a doctor-group user to the doctor with most patients."""
+        self.env.cr.execute("""
+            SELECT personal_doctor_id FROM hr_hospital_patient
+             WHERE personal_doctor_id IS NOT NULL
+             GROUP BY personal_doctor_id ORDER BY count(*) DESC LIMIT 1
+        """)
+        row = self.env.cr.fetchone()
+        user = self.env['res.users'].sudo().create({
+            'name': 'Benchmark Doctor',
+            'login': 'hr_hospital_benchmark_doctor',
+            'groups_id': [(6, 0, [
+                self.env.ref('hr_hospital.group_hospital_doctor').id])],
+        })
+        if row:
+            self.env['hr.hospital.doctor'].browse(row[0]).user_id = user
+        return user
+
+    def _flow_list_views(self, user=None):
+        """First page of the patient, visit and diagnosis lists."""
+        # Без користувача читаємо як суперкористувач, тобто без правил
+        env = self.with_user(user).env if user else self.sudo().env
+        for model, field_names in LIST_VIEW_FIELDS.items():
+            env[model].search_read([], field_names, limit=80)
+
+    @staticmethod
+    def _make_photo(seed):
+        rnd = random.Random(seed)
+        image = Image.new('RGB', (1920, 1440), tuple(
+            rnd.randint(0, 255) for _channel in range(3)))
+        output = io.BytesIO()
+        image.save(output, format='JPEG')
+        return base64.b64encode(output.getvalue())
+
+    def _flow_photo_import(self, size, deferred):
+        photos = [self._make_photo(index) for index in range(size)]
+        self.env['hr.hospital.patient'].with_context(
+            hr_hospital_defer_images=deferred,
+        ).create([{
+            'first_name': 'Bench',
+            'last_name': f'Photo {index}',
+            'image_1920': photos[index],
+        } for index in range(size)])
+
+    def _booking_worker(self, seed, attempts, doctor_ids, patient_ids,
+                        day, booked_ids, stats):
+        """Books random slots in its own cursor, committing every booking."""
+        rnd = random.Random(seed)
+        with self.pool.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            visit_env = env['hr.hospital.patient.visit']
+            for _attempt in range(attempts):
+                visits, rejected = visit_env.book_visits([{
+                    'doctor_id': rnd.choice(doctor_ids),
+                    'patient_id': rnd.choice(patient_ids),
+                    # 16 півгодинних слотів з 9:00
+                    'visit_date': day + timedelta(
+                        hours=9, minutes=30 * rnd.randrange(16)),
+                    'duration': rnd.choice([30, 60]),
+                }])
+                cr.commit()
+                with stats['lock']:
+                    booked_ids.extend(visits.ids)
+                    stats['rejected'] += len(rejected)
+
+    @api.model
+    def run_booking_stress(self, thread_count=8, attempts=50,
+                           doctor_count=5, doctor_ids=None, patient_ids=None):
+        """
+        Hammers the booking API from several threads, each with its own
+        cursor, and verifies that no doctor ended up double-booked.
+        Unlike run(), bookings are committed; they are deleted at the end.
+        Used by the 'hr_hospital_stress' test and from 'odoo-bin shell'.
+        """
+        doctor_ids = doctor_ids or self.env['hr.hospital.doctor'].search(
+            [], limit=doctor_count).ids
+        patient_ids = patient_ids or self.env['hr.hospital.patient'].search(
+            [], limit=200).ids
+        if not doctor_ids or not patient_ids:
+            raise UserError(_("Generate benchmark data first."))
+        # День далеко в майбутньому, щоб не зачепити реальні записи
+        day = datetime.combine(
+            fields.Date.context_today(self) + timedelta(days=3650),
+            datetime.min.time())
+        booked_ids = []
+        stats = {'lock': threading.Lock(), 'rejected': 0}
+        threads = [threading.Thread(
+            target=self._booking_worker,
+            args=(index, attempts, doctor_ids, patient_ids, day,
+                  booked_ids, stats)) for index in range(thread_count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - started
+
+        with self.pool.cursor() as cr:
+            cr.execute("""
+                SELECT count(*)
+                  FROM hr_hospital_patient_visit a
+                  JOIN hr_hospital_patient_visit b
+                    ON a.doctor_id = b.doctor_id AND a.id < b.id
+                   AND tsrange(a.visit_date, a.visit_date +
+                               a.duration * interval '1 minute', '[)') &&
+                       tsrange(b.visit_date, b.visit_date +
+                               b.duration * interval '1 minute', '[)')
+                 WHERE a.id = ANY(%(ids)s) AND b.id = ANY(%(ids)s)
+            """, {'ids': booked_ids})
+            conflicts = cr.fetchone()[0]
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            env['hr.hospital.patient.visit'].browse(booked_ids).unlink()
+
+        result = {
+            'attempts': thread_count * attempts,
+            'booked': len(booked_ids),
+            'rejected': stats['rejected'],
+            'conflicts': conflicts,
+            'bookings_per_second': thread_count * attempts / duration,
+        }
+        _logger.info("Booking stress test: %s", result)
+        if conflicts:
+            raise UserError(_("Double-booking detected: %s overlapping "
+                              "visits.", conflicts))
+        return result
+
+    @api.model
+    def run(self, patient_batch=100, photo_batch=20):
+        """
+        Runs all benchmark flows against the current database and returns
+        the stored results. Used by the 'hr_hospital_benchmark' test and
+        from 'odoo-bin shell'.
+        """
+        doctors = self.env['hr.hospital.doctor'].search(
+            [('is_intern', '=', False)])
+        if len(doctors) < 2:
+            raise UserError(_("Generate benchmark data first."))
+        scale = str(self.env['hr.hospital.patient'].search_count([]))
+
+        flows = [
+            ('patient_create_with_history',
+             lambda: self._flow_patient_create(doctors, patient_batch)),
+            ('mass_reassign', lambda: self._flow_mass_reassign(doctors)),
+            ('schedule_generation',
+             lambda: self._flow_schedule_generation(doctors)),
+            ('photo_import_sync',
+             lambda: self._flow_photo_import(photo_batch, False)),
+            ('photo_import_deferred',
+             lambda: self._flow_photo_import(photo_batch, True)),
+            ('disease_report', self._flow_disease_report),
+            ('card_export', self._flow_card_export),
+            ('doctor_at', self._flow_doctor_at),
+            ('diagnosis_approval', self._flow_diagnosis_approval),
+            ('list_rules_off', self._flow_list_views),
+            ('list_rules_on', self._flow_list_views,
+             self._setup_doctor_user),
+        ]
+        results = self.env['hr.hospital.benchmark.result']
+        for flow, *funcs in flows:
+            results |= self._measure(flow, scale, *funcs)
+            _logger.info("Benchmark %s: %.2f ms, %s queries", flow,
+                         results[-1].duration, results[-1].query_count)
+        return results
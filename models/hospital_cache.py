@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Version keys for the hr_hospital ormcaches."""
+
+from odoo import models, api
+
+CACHE_VERSION_TABLE = 'hr_hospital_cache_version'
+
+
+class HospitalCacheVersion(models.AbstractModel):
+    """
+    Named cache versions stored in the database. Cached methods take the
+    current version as part of their ormcache key, and writers bump it,
+    so only that cache goes stale instead of clearing the whole registry
+    cache in every worker with clear_caches().
+
+    Versions are taken from a sequence, so a bumped version is never
+    reused even if its transaction rolls back.
+    """
+    _name = 'hr.hospital.cache.version'
+    _description = 'Hospital Cache Versions'
+
+    def init(self):
+        self._cr.execute(f"""
+            CREATE SEQUENCE IF NOT EXISTS {CACHE_VERSION_TABLE}_seq;
+            CREATE TABLE IF NOT EXISTS {CACHE_VERSION_TABLE} (
+                name varchar PRIMARY KEY,
+                version int8 NOT NULL
+            )
+        """)
+
+    @api.model
+    def get(self, *names):
+        """Current versions of the given caches, in the same order."""
+        self.env.cr.execute(f"""
+            SELECT name, version FROM {CACHE_VERSION_TABLE}
+             WHERE name = ANY(%s)
+        """, [list(names)])
+        versions = dict(self.env.cr.fetchall())
+        return tuple(versions.get(name, 0) for name in names)
+
+    @api.model
+    def bump(self, *names):
+        """Invalidates the given caches in all workers."""
+        names = sorted(set(names))
+        if not names:
+            return
+        # Упорядковано, щоб паралельні транзакції не зайшли в deadlock
+        self.env.cr.execute(f"""
+            INSERT INTO {CACHE_VERSION_TABLE} (name, version)
+            SELECT name, nextval('{CACHE_VERSION_TABLE}_seq')
+              FROM unnest(%s::varchar[]) AS name
+            ON CONFLICT (name) DO UPDATE SET version = EXCLUDED.version
+        """, [names])
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Large HTML bodies kept out of the hot visit and diagnosis rows."""
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from odoo import models, tools
+
+CONTENT_TABLE = 'hr_hospital_content'
+
+
+def content_join(alias, res_model, field_name, res_alias):
+    """SQL join fetching one body field for the rows of 'res_alias'."""
+    return (f"LEFT JOIN {CONTENT_TABLE} {alias} "
+            f"ON {alias}.res_model = '{res_model}' "
+            f"AND {alias}.field_name = '{field_name}' "
+            f"AND {alias}.res_id = {res_alias}.id")
+
+
+class HospitalContentMixin(models.AbstractModel):
+    """
+    Stores the '_content_fields' of a model in a shared, compressed
+    content table. The fields are computed from that table only when
+    they are actually read, so list views, reports and prefetching of
+    the records never load the bodies.
+    """
+    _name = 'hr.hospital.content.mixin'
+    _description = 'Offloaded HTML Content'
+
+    # Поля, що зберігаються в таблиці вмісту
+    _content_fields = ()
+
+    def init(self):
+        """Creates the content table and moves the inline columns into it."""
+        # Архівний модуль сам імпортує цей, тому імпорт локальний
+        from .hospital_archive import ARCHIVE_TABLES
+        cr = self._cr
+        if not tools.table_exists(cr, CONTENT_TABLE):
+            cr.execute(f"""
+                CREATE TABLE {CONTENT_TABLE} (
+                    res_model varchar NOT NULL,
+                    field_name varchar NOT NULL,
+                    res_id int4 NOT NULL,
+                    body text NOT NULL,
+                    PRIMARY KEY (res_model, field_name, res_id)
+                )
+            """)
+            # lz4 стискає швидше за стандартний pglz (PostgreSQL 14+)
+            if cr._cnx.server_version >= 140000:
+                try:
+                    with cr.savepoint(), tools.mute_logger('odoo.sql_db'):
+                        cr.execute(f"ALTER TABLE {CONTENT_TABLE} ALTER "
+                                   f"COLUMN body SET COMPRESSION lz4")
+                except psycopg2.Error:
+                    pass
+        for field_name in self._content_fields:
+            for table in (self._table, ARCHIVE_TABLES.get(self._table)):
+                if table and tools.column_exists(cr, table, field_name):
+                    cr.execute(f"""
+                        INSERT INTO {CONTENT_TABLE}
+                               (res_model, field_name, res_id, body)
+                        SELECT %s, %s, id, "{field_name}" FROM {table}
+                         WHERE COALESCE("{field_name}", '') != ''
+                        ON CONFLICT DO NOTHING
+                    """, [self._name, field_name])
+                    cr.execute(f'ALTER TABLE {table} '
+                               f'DROP COLUMN "{field_name}"')
+
+    def _compute_content(self):
+        """Reads the bodies of all records being computed in one query."""
+        ids = [record_id for record_id in self._origin.ids if record_id]
+        bodies = {}
+        if ids:
+            self.env.cr.execute(f"""
+                SELECT res_id, field_name, body FROM {CONTENT_TABLE}
+                 WHERE res_model = %s AND field_name = ANY(%s)
+                   AND res_id = ANY(%s)
+            """, [self._name, list(self._content_fields), ids])
+            bodies = {(res_id, field_name): body for res_id, field_name, body
+                      in self.env.cr.fetchall()}
+        for record in self:
+            for field_name in self._content_fields:
+                record[field_name] = bodies.get(
+                    (record._origin.id, field_name), False)
+
+    def _inverse_content(self):
+        """Upserts the changed bodies and drops the emptied ones."""
+        rows = []
+        emptied = {field_name: [] for field_name in self._content_fields}
+        for record in self.filtered('id'):
+            for field_name in self._content_fields:
+                body = record[field_name]
+                if body:
+                    rows.append((self._name, field_name, record.id, str(body)))
+                else:
+                    emptied[field_name].append(record.id)
+        if rows:
+            execute_values(self.env.cr._obj, f"""
+                INSERT INTO {CONTENT_TABLE}
+                       (res_model, field_name, res_id, body)
+                VALUES %s
+                ON CONFLICT (res_model, field_name, res_id)
+                DO UPDATE SET body = EXCLUDED.body
+            """, rows)
+        for field_name, ids in emptied.items():
+            if ids:
+                self.env.cr.execute(f"""
+                    DELETE FROM {CONTENT_TABLE}
+                     WHERE res_model = %s AND field_name = %s
+                       AND res_id = ANY(%s)
+                """, [self._name, field_name, ids])
+
+    def unlink(self):  # Override
+        """Deletes the bodies together with the records."""
+        ids = self.ids
+        result = super().unlink()
+        if ids:
+            self.env.cr.execute(f"""
+                DELETE FROM {CONTENT_TABLE}
+                 WHERE res_model = %s AND res_id = ANY(%s)
+            """, [self._name, ids])
+        return result
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Bulk ingestion of visits with diagnoses from external systems."""
+
+import json
+
+import psycopg2
+
+from odoo import models, fields, api, tools, _
+from odoo.exceptions import UserError, ValidationError
+
+from .hospital_archive import with_archive
+
+INGEST_CHUNK_SIZE = 500
+
+
+class HospitalIngest(models.AbstractModel):
+    """
+    Creates visits with nested diagnoses in bulk. Rows reference patients
+    and doctors by external id (or doctor licence number) and diseases by
+    ICD-10 code; an optional idempotency key makes retries cheap.
+
+    Row format::
+
+        {"idempotency_key": "lab-42", "patient": "lab.patient_7",
+         "doctor": "lab.doctor_3" | "doctor_license": "LIC-1",
+         "visit_date": "2024-05-01 10:00:00", "duration": 30,
+         "visit_type": "primary", "status": "completed", "cost": 500,
+         "diagnoses": [{"icd10": "J10", "severity": "medium",
+                        "description": "...", "treatment": "..."}]}
+    """
+    _name = 'hr.hospital.ingest'
+    _description = 'Hospital Bulk Ingestion'
+
+    @api.model
+    def _resolve_xmlids(self, model, refs):
+        """Returns {'module.name': res_id} for the given external ids."""
+        pairs = {tuple(ref.split('.', 1)) for ref in refs
+                 if isinstance(ref, str) and '.' in ref}
+        if not pairs:
+            return {}
+        self.env.cr.execute("""
+            SELECT module, name, res_id FROM ir_model_data
+             WHERE model = %s AND (module, name) IN %s
+        """, [model, tuple(pairs)])
+        return {f'{module}.{name}': res_id
+                for module, name, res_id in self.env.cr.fetchall()}
+
+    @api.model
+    def _resolve_references(self, rows):
+        """Resolves every reference of the payload with a few queries."""
+        refs = {'patient': set(), 'doctor': set(), 'license': set(),
+                'icd10': set(), 'key': set()}
+        for row in rows:
+            if not isinstance(row, dict):
+                continue
+            refs['patient'].add(row.get('patient'))
+            refs['doctor'].add(row.get('doctor'))
+            refs['license'].add(row.get('doctor_license'))
+            refs['key'].add(row.get('idempotency_key'))
+            for diag in row.get('diagnoses') or []:
+                if isinstance(diag, dict):
+                    refs['icd10'].add(diag.get('icd10'))
+        refs = {name: [ref for ref in values if ref and isinstance(ref, str)]
+                for name, values in refs.items()}
+
+        licenses = {}
+        if refs['license']:
+            for doctor in self.env['hr.hospital.doctor'].search_read(
+                    [('license_number', 'in', refs['license'])],
+                    ['license_number']):
+                licenses[doctor['license_number']] = doctor['id']
+        diseases = {}
+        if refs['icd10']:
+            for disease in self.env['hr.hospital.disease'].search_read(
+                    [('code_icd10', 'in', refs['icd10'])], ['code_icd10']):
+                diseases.setdefault(disease['code_icd10'], disease['id'])
+        return {
+            'patients': self._resolve_xmlids('hr.hospital.patient',
+                                             refs['patient']),
+            'doctors': self._resolve_xmlids('hr.hospital.doctor',
+                                            refs['doctor']),
+            'licenses': licenses,
+            'diseases': diseases,
+            'keys': self._find_keys(refs['key']),
+        }
+
+    @api.model
+    def _find_keys(self, keys):
+        """Returns {idempotency key: visit id}, archived visits included."""
+        if not keys:
+            return {}
+        self.env['hr.hospital.patient.visit'].flush_model(['ingest_key'])
+        visits = with_archive('hr_hospital_patient_visit',
+                              ['id', 'ingest_key'])
+        self.env.cr.execute(f"""
+            SELECT ingest_key, id FROM {visits} v
+             WHERE ingest_key = ANY(%s)
+        """, [list(keys)])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _prepare_visit_vals(self, row, refs, seen):
+        """Validates one row and returns the visit values to create."""
+        if not isinstance(row, dict):
+            raise ValidationError(_("Each line must be a JSON object."))
+        visit_env = self.env['hr.hospital.patient.visit']
+        diag_env = self.env['medical.diagnosis']
+
+        patient_id = refs['patients'].get(row.get('patient'))
+        if not patient_id:
+            raise ValidationError(_("Unknown patient: %s", row.get('patient')))
+        doctor_id = refs['doctors'].get(row.get('doctor')) or \
+            refs['licenses'].get(row.get('doctor_license'))
+        if not doctor_id:
+            raise ValidationError(_("Unknown doctor: %s", row.get('doctor') or
+                                    row.get('doctor_license')))
+        try:
+            visit_date = fields.Datetime.to_datetime(row.get('visit_date'))
+        except (TypeError, ValueError):
+            visit_date = None
+        if not visit_date:
+            raise ValidationError(_("Invalid visit date: %s",
+                                    row.get('visit_date')))
+
+        vals = {
+            'patient_id': patient_id,
+            'doctor_id': doctor_id,
+            'visit_date': visit_date,
+            'ingest_key': row.get('idempotency_key') or False,
+        }
+        for name in ('status', 'visit_type'):
+            if row.get(name) is not None:
+                allowed = dict(visit_env._fields[name].selection)
+                if row[name] not in allowed:
+                    raise ValidationError(_("Invalid %s: %s", name, row[name]))
+                vals[name] = row[name]
+        for name in ('duration', 'cost'):
+            if row.get(name) is not None:
+                if not isinstance(row[name], (int, float)):
+                    raise ValidationError(_("Invalid %s: %s", name, row[name]))
+                vals[name] = row[name]
+
+        # Дублікати всередині одного пакета
+        day_key = (patient_id, doctor_id,
+                   visit_env._visit_day_of(visit_date))
+        if day_key in seen['days'] or vals['ingest_key'] in seen['keys']:
+            raise ValidationError(_("Duplicate visit in the payload."))
+
+        severities = dict(diag_env._fields['severity'].selection)
+        diagnoses = []
+        for diag in row.get('diagnoses') or []:
+            if not isinstance(diag, dict):
+                raise ValidationError(_("Invalid diagnosis: %s", diag))
+            disease_id = refs['diseases'].get(diag.get('icd10'))
+            if not disease_id:
+                raise ValidationError(_("Unknown ICD-10 code: %s",
+                                        diag.get('icd10')))
+            if diag.get('severity') and diag['severity'] not in severities:
+                raise ValidationError(_("Invalid severity: %s",
+                                        diag['severity']))
+            diagnoses.append((0, 0, {
+                'disease_id': disease_id,
+                'severity': diag.get('severity') or 'medium',
+                'description': diag.get('description') or False,
+                'treatment': diag.get('treatment') or False,
+            }))
+        if diagnoses:
+            vals['diagnosis_ids'] = diagnoses
+
+        seen['days'].add(day_key)
+        if vals['ingest_key']:
+            seen['keys'].add(vals['ingest_key'])
+        return vals
+
+    @staticmethod
+    def _error_message(error):
+        diag = getattr(error, 'diag', None)
+        if diag is not None and diag.message_primary:
+            return diag.message_primary
+        return str(error.args[0]) if error.args else str(error)
+
+    @api.model
+    def _result(self, visit, status='created'):
+        return {'status': status, 'visit_id': visit.id,
+                'diagnosis_ids': visit.diagnosis_ids.ids}
+
+    @api.model
+    def ingest_visits(self, rows):
+        """
+        Ingests a list of visit rows and returns one result per row:
+        {'status': 'created' | 'duplicate' | 'error', 'visit_id',
+        'diagnosis_ids', 'error'}. Valid rows are created in chunked
+        multi-creates; a failing chunk is retried row by row so one bad
+        row does not reject its neighbours.
+        """
+        visit_env = self.env['hr.hospital.patient.visit']
+        visit_env.check_access_rights('create')
+        results = [None] * len(rows)
+        refs = self._resolve_references(rows)
+        seen = {'days': set(), 'keys': set()}
+        pending = []
+        for index, row in enumerate(rows):
+            key = isinstance(row, dict) and row.get('idempotency_key')
+            if key and key in refs['keys']:
+                results[index] = {'status': 'duplicate',
+                                  'visit_id': refs['keys'][key]}
+                continue
+            try:
+                pending.append((index, self._prepare_visit_vals(
+                    row, refs, seen)))
+            except ValidationError as error:
+                results[index] = {'status': 'error',
+                                  'error': self._error_message(error)}
+
+        errors = (UserError, ValidationError, psycopg2.IntegrityError,
+                  psycopg2.errors.SerializationFailure)
+        for chunk in tools.split_every(INGEST_CHUNK_SIZE, pending, list):
+            try:
+                with self.env.cr.savepoint():
+                    visits = visit_env.create([vals for _index, vals in chunk])
+                for (index, _vals), visit in zip(chunk, visits):
+                    results[index] = self._result(visit)
+                continue
+            except errors:
+                pass
+            for index, vals in chunk:
+                try:
+                    with self.env.cr.savepoint():
+                        results[index] = self._result(visit_env.create(vals))
+                except errors as error:
+                    # Паралельний повтор з тим самим ключем уже встиг
+                    existing = self._find_keys([vals['ingest_key']]) \
+                        if vals['ingest_key'] else {}
+                    results[index] = {
+                        'status': 'duplicate',
+                        'visit_id': existing[vals['ingest_key']],
+                    } if existing else {
+                        'status': 'error',
+                        'error': self._error_message(error),
+                    }
+        return results
+
+    @api.model
+    def ingest_ndjson(self, body):
+        """
+        Ingests an NDJSON body, one visit row per line. Returns one result
+        per non-empty line, in order, each tagged with its 1-based 'line'
+        number; a line that is not valid JSON gets an 'error' result.
+        """
+        lines = []
+        rows = []
+        results = {}
+        for number, line in enumerate(body.splitlines(), 1):
+            if not line.strip():
+                continue
+            lines.append(number)
+            try:
+                rows.append((number, json.loads(line)))
+            except ValueError as error:
+                results[number] = {'status': 'error', 'error': str(error)}
+        ingested = self.ingest_visits([row for _number, row in rows])
+        for (number, _row), result in zip(rows, ingested):
+            results[number] = result
+        return [dict(results[number], line=number) for number in lines]
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""Defines the in-database job queue for heavy wizards."""
+
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+JOB_CHUNK_SIZE = 500
+# Затримка першої повторної спроби; кожна наступна вдвічі довша
+JOB_RETRY_DELAY = 60
+
+
+class HospitalJob(models.Model):
+    """
+    Background job: replays a wizard method from a stored snapshot
+    of the wizard values, optionally chunked over a many2many field.
+    """
+    _name = 'hr.hospital.job'
+    _description = 'Hospital Background Job'
+    _order = 'id desc'
+
+    name = fields.Char(required=True, readonly=True)
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Очікує'),
+            ('done', 'Виконано'),
+            ('failed', 'Помилка'),
+        ],
+        default='pending',
+        required=True,
+        readonly=True,
+        index=True
+    )
+    model_name = fields.Char(required=True, readonly=True)
+    method_name = fields.Char(required=True, readonly=True)
+    vals_json = fields.Text(readonly=True)
+    chunk_field = fields.Char(readonly=True)
+    chunk_ids_json = fields.Text(readonly=True)
+    chunk_size = fields.Integer(default=JOB_CHUNK_SIZE, readonly=True)
+    processed_count = fields.Integer(readonly=True)
+    total_count = fields.Integer(default=1, readonly=True)
+    progress = fields.Float(compute='_compute_progress')
+    attempt_count = fields.Integer(readonly=True)
+    max_retries = fields.Integer(default=3, readonly=True)
+    next_try = fields.Datetime(
+        readonly=True,
+        help="Невдалу спробу буде повторено не раніше цього часу."
+    )
+    error_message = fields.Text(readonly=True)
+    date_done = fields.Datetime(readonly=True)
+    attachment_ids = fields.Many2many(
+        comodel_name='ir.attachment',
+        compute='_compute_attachment_ids',
+        string='Results'
+    )
+
+    def init(self):
+        """Partial index for the worker's pending-job scan."""
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS hr_hospital_job_pending_idx
+                ON hr_hospital_job (id) WHERE state = 'pending'
+        """)
+
+    @api.depends('processed_count', 'total_count', 'state')
+    def _compute_progress(self):
+        for job in self:
+            if job.state == 'done':
+                job.progress = 100.0
+            else:
+                job.progress = 100.0 * job.processed_count / \
+                    (job.total_count or 1)
+
+    def _compute_attachment_ids(self):
+        attachments = self.env['ir.attachment'].search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+        ])
+        for job in self:
+            job.attachment_ids = attachments.filtered(
+                lambda att, job_id=job.id: att.res_id == job_id)
+
+    @api.model
+    def _enqueue(self, wizard, method_name, chunk_field=None):
+        """Stores a wizard snapshot as a job and wakes up the worker."""
+        vals = wizard.copy_data()[0]
+        vals.pop('run_in_background', None)
+        chunk_ids = []
+        if chunk_field:
+            chunk_ids = wizard[chunk_field].ids
+            vals.pop(chunk_field, None)
+        job = self.create({
+            'name': f"{wizard._description}: {method_name}",
+            'model_name': wizard._name,
+            'method_name': method_name,
+            'vals_json': json.dumps(vals, default=str),
+            'chunk_field': chunk_field,
+            'chunk_ids_json': json.dumps(chunk_ids),
+            'total_count': len(chunk_ids) if chunk_field else 1,
+        })
+        self.env.ref('hr_hospital.ir_cron_process_jobs')._trigger()
+        return job
+
+    def _run_chunk(self):
+        """Runs the next chunk of the job as the user who created it."""
+        self.ensure_one()
+        vals = json.loads(self.vals_json or '{}')
+        if self.chunk_field:
+            chunk_ids = json.loads(self.chunk_ids_json or '[]')
+            chunk = chunk_ids[self.processed_count:
+                              self.processed_count + self.chunk_size]
+            vals[self.chunk_field] = [(6, 0, chunk)]
+            done_count = self.processed_count + len(chunk)
+        else:
+            done_count = 1
+
+        env = self.env(user=self.create_uid.id, su=False)
+        wizard = env[self.model_name].create(vals)
+        getattr(wizard, self.method_name)()
+
+        if 'file_data' in wizard._fields and wizard.file_data:
+            self.env['ir.attachment'].create({
+                'name': wizard.file_name or self.name,
+                'datas': wizard.file_data,
+                'res_model': self._name,
+                'res_id': self.id,
+            })
+        return done_count
+
+    @api.model
+    def _cron_process_jobs(self, time_limit=240):
+        """
+        Worker: picks pending jobs with FOR UPDATE SKIP LOCKED and runs one
+        chunk per transaction, so several workers can share the queue.
+        """
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        started = time.monotonic()
+        while time.monotonic() - started < time_limit:
+            self.env.cr.execute("""
+                SELECT id FROM hr_hospital_job
+                 WHERE state = 'pending'
+                   AND (next_try IS NULL
+                        OR next_try <= (now() at time zone 'UTC'))
+                 ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """)
+            row = self.env.cr.fetchone()
+            if not row:
+                break
+            job = self.browse(row[0])
+            try:
+                with self.env.cr.savepoint():
+                    done_count = job._run_chunk()
+            except Exception as error:  # pylint: disable=broad-except
+                _logger.exception("Hospital job %s failed", job.id)
+                job._schedule_retry(error)
+            else:
+                job_vals = {'processed_count': done_count,
+                            'error_message': False, 'next_try': False}
+                if done_count >= job.total_count:
+                    job_vals.update(state='done',
+                                    date_done=fields.Datetime.now())
+                job.write(job_vals)
+            if auto_commit:
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+            else:
+                break
+
+    def _schedule_retry(self, error):
+        """
+        Records a failed attempt and puts the job back into the queue
+        after an exponentially growing delay, or marks it failed.
+        """
+        self.ensure_one()
+        attempt_count = self.attempt_count + 1
+        if attempt_count >= self.max_retries:
+            self.write({'attempt_count': attempt_count,
+                        'error_message': str(error),
+                        'state': 'failed',
+                        'next_try': False})
+            return
+        next_try = fields.Datetime.now() + timedelta(
+            seconds=JOB_RETRY_DELAY * 2 ** (attempt_count - 1))
+        self.write({'attempt_count': attempt_count,
+                    'error_message': str(error),
+                    'state': 'pending',
+                    'next_try': next_try})
+        self.env.ref('hr_hospital.ir_cron_process_jobs')._trigger(next_try)
+
+    def action_retry(self):
+        """Puts failed jobs back into the queue."""
+        self.filtered(lambda job: job.state == 'failed').write({
+            'state': 'pending',
+            'attempt_count': 0,
+            'next_try': False,
+        })
+        self.env.ref('hr_hospital.ir_cron_process_jobs')._trigger()
+        return True
+
+
+class HospitalBackgroundMixin(models.AbstractModel):
+    """Adds the 'run in background' option to wizards."""
+    _name = 'hr.hospital.background.mixin'
+    _description = 'Hospital Background Wizard Mixin'
+
+    run_in_background = fields.Boolean(
+        help="Виконати у фоні: майстер одразу закриється, "
+             "а прогрес буде видно в меню 'Background Jobs'."
+    )
+
+    def _run_in_background(self, method_name, chunk_field=None):
+        """Enqueues the wizard method and returns an action on the job."""
+        self.ensure_one()
+        job = self.env['hr.hospital.job']._enqueue(
+            self, method_name, chunk_field=chunk_field)
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Background Job'),
+            'res_model': 'hr.hospital.job',
+            'view_mode': 'form',
+            'res_id': job.id,
+            'target': 'current',
+        }
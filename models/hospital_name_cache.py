@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Per-language cache of translated record names."""
+
+from odoo import models, api, tools
+
+
+class HospitalNameCacheMixin(models.AbstractModel):
+    """
+    Caches {id: translated name} of the whole model per language, so
+    exports, reports and display names resolve every distinct name once
+    instead of extracting it from the jsonb column row by row. The cache
+    is keyed by a cache version named after the model, which any change
+    of the names bumps.
+    """
+    _name = 'hr.hospital.name.cache.mixin'
+    _description = 'Translated Name Cache'
+
+    @api.model
+    @tools.ormcache('lang', 'version')
+    def _get_name_map(self, lang, version):
+        """{id: name in lang, falling back to English} of all records."""
+        self.flush_model(['name'])
+        self.env.cr.execute(f"""
+            SELECT id, COALESCE(name->>%s, name->>'en_US') FROM {self._table}
+        """, [lang])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _get_name_version(self):
+        version, = self.env['hr.hospital.cache.version'].get(self._name)
+        return version
+
+    @api.model
+    def _bump_name_version(self):
+        self.env['hr.hospital.cache.version'].bump(self._name)
+
+    @api.model
+    def get_translated_names(self, ids, lang=None):
+        """Bulk accessor: {id: translated name} for the given ids."""
+        names = self._get_name_map(lang or self.env.lang or 'en_US',
+                                   self._get_name_version())
+        return {record_id: names.get(record_id) for record_id in ids
+                if record_id}
+
+    def name_get(self):  # Override
+        """Display names served from the per-language cache."""
+        names = self._get_name_map(self.env.lang or 'en_US',
+                                   self._get_name_version())
+        missing = self.filtered(lambda record: record.id not in names)
+        result = dict(super(HospitalNameCacheMixin, missing).name_get()) \
+            if missing else {}
+        return [(record.id, result.get(record.id, names.get(record.id)))
+                for record in self]
+
+    @api.model_create_multi
+    def create(self, vals_list):  # Override
+        records = super().create(vals_list)
+        self._bump_name_version()
+        return records
+
+    def write(self, vals):  # Override
+        result = super().write(vals)
+        if 'name' in vals:
+            self._bump_name_version()
+        return result
+
+    def unlink(self):  # Override
+        result = super().unlink()
+        self._bump_name_version()
+        return result
+
+    def update_field_translations(self, field_name, translations,
+                                  digest=None):  # Override
+        result = super().update_field_translations(
+            field_name, translations, digest=digest)
+        if field_name == 'name':
+            self._bump_name_version()
+        return result
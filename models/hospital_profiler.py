@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Defines the opt-in profiler for hr_hospital hot paths."""
+
+import functools
+import logging
+import threading
+import time
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+PROFILING_PARAM = 'hr_hospital.profiling_enabled'
+BUFFER_SIZE_PARAM = 'hr_hospital.profiling_buffer_size'
+DEFAULT_BUFFER_SIZE = 1000
+
+
+def _profiling_enabled(env):
+    # get_param is ormcached, so a disabled profiler costs one dict lookup
+    value = env['ir.config_parameter'].sudo().get_param(PROFILING_PARAM)
+    return value in ('1', 'True', 'true')
+
+
+def profiled(operation):
+    """
+    Decorator: records query count, SQL time, Python time and recordset
+    size of a model method into 'hr.hospital.profile.log', also when the
+    method raises. Does nothing unless the 'hr_hospital.profiling_enabled'
+    parameter is set.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not _profiling_enabled(self.env):
+                return method(self, *args, **kwargs)
+
+            thread = threading.current_thread()
+            cr = self.env.cr
+            query_count = cr.sql_log_count
+            query_time = getattr(thread, 'query_time', 0.0)
+            started = time.perf_counter()
+            result = None
+            is_error = True
+            try:
+                result = method(self, *args, **kwargs)
+                is_error = False
+                return result
+            finally:
+                total_time = time.perf_counter() - started
+                sql_time = getattr(thread, 'query_time', 0.0) - query_time
+                records = result if isinstance(result, models.BaseModel) \
+                    and not self else self
+                vals = {
+                    'operation': operation,
+                    'model': self._name,
+                    'query_count': cr.sql_log_count - query_count,
+                    'sql_time': sql_time * 1000,
+                    'python_time': max(total_time - sql_time, 0.0) * 1000,
+                    'record_count': len(records),
+                    'is_error': is_error,
+                }
+                if is_error:
+                    self.env['hr.hospital.profile.log']._log_failure(vals)
+                else:
+                    self.env['hr.hospital.profile.log']._log(vals)
+        return wrapper
+    return decorator
+
+
+class HospitalProfileLog(models.Model):
+    """Ring buffer of profiled hr_hospital operations."""
+    _name = 'hr.hospital.profile.log'
+    _description = 'Hospital Profile Log'
+    _order = 'id desc'
+    _log_access = False
+
+    create_date = fields.Datetime(default=fields.Datetime.now, readonly=True)
+    operation = fields.Char(required=True, readonly=True)
+    model = fields.Char(readonly=True)
+    user_id = fields.Many2one(
+        comodel_name='res.users',
+        default=lambda self: self.env.uid,
+        readonly=True
+    )
+    query_count = fields.Integer(readonly=True)
+    sql_time = fields.Float(string='SQL Time (ms)', digits=(16, 2),
+                            readonly=True)
+    python_time = fields.Float(string='Python Time (ms)', digits=(16, 2),
+                               readonly=True)
+    record_count = fields.Integer(readonly=True)
+    is_error = fields.Boolean(string='Failed', readonly=True)
+
+    @api.model
+    def _log(self, vals):
+        """Stores one measurement and trims the buffer to its size."""
+        buffer_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            BUFFER_SIZE_PARAM, DEFAULT_BUFFER_SIZE))
+        record = self.sudo().create(vals)
+        _logger.debug("%s on %s: %s queries, %.2f ms SQL, %.2f ms Python, "
+                      "%s records", vals['operation'], vals['model'],
+                      vals['query_count'], vals['sql_time'],
+                      vals['python_time'], vals['record_count'])
+        self.env.cr.execute(
+            "DELETE FROM hr_hospital_profile_log WHERE id <= %s",
+            [record.id - buffer_size])
+        return record
+
+    @api.model
+    def _log_failure(self, vals):
+        """
+        Stores the measurement of a failed call in its own cursor: the
+        caller's transaction is aborted or about to be rolled back.
+        Never raises, so the original error is not masked.
+        """
+        try:
+            with self.pool.cursor() as cr:
+                self.with_env(self.env(cr=cr))._log(vals)
+        except Exception:  # pylint: disable=broad-except
+            _logger.warning("Could not log the failed %s on %s",
+                            vals['operation'], vals['model'], exc_info=True)
@@ -1,20 +1,40 @@
 # -*- coding: utf-8 -*-
 """This file defines the Medical Diagnosis model."""
 
-from odoo import models, fields, api, _
+import logging
+import threading
+from collections import Counter
+
+from psycopg2.extras import execute_values
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError
 
+from .allergen import normalize_text
+from .hospital_content import content_join
+from .hospital_profiler import profiled
+
+_logger = logging.getLogger(__name__)
+
+ALLERGY_SCREEN_BATCH_SIZE = 5000
+
 
 class MedicalDiagnosis(models.Model):
     """Model for storing medical diagnoses linked to a patient visit."""
     _name = 'medical.diagnosis'
+    _inherit = ['hr.hospital.access.mixin', 'hr.hospital.content.mixin']
     _description = 'Medical Diagnosis'
     _rec_name = 'disease_id'
+    _content_fields = ('treatment',)
+    _access_doctor_path = 'visit_id.doctor_id'
+    _access_doctor_sql = ('(SELECT v.doctor_id FROM hr_hospital_patient_visit v'
+                          ' WHERE v.id = t.visit_id)')
 
     visit_id = fields.Many2one(
         comodel_name='hr.hospital.patient.visit',
         string='Patient Visit',
         ondelete='restrict',
+        index=True,
         domain="["
                "('status', '=', 'completed'),"
                "('visit_date', '>=', (context_today() - "
@@ -28,7 +48,12 @@ class MedicalDiagnosis(models.Model):
         domain="[('is_contagious', '=', True), ('danger_level', 'in', ['high', 'critical'])]"
     )
     description = fields.Text(string='Diagnosis Description')
-    treatment = fields.Html(string='Assigned Treatment')
+    treatment = fields.Html(
+        string='Assigned Treatment',
+        compute='_compute_content',
+        inverse='_inverse_content',
+        copy=True
+    )
     is_approved = fields.Boolean(default=False)
     approving_doctor_id = fields.Many2one(
         comodel_name='hr.hospital.doctor',
@@ -60,6 +85,64 @@ class MedicalDiagnosis(models.Model):
         store=True
     )
 
+    # Черга затвердження: хто відповідає за діагноз
+    approver_id = fields.Many2one(
+        comodel_name='hr.hospital.doctor',
+        string='Responsible Approver',
+        compute='_compute_approver_id',
+        store=True,
+        index=True
+    )
+    is_pending = fields.Boolean(
+        string='Pending Approval',
+        compute='_compute_is_pending',
+        store=True
+    )
+
+    # Скринінг призначеного лікування на алергії пацієнта
+    allergy_conflict_ids = fields.Many2many(
+        comodel_name='hr.hospital.allergen',
+        relation='medical_diagnosis_allergen_conflict_rel',
+        column1='diagnosis_id',
+        column2='allergen_id',
+        string='Allergy Conflicts',
+        readonly=True,
+        copy=False
+    )
+    has_allergy_conflict = fields.Boolean(readonly=True, copy=False)
+    allergy_screen_version = fields.Integer(default=0, readonly=True,
+                                            copy=False)
+
+    def init(self):
+        """Partial indexes for the approval queue and allergy re-screening."""
+        # Рядки, вставлені SQL без версії скринінгу, мають потрапити в чергу
+        self._cr.execute("""
+            UPDATE medical_diagnosis SET allergy_screen_version = 0
+             WHERE allergy_screen_version IS NULL
+        """)
+        tools.create_index(
+            self._cr, 'medical_diagnosis_pending_approver_idx', self._table,
+            ['approver_id', 'visit_date'], where='is_pending'
+        )
+        tools.create_index(
+            self._cr, 'medical_diagnosis_pending_screen_idx', self._table,
+            ['allergy_screen_version', 'id'], where='is_pending'
+        )
+
+    @api.depends('visit_id.doctor_id', 'visit_id.doctor_id.is_intern',
+                 'visit_id.doctor_id.mentor_id')
+    def _compute_approver_id(self):
+        """Interns' diagnoses go to their mentor, others to the doctor."""
+        for record in self:
+            doctor = record.visit_id.doctor_id
+            record.approver_id = doctor.mentor_id if doctor.is_intern \
+                else doctor
+
+    @api.depends('is_approved')
+    def _compute_is_pending(self):
+        for record in self:
+            record.is_pending = not record.is_approved
+
     @api.constrains('approval_date', 'visit_id.visit_date')
     def _check_approval_date(self):
         """Validator: Approval date cannot be earlier than the visit date."""
@@ -69,6 +152,7 @@ class MedicalDiagnosis(models.Model):
                 raise UserError(_("Approval date cannot be earlier than "
                                   "the visit date."))
 
+    @profiled('diagnosis.approve')
     def action_approve_diagnosis(self):
         """Business Logic: Approves the diagnosis."""
         current_doctor = self.env['hr.hospital.doctor'].search([
@@ -98,3 +182,178 @@ class MedicalDiagnosis(models.Model):
                 'approval_date': fields.Datetime.now(),
             })
         return True
+
+    @api.model
+    def get_approval_queue(self, limit=50):
+        """
+        Work queue of the current user's doctor as mentor: oldest pending
+        diagnoses plus totals by severity, in one query. Only diagnoses
+        the user may read under the record rules are returned.
+        """
+        approver_id = self.env['hr.hospital.doctor'].search([
+            ('user_id', '=', self.env.uid)
+        ], limit=1).id
+        result = {'total': 0, 'by_severity': {}, 'items': []}
+        if not approver_id:
+            return result
+        self.check_access_rights('read')
+        self.flush_model(['approver_id', 'is_pending', 'severity',
+                          'visit_date'])
+        # Лічильники рахуються один раз (InitPlan) для всієї черги
+        self.env.cr.execute("""
+            SELECT d.id, d.severity, d.visit_date, d.disease_id,
+                   v.doctor_id, v.patient_id,
+                   (SELECT json_object_agg(COALESCE(s.severity, ''), s.cnt)
+                      FROM (SELECT severity, count(*) AS cnt
+                              FROM medical_diagnosis
+                             WHERE approver_id = %(approver)s AND is_pending
+                             GROUP BY severity) s) AS by_severity
+              FROM medical_diagnosis d
+              JOIN hr_hospital_patient_visit v ON v.id = d.visit_id
+             WHERE d.approver_id = %(approver)s AND d.is_pending
+             ORDER BY d.visit_date, d.id
+             LIMIT %(limit)s
+        """, {'approver': approver_id, 'limit': limit})
+        rows = self.env.cr.dictfetchall()
+        readable = set(self.browse([row['id'] for row in rows])
+                       ._filter_access_rules('read').ids)
+        for row in rows:
+            result['by_severity'] = row.pop('by_severity')
+            if row['id'] in readable:
+                result['items'].append(row)
+        result['total'] = sum(result['by_severity'].values())
+        return result
+
+    def _screen_allergies(self, version=None):
+        """
+        Matches the treatment text against the patient's allergens.
+
+        Treatments, patient allergens and results are read and written
+        with a few set-based queries, so whole batches are screened at once.
+        """
+        if not self:
+            return 0
+        allergen_env = self.env['hr.hospital.allergen']
+        version = version or allergen_env._get_catalogue_version()
+        matcher = allergen_env._get_matcher(version)
+        self.flush_recordset(['visit_id'])
+        self.env['hr.hospital.patient'].flush_model(['allergen_ids'])
+        self.env.cr.execute(f"""
+            SELECT d.id, c.body,
+                   array_remove(array_agg(pa.allergen_id), NULL)
+              FROM medical_diagnosis d
+              {content_join('c', self._name, 'treatment', 'd')}
+              LEFT JOIN hr_hospital_patient_visit v ON v.id = d.visit_id
+              LEFT JOIN hr_hospital_patient_allergen_rel pa
+                     ON pa.patient_id = v.patient_id
+             WHERE d.id = ANY(%s)
+             GROUP BY d.id, c.body
+        """, [self.ids])
+        conflicts = []
+        flagged = []
+        for diagnosis_id, treatment, allergen_ids in self.env.cr.fetchall():
+            # Без алергенів у пацієнта текст навіть не розбираємо
+            if not allergen_ids or not matcher:
+                continue
+            found = matcher.find(normalize_text(treatment))
+            found.intersection_update(allergen_ids)
+            if found:
+                flagged.append(diagnosis_id)
+                conflicts.extend((diagnosis_id, allergen_id)
+                                 for allergen_id in found)
+        self.env.cr.execute("""
+            DELETE FROM medical_diagnosis_allergen_conflict_rel
+             WHERE diagnosis_id = ANY(%s)
+        """, [self.ids])
+        if conflicts:
+            execute_values(self.env.cr._obj, """
+                INSERT INTO medical_diagnosis_allergen_conflict_rel
+                       (diagnosis_id, allergen_id) VALUES %s
+            """, conflicts)
+        self.env.cr.execute("""
+            UPDATE medical_diagnosis
+               SET has_allergy_conflict = id = ANY(%s),
+                   allergy_screen_version = %s
+             WHERE id = ANY(%s)
+        """, [flagged, version, self.ids])
+        self.invalidate_recordset(['allergy_conflict_ids',
+                                   'has_allergy_conflict',
+                                   'allergy_screen_version'])
+        return len(flagged)
+
+    @api.model
+    def _cron_rescreen_allergies(self, batch_size=ALLERGY_SCREEN_BATCH_SIZE):
+        """
+        Cron: re-screens open treatments after the allergen catalogue
+        changed. Only diagnoses screened with an older version are
+        processed, so an interrupted run simply continues.
+        """
+        version = self.env['hr.hospital.allergen']._get_catalogue_version()
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        total = flagged = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM medical_diagnosis
+                 WHERE is_pending AND allergy_screen_version < %s
+                 ORDER BY id
+                 LIMIT %s
+            """, [version, batch_size])
+            ids = [row[0] for row in self.env.cr.fetchall()]
+            if not ids:
+                break
+            flagged += self.browse(ids)._screen_allergies(version)
+            total += len(ids)
+            if auto_commit:
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+            if len(ids) < batch_size:
+                break
+        if total:
+            _logger.info("Re-screened %s treatments for allergies, "
+                         "%s conflicts", total, flagged)
+        return total
+
+    def _count_incidence(self):
+        """Counter of (disease, patient country, visit day) of the cases."""
+        return Counter(
+            (diag.disease_id.id, diag.visit_id.patient_id.country_id.id,
+             diag.visit_id.visit_date.date())
+            for diag in self
+            if diag.disease_id and diag.visit_id.patient_id.country_id
+        )
+
+    @api.model_create_multi
+    def create(self, vals_list):  # Override
+        """Screens allergies, updates incidence and the patients' timeline."""
+        records = super().create(vals_list)
+        records._screen_allergies()
+        self.env['hr.hospital.disease.incidence']._add_cases(
+            records._count_incidence())
+        self.env['hr.hospital.patient']._invalidate_timeline(
+            records.visit_id.patient_id.ids)
+        return records
+
+    def write(self, vals):  # Override
+        """Screens allergies, updates incidence and the patients' timeline."""
+        patient_ids = self.visit_id.patient_id.ids
+        track_incidence = 'disease_id' in vals or 'visit_id' in vals
+        if track_incidence:
+            incidence_before = self._count_incidence()
+        result = super().write(vals)
+        if 'treatment' in vals or 'visit_id' in vals:
+            self._screen_allergies()
+        if track_incidence:
+            deltas = self._count_incidence()
+            deltas.subtract(incidence_before)
+            self.env['hr.hospital.disease.incidence']._add_cases(deltas)
+        self.env['hr.hospital.patient']._invalidate_timeline(
+            patient_ids + self.visit_id.patient_id.ids)
+        return result
+
+    def unlink(self):  # Override
+        """Updates incidence and invalidates the patients' timeline."""
+        deltas = Counter()
+        deltas.subtract(self._count_incidence())
+        self.env['hr.hospital.disease.incidence']._add_cases(deltas)
+        self.env['hr.hospital.patient']._invalidate_timeline(
+            self.visit_id.patient_id.ids)
+        return super().unlink()
@@ -1,19 +1,38 @@
 # -*- coding: utf-8 -*-
 """This file defines the Patient model."""
 
-from odoo import models, fields, api, _
+from collections import Counter
+
+from markupsafe import Markup, escape
+
+from odoo import models, fields, api, tools, _
+from odoo.osv import expression
+from odoo.tools.query import Query
+
+from .hospital_archive import ARCHIVE_TABLES, with_archive
+from .hospital_profiler import profiled
+
+TIMELINE_PAGE_SIZE = 20
+
+
+def timeline_cache_key(patient_id):
+    """Name of the cache version of one patient's timeline."""
+    return f'patient_timeline.{patient_id}'
 
 
 class Patient(models.Model):
     """Model for storing patient records."""
     _name = 'hr.hospital.patient'
-    _inherit = ['abstract.person']  # Наслідування абстрактної моделі
+    _inherit = ['abstract.person', 'hr.hospital.access.mixin']  # Наслідування абстрактних моделей
     _description = 'Patient'
     _rec_name = 'full_name'
+    _access_doctor_path = 'personal_doctor_id'
+    _access_doctor_sql = 't.personal_doctor_id'
 
     personal_doctor_id = fields.Many2one(
         comodel_name='hr.hospital.doctor',
-        string='Attending Doctor'
+        string='Attending Doctor',
+        index=True
     )
     passport_data = fields.Char(size=10)
     contact_person_id = fields.Many2one(
@@ -29,6 +48,13 @@ class Patient(models.Model):
         ]
     )
     allergies = fields.Text()
+    allergen_ids = fields.Many2many(
+        comodel_name='hr.hospital.allergen',
+        relation='hr_hospital_patient_allergen_rel',
+        column1='patient_id',
+        column2='allergen_id',
+        string='Allergens'
+    )
     insurance_partner_id = fields.Many2one(
         comodel_name='res.partner',
         string='Insurance Company',
@@ -56,11 +82,245 @@ class Patient(models.Model):
         readonly=True
     )
 
+    timeline_html = fields.Html(
+        compute='_compute_timeline_html',
+        string='Timeline',
+        sanitize=False
+    )
+    timeline_has_more = fields.Boolean(compute='_compute_timeline_html')
+
+    def init(self):
+        """Drops the former per-row timeline cache column."""
+        super().init()
+        self._cr.execute("""
+            ALTER TABLE hr_hospital_patient DROP COLUMN IF EXISTS timeline_cache
+        """)
+
     @api.depends('visit_ids')
     def _compute_visit_count(self):
-        """Computes the number of visits."""
+        """Computes the number of visits, archived ones included."""
+        counts = Counter()
+        if self.ids:
+            groups = self.env['hr.hospital.patient.visit'].read_group(
+                [('patient_id', 'in', self.ids)], ['patient_id'],
+                ['patient_id'])
+            counts.update({group['patient_id'][0]: group['patient_id_count']
+                           for group in groups})
+            counts.update(self.env['hr.hospital.archive']
+                          ._count_archived_visits(self.ids))
         for patient in self:
-            patient.visit_count = len(patient.visit_ids)
+            patient.visit_count = counts[patient.id]
+
+    @api.depends_context('lang', 'timeline_pages')
+    def _compute_timeline_html(self):
+        """
+        Renders the latest timeline events for the form; the
+        'timeline_pages' context key sets how many pages are shown.
+        """
+        pages = max(int(self.env.context.get('timeline_pages') or 1), 1)
+        labels = {
+            'visit': _('Visit'),
+            'diagnosis': _('Diagnosis'),
+            'doctor_change': _('Doctor assigned'),
+        }
+        for patient in self:
+            if not patient.id:
+                patient.timeline_html = False
+                patient.timeline_has_more = False
+                continue
+            events = []
+            cursor = None
+            for _page in range(pages):
+                timeline = patient.get_timeline(cursor=cursor)
+                events += timeline['events']
+                cursor = timeline['next_cursor']
+                if not cursor:
+                    break
+            rows = Markup('').join(
+                Markup('<tr><td>%s</td><td>%s</td><td>%s</td>'
+                       '<td>%s</td><td>%s</td></tr>') % (
+                    (event['date'] or '')[:16],
+                    labels.get(event['type'], event['type']),
+                    event['doctor'] or '',
+                    event['disease'] or '',
+                    event['state'] or '',
+                )
+                for event in events
+            )
+            patient.timeline_html = Markup(
+                '<table class="table table-sm"><thead><tr>'
+                '<th>%s</th><th>%s</th><th>%s</th><th>%s</th><th>%s</th>'
+                '</tr></thead><tbody>%s</tbody></table>') % (
+                _('Date'), _('Event'), _('Doctor'), _('Disease'),
+                _('Status'), rows)
+            patient.timeline_has_more = bool(cursor)
+
+    def action_timeline_load_older(self):
+        """Reopens the form with one more page of the timeline."""
+        self.ensure_one()
+        pages = int(self.env.context.get('timeline_pages') or 1)
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'current',
+            'context': dict(self.env.context, timeline_pages=pages + 1),
+        }
+
+    @api.model
+    def _readable_ids_sql(self, model_name):
+        """
+        SQL condition on 'id' keeping the rows of model_name, archived
+        ones included, that the caller may read under its record rules,
+        or 'TRUE' when no rule applies to the caller.
+        """
+        domain = self.env['ir.rule']._compute_domain(model_name, 'read')
+        if not domain:
+            return 'TRUE'
+        model = self.env[model_name].sudo()
+        selects = []
+        params = []
+        # Архівна таблиця має ті самі колонки, тож правило застосовується
+        # до неї під псевдонімом гарячої таблиці
+        for table in (model._table, ARCHIVE_TABLES[model._table]):
+            query = Query(self.env.cr, model._table, table)
+            expression.expression(domain, model, model._table, query)
+            select, select_params = query.subselect()
+            selects.append(select)
+            params += select_params
+        condition = self.env.cr.mogrify(
+            f"id IN ({' UNION ALL '.join(selects)})", params).decode()
+        # Результат вставляється в запит з іменованими параметрами
+        return condition.replace('%', '%%')
+
+    def _fetch_timeline(self, limit, cursor):
+        """
+        Returns up to 'limit' events older than the cursor
+        (date, type, id), newest first. Each source is read through
+        its own index with the same limit before the merge; archived
+        visits and diagnoses are included. Visits and diagnoses are
+        limited by the caller's record rules.
+        """
+        self.ensure_one()
+        self.env.flush_all()
+        date_key, type_key, id_key = cursor or ('infinity', '~', 0)
+        visit_rule = self._readable_ids_sql('hr.hospital.patient.visit')
+        diagnosis_rule = self._readable_ids_sql('medical.diagnosis')
+        visits = with_archive('hr_hospital_patient_visit', [
+            'id', 'patient_id', 'doctor_id', 'visit_date', 'status'])
+        diagnoses = with_archive('medical_diagnosis', [
+            'id', 'visit_id', 'disease_id', 'severity'])
+        self.env.cr.execute(f"""
+            SELECT * FROM (
+                (SELECT 'visit' AS type, v.id, v.visit_date AS date,
+                        v.status AS state, doc.full_name AS doctor,
+                        NULL AS disease
+                   FROM {visits} v
+                   JOIN hr_hospital_doctor doc ON doc.id = v.doctor_id
+                  WHERE v.patient_id = %(patient)s AND v.{visit_rule}
+                    AND (v.visit_date, 'visit', v.id)
+                        < (%(date)s::timestamp, %(type)s, %(id)s)
+                  ORDER BY v.visit_date DESC, v.id DESC
+                  LIMIT %(limit)s)
+                UNION ALL
+                (SELECT 'diagnosis', d.id, v.visit_date, d.severity,
+                        doc.full_name,
+                        COALESCE(dis.name->>%(lang)s, dis.name->>'en_US')
+                   FROM {diagnoses} d
+                   JOIN {visits} v ON v.id = d.visit_id
+                   JOIN hr_hospital_doctor doc ON doc.id = v.doctor_id
+                   LEFT JOIN hr_hospital_disease dis ON dis.id = d.disease_id
+                  WHERE v.patient_id = %(patient)s AND v.{visit_rule}
+                    AND d.{diagnosis_rule}
+                    AND (v.visit_date, 'diagnosis', d.id)
+                        < (%(date)s::timestamp, %(type)s, %(id)s)
+                  ORDER BY v.visit_date DESC, d.id DESC
+                  LIMIT %(limit)s)
+                UNION ALL
+                (SELECT 'doctor_change', h.id, h.assign_date::timestamp,
+                        CASE WHEN h.active THEN 'active' ELSE 'archived' END,
+                        doc.full_name, NULL
+                   FROM patient_doctor_history h
+                   JOIN hr_hospital_doctor doc ON doc.id = h.doctor_id
+                  WHERE h.patient_id = %(patient)s
+                    AND (h.assign_date::timestamp, 'doctor_change', h.id)
+                        < (%(date)s::timestamp, %(type)s, %(id)s)
+                  ORDER BY h.assign_date DESC, h.id DESC
+                  LIMIT %(limit)s)
+            ) AS events
+            ORDER BY date DESC, type DESC, id DESC
+            LIMIT %(limit)s
+        """, {'patient': self.id, 'date': date_key, 'type': type_key,
+              'id': id_key, 'limit': limit,
+              'lang': self.env.lang or 'en_US'})
+        events = self.env.cr.dictfetchall()
+        for event in events:
+            event['date'] = fields.Datetime.to_string(event['date'])
+        return events
+
+    @api.model
+    @tools.ormcache('patient_id', 'lang', 'version', 'rule_key')
+    def _get_timeline_first_page(self, patient_id, lang, version, rule_key):
+        """
+        First timeline page, cached per patient, language, the cache
+        versions of the patient's timeline, disease and doctor names, and
+        per user when record rules limit what the user sees.
+        """
+        return tuple(self.browse(patient_id).with_context(lang=lang)
+                     ._fetch_timeline(TIMELINE_PAGE_SIZE, None))
+
+    def get_timeline(self, limit=TIMELINE_PAGE_SIZE, cursor=None):
+        """
+        Paginated patient timeline (visits, diagnoses, doctor changes).
+        Pass the returned 'next_cursor' to load older events. The first
+        page is served from the cache; reading never writes.
+        """
+        self.ensure_one()
+        self.check_access_rights('read')
+        self.check_access_rule('read')
+        if not cursor and limit == TIMELINE_PAGE_SIZE:
+            version = self.env['hr.hospital.cache.version'].get(
+                timeline_cache_key(self.id), 'hr.hospital.disease',
+                'doctor_names')
+            rule_model = self.env['ir.rule']
+            restricted = not self.env.su and any(
+                rule_model._compute_domain(model_name, 'read')
+                for model_name in ('hr.hospital.patient.visit',
+                                   'medical.diagnosis'))
+            events = [dict(event) for event in self._get_timeline_first_page(
+                self.id, self.env.lang or 'en_US', version,
+                self.env.uid if restricted else None)]
+        else:
+            events = self._fetch_timeline(limit, cursor)
+        next_cursor = None
+        if len(events) == limit:
+            last = events[-1]
+            next_cursor = [last['date'], last['type'], last['id']]
+        return {'events': events, 'next_cursor': next_cursor}
+
+    @api.model
+    def _invalidate_timeline(self, patient_ids):
+        """Invalidates the cached timeline of the given patients."""
+        self.env['hr.hospital.cache.version'].bump(
+            *[timeline_cache_key(patient_id)
+              for patient_id in set(patient_ids) if patient_id])
+
+    def action_restore_archived_visits(self):
+        """Moves the patients' archived visits back to the hot tables."""
+        self.env['hr.hospital.archive'].action_restore_history(self.ids)
+        return True
+
+    def action_open_patient_diagnoses(self):
+        """Opens all diagnoses of the patient."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Diagnoses'),
+            'res_model': 'medical.diagnosis',
+            'view_mode': 'tree,form',
+            'domain': [('visit_id.patient_id', '=', self.id)],
+        }
 
     @api.depends('visit_ids.diagnosis_ids')
     def _compute_diagnosis_ids(self):
@@ -114,9 +374,13 @@ class Patient(models.Model):
         return {}
 
     @api.model_create_multi  # Override
+    @profiled('patient.create')
     def create(self, vals_list):
         """Overrides create to automatically create a doctor history record."""
         records = super().create(vals_list)
+        self.env['hr.hospital.doctor']._adjust_workload(
+            'panel_size',
+            Counter(record.personal_doctor_id.id for record in records))
         history_env = self.env['patient.doctor.history']
         for record in records:
             if record.personal_doctor_id:
@@ -127,13 +391,17 @@ class Patient(models.Model):
                 })
         return records
 
+    @profiled('patient.write')
     def write(self, vals):  # Override
         """Overrides write to create history when personal_doctor_id changes."""
         if 'personal_doctor_id' in vals:
+            panel_deltas = Counter()
             history_vals_list = []
             for record in self:
                 # Перевірка, чи ID дійсно змінюється
                 if record.personal_doctor_id.id != vals['personal_doctor_id']:
+                    panel_deltas[record.personal_doctor_id.id] -= 1
+                    panel_deltas[vals['personal_doctor_id']] += 1
                     history_vals_list.append({
                         'patient_id': record.id,
                         'doctor_id': vals['personal_doctor_id'],
@@ -143,8 +411,52 @@ class Patient(models.Model):
         result = super().write(vals)
 
         if 'personal_doctor_id' in vals and history_vals_list:
+            self.env['hr.hospital.doctor']._adjust_workload(
+                'panel_size', panel_deltas)
             self.env['patient.doctor.history'].create(
                 history_vals_list
             )
 
+        if 'allergen_ids' in vals:
+            self.env['medical.diagnosis'].search([
+                ('visit_id.patient_id', 'in', self.ids),
+                ('is_pending', '=', True),
+            ])._screen_allergies()
+
         return result
+
+    def unlink(self):  # Override
+        """Releases the doctors' panel slots of deleted patients."""
+        panel_deltas = Counter()
+        for record in self:
+            panel_deltas[record.personal_doctor_id.id] -= 1
+        result = super().unlink()
+        self.env['hr.hospital.doctor']._adjust_workload(
+            'panel_size', panel_deltas)
+        return result
+
+    def action_auto_assign_doctor(self, specialty_id=None):
+        """
+        Assigns the least-loaded eligible doctor (not an intern, same
+        speciality and, if possible, the patient's language) to every
+        patient without a personal doctor. One write per chosen doctor.
+        """
+        doctor_env = self.env['hr.hospital.doctor']
+        by_language = {}
+        for patient in self.filtered(lambda p: not p.personal_doctor_id):
+            by_language.setdefault(patient.language_id.id, []) \
+                .append(patient.id)
+
+        for language_id, patient_ids in by_language.items():
+            lang_patients = self.browse(patient_ids)
+            doctors = doctor_env._find_least_loaded(
+                specialty_id, language_id, limit=len(patient_ids))
+            if not doctors and language_id:
+                doctors = doctor_env._find_least_loaded(
+                    specialty_id, limit=len(patient_ids))
+            if not doctors:
+                continue
+            for doctor, doctor_patients in \
+                    doctors._distribute_patients(lang_patients).items():
+                doctor_patients.write({'personal_doctor_id': doctor.id})
+        return True
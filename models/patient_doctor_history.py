@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
 """This file defines the Patient Doctor History model."""
 
-from odoo import models, fields, api
+from collections import defaultdict
+
+from odoo import models, fields, api, tools
+
+# Період призначення: end_date не входить (новий лікар працює з цього дня)
+PERIOD_EXPR = "daterange(assign_date, end_date, '[)')"
 
 
 class PatientDoctorHistory(models.Model):
@@ -13,7 +18,8 @@ class PatientDoctorHistory(models.Model):
     patient_id = fields.Many2one(
         comodel_name='hr.hospital.patient',
         string='Patient',
-        required=True
+        required=True,
+        index=True
     )
     doctor_id = fields.Many2one(
         comodel_name='hr.hospital.doctor',
@@ -28,27 +34,96 @@ class PatientDoctorHistory(models.Model):
     change_reason = fields.Text()
     active = fields.Boolean(default=True)
 
-    def action_archive_old_records(self):
+    _sql_constraints = [
+        ('check_dates',
+         'CHECK(end_date IS NULL OR end_date >= assign_date)',
+         'The assignment cannot end before it starts!'),
+        ('active_period_no_overlap',
+         'EXCLUDE USING gist (patient_id WITH =, %s WITH &&) '
+         'WHERE (active)' % PERIOD_EXPR,
+         'A patient cannot have overlapping active doctor assignments!'),
+    ]
+
+    def _auto_init(self):
         """
-        Archives all other active history records for the patient(s).
-        Called by 'patient.py' on write/create.
+        The exclusion constraint needs '=' on integers in GiST. Periods
+        ending before they start are closed on their start day first,
+        otherwise the date check, the exclusion constraint and the period
+        index cannot be built.
         """
-        for record in self:
-            # Знайти всі 'старі' активні записи, окрім 'цього'
-            old_records = self.search([
-                ('patient_id', '=', record.patient_id.id),
-                ('active', '=', True),
-                ('id', '!=', record.id),
-            ])
-            if old_records:
-                old_records.write({
-                    'active': False,
-                    'end_date': fields.Date.today(),
-                })
+        cr = self.env.cr
+        cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        if tools.table_exists(cr, self._table):
+            cr.execute("""
+                UPDATE patient_doctor_history SET end_date = assign_date
+                 WHERE end_date < assign_date
+            """)
+        return super()._auto_init()
+
+    def init(self):
+        """Interval index for point-in-time lookups, archived rows included."""
+        tools.create_index(
+            self._cr, 'patient_doctor_history_period_gist_idx', self._table,
+            ['patient_id', PERIOD_EXPR], method='gist'
+        )
+
+    @api.model
+    def doctor_at(self, patient_ids, date):
+        """
+        Returns {patient_id: doctor_id} with the personal doctor of each
+        patient on the given date, resolved in a single indexed query.
+        Archived assignments are taken into account as well.
+        """
+        if not patient_ids:
+            return {}
+        self.check_access_rights('read')
+        self.flush_model(['patient_id', 'doctor_id', 'assign_date',
+                          'end_date'])
+        self.env.cr.execute(f"""
+            SELECT DISTINCT ON (patient_id) patient_id, doctor_id
+              FROM patient_doctor_history
+             WHERE patient_id = ANY(%s) AND {PERIOD_EXPR} @> %s::date
+             ORDER BY patient_id, active DESC, assign_date DESC, id DESC
+        """, [list(patient_ids), date])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _close_open_assignments(self, vals_list):
+        """
+        Closes the patients' current assignments where the new ones start,
+        so the new active periods never overlap the old ones.
+        """
+        starts = {}
+        today = fields.Date.context_today(self)
+        for vals in vals_list:
+            if vals.get('patient_id') and vals.get('active', True):
+                start = fields.Date.to_date(vals.get('assign_date')) or today
+                starts[vals['patient_id']] = min(
+                    start, starts.get(vals['patient_id'], start))
+        if not starts:
+            return
+        by_end_date = defaultdict(lambda: self.browse())
+        for record in self.search([('patient_id', 'in', list(starts)),
+                                   ('active', '=', True)]):
+            # Період не може закінчитися раніше, ніж почався
+            end_date = max(starts[record.patient_id.id], record.assign_date)
+            by_end_date[end_date] |= record
+        for end_date, records in by_end_date.items():
+            records.write({'active': False, 'end_date': end_date})
 
     @api.model_create_multi
     def create(self, vals_list):  # Override
-        """On create, archive old active records."""
+        """On create, close the patients' current assignments first."""
+        self._close_open_assignments(vals_list)
         records = super().create(vals_list)
-        records.action_archive_old_records()
+        self.env['hr.hospital.patient']._invalidate_timeline(
+            records.patient_id.ids)
         return records
+
+    def write(self, vals):  # Override
+        """Invalidates the patients' cached timeline."""
+        patient_ids = self.patient_id.ids
+        result = super().write(vals)
+        self.env['hr.hospital.patient']._invalidate_timeline(
+            patient_ids + self.patient_id.ids)
+        return result
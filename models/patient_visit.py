@@ -1,17 +1,53 @@
 # -*- coding: utf-8 -*-
 """This file defines the Patient Visit model."""
 
-from odoo import models, fields, api, _
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+import psycopg2
+import pytz
+
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
 
+from .hospital_archive import ARCHIVE_TABLES
+from .hospital_profiler import profiled
+
+_logger = logging.getLogger(__name__)
+
+MISSED_VISIT_BATCH_SIZE = 1000
+
+# Поля, що впливають на місячні фінансові зведення
+REVENUE_FIELDS = {'status', 'cost', 'currency_id', 'visit_date',
+                  'doctor_id', 'patient_id', 'visit_type'}
+
+# Знімок ключів фінансових зведень для завершених візитів таблиці
+REVENUE_KEYS_SQL = """
+    UPDATE {table} v
+       SET specialty_id = d.specialty_id,
+           insurer_id = p.insurance_partner_id
+      FROM hr_hospital_doctor d, hr_hospital_patient p
+     WHERE d.id = v.doctor_id AND p.id = v.patient_id
+       AND v.status = 'completed'
+"""
+
+# Інтервал, який займає візит у розкладі лікаря
+VISIT_PERIOD_EXPR = ("tsrange(visit_date, visit_date + duration * "
+                     "interval '1 minute', '[)')")
+
 
 class PatientVisit(models.Model):
     """
     Model for storing patient visits.
     """
     _name = 'hr.hospital.patient.visit'
+    _inherit = ['hr.hospital.access.mixin', 'hr.hospital.content.mixin']
     _description = 'Patient Visit'
     _order = 'visit_date desc'
+    _content_fields = ('recommendations',)
     display_name = fields.Char(compute='_compute_display_name', store=False)
 
     patient_id = fields.Many2one(
@@ -23,6 +59,7 @@ class PatientVisit(models.Model):
         comodel_name='hr.hospital.doctor',
         string='Doctor',
         required=True,
+        index=True,
         domain="[('license_number', '!=', False)]"
     )
 
@@ -52,6 +89,19 @@ class PatientVisit(models.Model):
         required=True,
         default=fields.Datetime.now
     )
+    duration = fields.Integer(
+        string='Duration (min)',
+        default=30,
+        required=True
+    )
+    # День візиту в часовому поясі клініки (партнера компанії) для
+    # обмеження "один візит на день": не залежить від поясу користувача,
+    # що записує візит. Після зміни поясу компанії наявні дні не
+    # перераховуються
+    visit_day = fields.Date(
+        compute='_compute_visit_day',
+        store=True
+    )
     actual_visit_date = fields.Datetime(
         readonly=True
     )
@@ -65,12 +115,21 @@ class PatientVisit(models.Model):
         default='primary',
         required=True,
     )
-    recommendations = fields.Html()
+    recommendations = fields.Html(
+        compute='_compute_content',
+        inverse='_inverse_content',
+        copy=True
+    )
     diagnosis_ids = fields.One2many(  # Зв'язок One2many
         comodel_name='medical.diagnosis',
         inverse_name='visit_id',
         string='Diagnoses'
     )
+    feedback_ids = fields.One2many(
+        comodel_name='hr.hospital.visit.feedback',
+        inverse_name='visit_id',
+        string='Feedback'
+    )
 
     diagnosis_count = fields.Integer(
         string='Кількість діагнозів',
@@ -85,6 +144,186 @@ class PatientVisit(models.Model):
         required=True,
     )
     cost = fields.Monetary(currency_field='currency_id')
+    company_currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        default=lambda self: self.env.company.currency_id,
+        readonly=True
+    )
+    claim_batch_id = fields.Many2one(
+        comodel_name='hr.hospital.claim.batch',
+        string='Insurance Claim',
+        readonly=True,
+        copy=False,
+        ondelete='set null'
+    )
+    # Спеціальність і страховик на момент завершення візиту, щоб
+    # фінансові зведення не "переїжджали" після їх зміни
+    specialty_id = fields.Many2one(
+        comodel_name='doctor.speciality',
+        string='Speciality',
+        readonly=True,
+        copy=False
+    )
+    insurer_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Insurer',
+        readonly=True,
+        copy=False
+    )
+    cost_company = fields.Monetary(
+        string='Cost (Company Currency)',
+        currency_field='company_currency_id',
+        compute='_compute_cost_company',
+        store=True
+    )
+
+    # Перенесення візитів
+    origin_visit_id = fields.Many2one(
+        comodel_name='hr.hospital.patient.visit',
+        string='Rescheduled From',
+        readonly=True,
+        copy=False,
+        index='btree_not_null'
+    )
+    rescheduled_visit_ids = fields.One2many(
+        comodel_name='hr.hospital.patient.visit',
+        inverse_name='origin_visit_id',
+        string='Rescheduled To'
+    )
+    reschedule_reason = fields.Text(readonly=True, copy=False)
+
+    # Ключ ідемпотентності зовнішніх систем
+    ingest_key = fields.Char(readonly=True, copy=False)
+
+    _sql_constraints = [
+        ('duration_positive', 'CHECK(duration > 0)',
+         'Visit duration must be positive!'),
+        ('doctor_slot_no_overlap',
+         'EXCLUDE USING gist (doctor_id WITH =, %s WITH &&) '
+         "WHERE (status IN ('planned', 'completed'))" % VISIT_PERIOD_EXPR,
+         'The doctor already has a visit at this time!'),
+        ('ingest_key_uniq', 'unique(ingest_key)',
+         'A visit with this idempotency key already exists!'),
+        ('patient_doctor_day_uniq',
+         'EXCLUDE (patient_id WITH =, doctor_id WITH =, visit_day WITH =) '
+         "WHERE (status != 'cancelled')",
+         'This patient already has a visit with this doctor '
+         'on the same day!'),
+    ]
+
+    def _auto_init(self):
+        """
+        The slot exclusion constraint needs '=' on integers in GiST. On
+        upgrade, snapshots the revenue keys of the completed visits, in
+        the archive too, from their current doctor and patient.
+        """
+        cr = self.env.cr
+        cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        if tools.table_exists(cr, self._table) and \
+                not tools.column_exists(cr, self._table, 'specialty_id'):
+            for table in (self._table, ARCHIVE_TABLES[self._table]):
+                if tools.table_exists(cr, table):
+                    tools.create_column(cr, table, 'specialty_id', 'int4')
+                    tools.create_column(cr, table, 'insurer_id', 'int4')
+                    cr.execute(REVENUE_KEYS_SQL.format(table=table))
+        return super()._auto_init()
+
+    def init(self):
+        """Creates the indexes for crons, archiving, timeline and claims."""
+        tools.create_index(
+            self._cr, 'hr_hospital_patient_visit_planned_date_idx',
+            self._table, ['visit_date'], where="status = 'planned'"
+        )
+        tools.create_index(
+            self._cr, 'hr_hospital_patient_visit_patient_date_idx',
+            self._table, ['patient_id', 'visit_date DESC', 'id DESC']
+        )
+        tools.create_index(
+            self._cr, 'hr_hospital_patient_visit_unbilled_idx',
+            self._table, ['patient_id'],
+            where="status = 'completed' AND claim_batch_id IS NULL"
+        )
+        tools.create_index(
+            self._cr, 'hr_hospital_patient_visit_claim_batch_idx',
+            self._table, ['claim_batch_id', 'id'],
+            where="claim_batch_id IS NOT NULL"
+        )
+        tools.create_index(
+            self._cr, 'hr_hospital_patient_visit_planned_doctor_idx',
+            self._table, ['doctor_id'], where="status = 'planned'"
+        )
+        tools.create_index(
+            self._cr, 'hr_hospital_patient_visit_closed_date_idx',
+            self._table, ['visit_date', 'id'],
+            where="status IN ('completed', 'cancelled')"
+        )
+
+    @api.model
+    @tools.ormcache('from_currency_id', 'to_currency_id', 'company_id', 'day',
+                    'version')
+    def _get_daily_rate(self, from_currency_id, to_currency_id, company_id,
+                        day, version):
+        """
+        Conversion rate for one day, cached per 'currency_rate' cache
+        version; rate changes bump it.
+        """
+        currency_env = self.env['res.currency']
+        return currency_env._get_conversion_rate(
+            currency_env.browse(from_currency_id),
+            currency_env.browse(to_currency_id),
+            self.env['res.company'].browse(company_id), day)
+
+    @api.depends('cost', 'currency_id', 'company_currency_id', 'visit_date')
+    def _compute_cost_company(self):
+        """Converts the cost into company currency at the visit's date."""
+        company = self.env.company
+        version, = self.env['hr.hospital.cache.version'].get('currency_rate')
+        for visit in self:
+            to_currency = visit.company_currency_id or company.currency_id
+            if not visit.cost or not visit.currency_id or \
+                    visit.currency_id == to_currency:
+                visit.cost_company = visit.cost
+                continue
+            day = (visit.visit_date or fields.Datetime.now()).date()
+            rate = self._get_daily_rate(visit.currency_id.id,
+                                        to_currency.id, company.id, day,
+                                        version)
+            visit.cost_company = to_currency.round(visit.cost * rate)
+
+    def _snapshot_revenue_keys(self):
+        """Stores the current speciality and insurer on completed visits."""
+        if not self:
+            return
+        self.flush_recordset(['doctor_id', 'patient_id', 'status'])
+        self.env.cr.execute(
+            REVENUE_KEYS_SQL.format(table=self._table) + " AND v.id = ANY(%s)",
+            [self.ids])
+        self.invalidate_recordset(['specialty_id', 'insurer_id'])
+
+    def _revenue_by_key(self):
+        """{(month, doctor, speciality, insurer, type): [count, amount]}."""
+        result = defaultdict(lambda: [0, 0.0])
+        for visit in self:
+            if visit.status != 'completed':
+                continue
+            key = (
+                visit.visit_date.date().replace(day=1),
+                visit.doctor_id.id,
+                visit.specialty_id.id or None,
+                visit.insurer_id.id or None,
+                visit.visit_type,
+            )
+            result[key][0] += 1
+            result[key][1] += visit.cost_company
+        return result
+
+    @staticmethod
+    def _revenue_deltas(before, after):
+        return {
+            key: [after.get(key, [0, 0.0])[0] - before.get(key, [0, 0.0])[0],
+                  after.get(key, [0, 0.0])[1] - before.get(key, [0, 0.0])[1]]
+            for key in set(before) | set(after)
+        }
 
     @api.depends('diagnosis_ids')
     def _compute_diagnosis_count(self):
@@ -100,25 +339,101 @@ class PatientVisit(models.Model):
         else:
             self.mentor_id = False
 
-    @api.constrains('patient_id', 'doctor_id', 'visit_date')
-    def _check_unique_visit_per_day(self):
-        """Validator: Prohibit one patient from visiting one doctor > 1 time/day."""
+    @api.model
+    def _get_visit_tz(self):
+        """Returns the clinic timezone that defines the day of a visit."""
+        return pytz.timezone(self.env.company.partner_id.tz or 'UTC')
+
+    @api.model
+    def _visit_day_of(self, visit_date):
+        """Returns the clinic day of a naive UTC visit datetime."""
+        return pytz.utc.localize(visit_date).astimezone(
+            self._get_visit_tz()).date()
+
+    @api.depends('visit_date')
+    def _compute_visit_day(self):
         for visit in self:
-            # Datetime в Date
-            visit_day = fields.Date.context_today(visit, visit.visit_date)
-
-            # Пошук "дублікатів"
-            domain = [
-                ('patient_id', '=', visit.patient_id.id),
-                ('doctor_id', '=', visit.doctor_id.id),
-                ('id', '!=', visit.id),
-                ('visit_date', '>=', f'{visit_day} 00:00:00'),
-                ('visit_date', '<=', f'{visit_day} 23:59:59'),
-            ]
-            if self.search_count(domain) > 0:
-                raise ValidationError(_(
-                    "This patient already has a visit with this doctor "
-                    "on the same day."))
+            visit.visit_day = visit.visit_date and \
+                self._visit_day_of(visit.visit_date)
+
+    @api.constrains('patient_id', 'doctor_id', 'visit_day', 'status')
+    @profiled('visit.check_unique_visit_per_day')
+    def _check_unique_visit_per_day(self):
+        """
+        Validator: Prohibit one patient from visiting one doctor > 1 time/day.
+
+        Gives a readable error early; concurrent bookings are rejected by
+        the patient_doctor_day_uniq exclusion constraint. The whole
+        recordset is checked with one query.
+        """
+        self.flush_recordset(['patient_id', 'doctor_id', 'visit_day',
+                              'status'])
+        # Пошук "дублікатів"
+        self.env.cr.execute("""
+            SELECT 1
+              FROM hr_hospital_patient_visit v
+              JOIN hr_hospital_patient_visit o
+                ON o.patient_id = v.patient_id AND o.doctor_id = v.doctor_id
+               AND o.visit_day = v.visit_day AND o.id != v.id
+               AND o.status != 'cancelled'
+             WHERE v.id = ANY(%s) AND v.status != 'cancelled'
+             LIMIT 1
+        """, [self.ids])
+        if self.env.cr.fetchone():
+            raise ValidationError(_(
+                "This patient already has a visit with this doctor "
+                "on the same day."))
+
+    @api.model
+    def book_visits(self, vals_list):
+        """
+        Books visits one by one, each in its own savepoint, and returns
+        (booked visits, indexes of the rejected vals). Conflicts are
+        detected by the database constraints, so concurrent bookings of
+        different doctors never wait for each other.
+        """
+        booked = self.browse()
+        rejected = []
+        for index, vals in enumerate(vals_list):
+            try:
+                with self.env.cr.savepoint():
+                    booked |= self.create(vals)
+            except (ValidationError, psycopg2.IntegrityError,
+                    psycopg2.errors.SerializationFailure):
+                rejected.append(index)
+        return booked, rejected
+
+    def _count_planned_by_doctor(self):
+        return Counter(visit.doctor_id.id for visit in self
+                       if visit.status == 'planned')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Overrides create to keep the doctors' planned-visit load."""
+        records = super().create(vals_list)
+        records.filtered(
+            lambda visit: visit.status == 'completed')._snapshot_revenue_keys()
+        self.env['hr.hospital.doctor']._adjust_workload(
+            'upcoming_visit_count', records._count_planned_by_doctor())
+        self.env['hr.hospital.patient']._invalidate_timeline(
+            records.patient_id.ids)
+        self.env['hr.hospital.visit.revenue']._add_revenue(
+            records._revenue_by_key())
+        return records
+
+    def unlink(self):
+        """Overrides unlink to keep the doctors' planned-visit load."""
+        planned = self._count_planned_by_doctor()
+        self.env['hr.hospital.patient']._invalidate_timeline(
+            self.patient_id.ids)
+        self.env['hr.hospital.visit.revenue']._add_revenue(
+            self._revenue_deltas(self._revenue_by_key(), {}))
+        result = super().unlink()
+        planned_deltas = Counter()
+        planned_deltas.subtract(planned)
+        self.env['hr.hospital.doctor']._adjust_workload(
+            'upcoming_visit_count', planned_deltas)
+        return result
 
     def write(self, vals):
         """Overrides write to prevent changes if the visit is completed."""
@@ -136,7 +451,33 @@ class PatientVisit(models.Model):
                     not record.actual_visit_date:
                 vals['actual_visit_date'] = fields.Datetime.now()
 
-        return super().write(vals)
+        track_load = 'status' in vals or 'doctor_id' in vals
+        if track_load:
+            planned_before = self._count_planned_by_doctor()
+        patient_ids = self.patient_id.ids
+        track_revenue = bool(REVENUE_FIELDS & set(vals))
+        if track_revenue:
+            revenue_before = self._revenue_by_key()
+        completing = self.filtered(
+            lambda visit: visit.status != 'completed') \
+            if vals.get('status') == 'completed' else self.browse()
+
+        result = super().write(vals)
+        completing._snapshot_revenue_keys()
+
+        if track_revenue:
+            self.env['hr.hospital.visit.revenue']._add_revenue(
+                self._revenue_deltas(revenue_before, self._revenue_by_key()))
+
+        self.env['hr.hospital.patient']._invalidate_timeline(
+            patient_ids + self.patient_id.ids)
+
+        if track_load:
+            planned_deltas = self._count_planned_by_doctor()
+            planned_deltas.subtract(planned_before)
+            self.env['hr.hospital.doctor']._adjust_workload(
+                'upcoming_visit_count', planned_deltas)
+        return result
 
     @api.depends('patient_id.full_name', 'visit_date')
     def _compute_display_name(self):
@@ -153,3 +494,61 @@ class PatientVisit(models.Model):
                 visit_date_str = visit_date_local.strftime('%Y-%m-%d %H:%M')
 
             visit.display_name = f"{patient_name} @ {visit_date_str}"
+
+    @api.model
+    def _cron_mark_missed_visits(self, grace_hours=0, batch_size=None):
+        """
+        Cron: marks planned visits whose date has passed as 'missed'.
+
+        Works in chunks, each chunk is a single UPDATE. Rows locked by
+        concurrent user edits are skipped and picked up on the next run.
+        """
+        batch_size = batch_size or int(
+            self.env['ir.config_parameter'].sudo().get_param(
+                'hr_hospital.missed_visit_batch_size',
+                MISSED_VISIT_BATCH_SIZE))
+        limit_date = fields.Datetime.now() - timedelta(hours=grace_hours)
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+
+        started = time.monotonic()
+        total = 0
+        while True:
+            chunk_started = time.monotonic()
+            self.env.cr.execute("""
+                UPDATE hr_hospital_patient_visit
+                   SET status = 'missed',
+                       write_uid = %(uid)s,
+                       write_date = (now() at time zone 'UTC')
+                 WHERE id IN (
+                    SELECT id FROM hr_hospital_patient_visit
+                     WHERE status = 'planned' AND visit_date < %(limit)s
+                     ORDER BY visit_date
+                     LIMIT %(batch)s
+                       FOR UPDATE SKIP LOCKED
+                 )
+             RETURNING id, doctor_id, patient_id
+            """, {'uid': self.env.uid, 'limit': limit_date,
+                  'batch': batch_size})
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+            visit_ids = [row[0] for row in rows]
+            planned_deltas = Counter()
+            planned_deltas.subtract(row[1] for row in rows)
+            self.env['hr.hospital.doctor']._adjust_workload(
+                'upcoming_visit_count', planned_deltas)
+            self.env['hr.hospital.patient']._invalidate_timeline(
+                [row[2] for row in rows])
+            total += len(visit_ids)
+            self.browse(visit_ids).invalidate_recordset(
+                ['status', 'write_uid', 'write_date'])
+            _logger.info("Marked %s planned visits as missed in %.3fs",
+                         len(visit_ids), time.monotonic() - chunk_started)
+            if auto_commit:
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+            if len(visit_ids) < batch_size:
+                break
+
+        _logger.info("Missed-visit job done: %s visits in %.3fs",
+                     total, time.monotonic() - started)
+        return total
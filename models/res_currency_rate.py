@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Extends currency rates to invalidate the cached daily rates."""
+
+from odoo import models, api
+
+
+class ResCurrencyRate(models.Model):
+    """Invalidates the visit cost rate cache when rates change."""
+    _inherit = 'res.currency.rate'
+
+    @api.model_create_multi
+    def create(self, vals_list):  # Override
+        records = super().create(vals_list)
+        self.env['hr.hospital.cache.version'].bump('currency_rate')
+        return records
+
+    def write(self, vals):  # Override
+        result = super().write(vals)
+        self.env['hr.hospital.cache.version'].bump('currency_rate')
+        return result
+
+    def unlink(self):  # Override
+        result = super().unlink()
+        self.env['hr.hospital.cache.version'].bump('currency_rate')
+        return result
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Defines patient feedback on completed visits."""
+
+from datetime import datetime
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+# Ваги відгуків рахуються від фіксованої точки, тож старі суми не
+# треба перераховувати: нові відгуки просто важать більше
+RATING_EPOCH = datetime(2020, 1, 1)
+MIN_HALF_LIFE_DAYS = 30
+
+
+class VisitFeedback(models.Model):
+    """Patient feedback on a completed visit; feeds the doctor's rating."""
+    _name = 'hr.hospital.visit.feedback'
+    _description = 'Visit Feedback'
+    _order = 'feedback_date desc, id desc'
+    _rec_name = 'visit_id'
+
+    visit_id = fields.Many2one(
+        comodel_name='hr.hospital.patient.visit',
+        string='Visit',
+        required=True,
+        ondelete='restrict',
+        domain="[('status', '=', 'completed')]"
+    )
+    patient_id = fields.Many2one(
+        comodel_name='hr.hospital.patient',
+        related='visit_id.patient_id',
+        store=True
+    )
+    # Знімок лікаря, якого оцінено, щоб суми рейтингу не "переїжджали"
+    doctor_id = fields.Many2one(
+        comodel_name='hr.hospital.doctor',
+        string='Doctor',
+        readonly=True,
+        index=True
+    )
+    score = fields.Integer(required=True, default=5)
+    comment = fields.Text()
+    feedback_date = fields.Datetime(
+        required=True,
+        default=fields.Datetime.now
+    )
+
+    _sql_constraints = [
+        ('visit_uniq', 'unique(visit_id)',
+         'A visit can only have one feedback.'),
+        ('score_range', 'CHECK(score >= 1 AND score <= 5)',
+         'Score must be between 1 and 5.'),
+    ]
+
+    @api.constrains('visit_id')
+    def _check_visit_completed(self):
+        """Validator: Only completed visits can be rated."""
+        for record in self:
+            if record.visit_id.status != 'completed':
+                raise ValidationError(
+                    _("Feedback can only be left on a completed visit."))
+
+    @api.model
+    def _get_half_life_days(self):
+        """Half-life of the rating decay in days; 0 disables decay."""
+        half_life = float(self.env['ir.config_parameter'].sudo().get_param(
+            'hr_hospital.rating_half_life_days', 0) or 0)
+        return max(half_life, MIN_HALF_LIFE_DAYS) if half_life > 0 else 0
+
+    @api.model
+    def _weight(self, feedback_date, half_life):
+        """Weight of a feedback given on feedback_date."""
+        if not half_life:
+            return 1.0
+        age = (feedback_date - RATING_EPOCH).total_seconds() / 86400
+        return 2 ** (age / half_life)
+
+    def _rating_deltas(self, sign=1):
+        """{doctor_id: [score sum, weight sum, count]} of these feedbacks."""
+        half_life = self._get_half_life_days()
+        deltas = {}
+        for record in self:
+            if not record.doctor_id:
+                continue
+            weight = self._weight(record.feedback_date, half_life)
+            delta = deltas.setdefault(record.doctor_id.id, [0.0, 0.0, 0])
+            delta[0] += sign * record.score * weight
+            delta[1] += sign * weight
+            delta[2] += sign
+        return deltas
+
+    @staticmethod
+    def _merge_deltas(deltas, others):
+        for doctor_id, delta in others.items():
+            total = deltas.setdefault(doctor_id, [0.0, 0.0, 0])
+            for index, value in enumerate(delta):
+                total[index] += value
+        return deltas
+
+    @api.model_create_multi
+    def create(self, vals_list):  # Override
+        """Snapshots the visit's doctor and adds the scores to the rating."""
+        visits = self.env['hr.hospital.patient.visit'].browse(
+            [vals['visit_id'] for vals in vals_list if vals.get('visit_id')])
+        doctors = {visit.id: visit.doctor_id.id for visit in visits}
+        for vals in vals_list:
+            vals['doctor_id'] = doctors.get(vals.get('visit_id'))
+        records = super().create(vals_list)
+        self.env['hr.hospital.doctor']._adjust_rating(
+            records._rating_deltas())
+        return records
+
+    def write(self, vals):  # Override
+        """Moves the changed scores between the doctors' running sums."""
+        if 'visit_id' in vals:
+            vals['doctor_id'] = self.env['hr.hospital.patient.visit'].browse(
+                vals['visit_id']).doctor_id.id
+        if not {'visit_id', 'score', 'feedback_date'} & set(vals):
+            return super().write(vals)
+        deltas = self._rating_deltas(sign=-1)
+        result = super().write(vals)
+        self.env['hr.hospital.doctor']._adjust_rating(
+            self._merge_deltas(deltas, self._rating_deltas()))
+        return result
+
+    def unlink(self):  # Override
+        """Removes the scores from the doctors' running sums."""
+        deltas = self._rating_deltas(sign=-1)
+        result = super().unlink()
+        self.env['hr.hospital.doctor']._adjust_rating(deltas)
+        return result
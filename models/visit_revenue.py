@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Defines the monthly Visit Revenue rollup model."""
+
+from odoo import models, fields, api
+
+from .hospital_archive import with_archive
+
+
+class VisitRevenue(models.Model):
+    """
+    Monthly revenue of completed visits in company currency, per doctor,
+    speciality, insurer and visit type. Maintained incrementally from
+    'hr.hospital.patient.visit'.
+    """
+    _name = 'hr.hospital.visit.revenue'
+    _description = 'Visit Revenue (Monthly)'
+    _order = 'month desc'
+    _log_access = False
+
+    month = fields.Date(required=True, readonly=True, index=True)
+    doctor_id = fields.Many2one(
+        comodel_name='hr.hospital.doctor',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+    specialty_id = fields.Many2one(
+        comodel_name='doctor.speciality',
+        readonly=True,
+        ondelete='set null'
+    )
+    insurer_id = fields.Many2one(
+        comodel_name='res.partner',
+        string='Insurer',
+        readonly=True,
+        ondelete='set null'
+    )
+    visit_type = fields.Selection(
+        selection=lambda self: self.env['hr.hospital.patient.visit']
+        ._fields['visit_type'].selection,
+        readonly=True
+    )
+    visit_count = fields.Integer(readonly=True)
+    currency_id = fields.Many2one(
+        comodel_name='res.currency',
+        default=lambda self: self.env.company.currency_id,
+        readonly=True
+    )
+    amount = fields.Monetary(currency_field='currency_id', readonly=True)
+
+    def init(self):
+        """Unique key; NULL speciality/insurer are folded to 0."""
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS hr_hospital_visit_revenue_key
+                ON hr_hospital_visit_revenue (
+                    month, doctor_id, COALESCE(specialty_id, 0),
+                    COALESCE(insurer_id, 0), visit_type)
+        """)
+
+    @api.model
+    def _add_revenue(self, deltas):
+        """
+        Upserts {(month, doctor, speciality, insurer, type): [count, amount]}
+        in one query.
+        """
+        deltas = {key: value for key, value in deltas.items()
+                  if value[0] or value[1]}
+        if not deltas:
+            return
+        columns = list(zip(*[key + tuple(value)
+                             for key, value in deltas.items()]))
+        self.env.cr.execute("""
+            INSERT INTO hr_hospital_visit_revenue
+                        (month, doctor_id, specialty_id, insurer_id,
+                         visit_type, visit_count, amount, currency_id)
+            SELECT v.*, %s
+              FROM unnest(%s::date[], %s::int[], %s::int[], %s::int[],
+                          %s::varchar[], %s::int[], %s::numeric[]) AS v
+            ON CONFLICT (month, doctor_id, COALESCE(specialty_id, 0),
+                         COALESCE(insurer_id, 0), visit_type) DO UPDATE
+               SET visit_count = hr_hospital_visit_revenue.visit_count
+                               + EXCLUDED.visit_count,
+                   amount = hr_hospital_visit_revenue.amount
+                          + EXCLUDED.amount
+        """, [self.env.company.currency_id.id] + [list(column)
+                                                  for column in columns])
+        self.invalidate_model(['visit_count', 'amount'])
+
+    @api.model
+    def action_rebuild(self):
+        """Rebuilds all monthly rollups from completed visits (backfill)."""
+        self.env.flush_all()
+        visits = with_archive('hr_hospital_patient_visit', [
+            'visit_date', 'doctor_id', 'specialty_id', 'insurer_id',
+            'visit_type', 'status', 'cost_company'])
+        self.env.cr.execute(f"""
+            DELETE FROM hr_hospital_visit_revenue;
+            INSERT INTO hr_hospital_visit_revenue
+                        (month, doctor_id, specialty_id, insurer_id,
+                         visit_type, visit_count, amount, currency_id)
+            SELECT date_trunc('month', v.visit_date)::date, v.doctor_id,
+                   v.specialty_id, v.insurer_id, v.visit_type,
+                   count(*), COALESCE(sum(v.cost_company), 0), %s
+              FROM {visits} v
+             WHERE v.status = 'completed'
+             GROUP BY 1, 2, 3, 4, 5
+        """, [self.env.company.currency_id.id])
+        self.invalidate_model()
+        return True
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+hr_hospital tests. The functional tests run with the default test run;
+the benchmark and the booking stress test are excluded from it, select
+them by tag, e.g. '--test-tags hr_hospital_benchmark' or
+'--test-tags hr_hospital_stress'.
+"""
+
+from . import test_allergy_screening
+from . import test_benchmark
+from . import test_booking_stress
+from . import test_disease_incidence
+from . import test_doctor_rating
+from . import test_doctor_workload
+from . import test_hospital_access
+from . import test_hospital_archive
+from . import test_ingest
+from . import test_patient_visit
+from . import test_reschedule_visit_wizard
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures of the hr_hospital functional tests."""
+
+from odoo.tests.common import TransactionCase
+
+
+class HospitalCase(TransactionCase):
+    """Creates a speciality, two doctors, two patients and a disease."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.speciality = cls.env['doctor.speciality'].create({
+            'name': 'Test Speciality',
+            'code': 'TEST',
+        })
+        cls.doctor, cls.other_doctor = cls.env['hr.hospital.doctor'].create([{
+            'first_name': 'Test',
+            'last_name': f'Doctor {index}',
+            'license_number': f'TEST-{index}',
+            'specialty_id': cls.speciality.id,
+        } for index in range(2)])
+        cls.patient, cls.other_patient = cls.env['hr.hospital.patient'].create(
+            [{'first_name': 'Test', 'last_name': f'Patient {index}'}
+             for index in range(2)])
+        cls.disease = cls.env['hr.hospital.disease'].create({
+            'name': 'Test Disease',
+            'code_icd10': 'Z99.TEST',
+        })
+
+    @classmethod
+    def _create_visit(cls, visit_date, **vals):
+        """Creates a visit of the test patient with the test doctor."""
+        return cls.env['hr.hospital.patient.visit'].create(dict({
+            'patient_id': cls.patient.id,
+            'doctor_id': cls.doctor.id,
+            'visit_date': visit_date,
+        }, **vals))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Tests of the treatment screening against patient allergies."""
+
+from datetime import datetime
+
+from odoo.tests.common import tagged
+
+from ..models.allergen import AllergenMatcher, normalize_text
+from .common import HospitalCase
+
+
+@tagged('post_install', '-at_install')
+class TestAllergyScreening(HospitalCase):
+    """Flags treatments that mention one of the patient's allergens."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.penicillin, cls.latex = cls.env['hr.hospital.allergen'].create([{
+            'name': 'Test Penicillin',
+            'keywords': 'Amoxicillin, ampicillin',
+        }, {
+            'name': 'Test Latex',
+        }])
+        cls.patient.allergen_ids = cls.penicillin
+        cls.visit = cls._create_visit(datetime(2024, 1, 10, 8, 0))
+
+    def _diagnose(self, treatment):
+        return self.env['medical.diagnosis'].create({
+            'visit_id': self.visit.id,
+            'disease_id': self.disease.id,
+            'treatment': treatment,
+        })
+
+    def test_matcher(self):
+        matcher = AllergenMatcher([('amoxicillin', 1), ('latex', 2),
+                                   ('amoxicillin clav', 3)])
+        text = normalize_text('<p>Amoxicillin clav, latex-free</p>')
+        self.assertEqual(matcher.find(text), {1, 2, 3})
+        # Збіг усередині довшого слова не рахується
+        self.assertEqual(matcher.find('amoxicillins'), set())
+
+    def test_conflict_flagged_on_create(self):
+        diagnosis = self._diagnose('<p>AMOXICILLIN 500 mg, latex gloves</p>')
+        self.assertTrue(diagnosis.has_allergy_conflict)
+        # Латекс не є алергеном цього пацієнта
+        self.assertEqual(diagnosis.allergy_conflict_ids, self.penicillin)
+
+    def test_conflict_follows_treatment(self):
+        diagnosis = self._diagnose('<p>Paracetamol</p>')
+        self.assertFalse(diagnosis.has_allergy_conflict)
+        diagnosis.treatment = '<p>Ampicillin</p>'
+        self.assertTrue(diagnosis.has_allergy_conflict)
+        diagnosis.treatment = '<p>Paracetamol</p>'
+        self.assertFalse(diagnosis.has_allergy_conflict)
+        self.assertFalse(diagnosis.allergy_conflict_ids)
+
+    def test_rescreened_on_patient_allergies(self):
+        diagnosis = self._diagnose('<p>Latex catheter</p>')
+        self.assertFalse(diagnosis.has_allergy_conflict)
+        self.patient.allergen_ids |= self.latex
+        self.assertEqual(diagnosis.allergy_conflict_ids, self.latex)
+
+    def test_rescreened_on_catalogue_change(self):
+        diagnosis = self._diagnose('<p>Cloxacillin</p>')
+        self.assertFalse(diagnosis.has_allergy_conflict)
+        self.penicillin.keywords += ', cloxacillin'
+        self.env['medical.diagnosis']._cron_rescreen_allergies()
+        self.assertTrue(diagnosis.has_allergy_conflict)
+        self.assertEqual(diagnosis.allergy_screen_version,
+                         self.penicillin._get_catalogue_version())
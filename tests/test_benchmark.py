@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Benchmark of the key hr_hospital flows on generated data."""
+
+import logging
+
+from odoo.tests.common import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('hr_hospital_benchmark', '-standard', 'post_install', '-at_install')
+class TestBenchmark(TransactionCase):
+    """
+    Generates synthetic data and times every benchmark flow against it.
+    Everything, the results included, is rolled back with the test; the
+    baselines are read from the database, so a run fails on a regression
+    against baselines stored by earlier runs at the same scale.
+    """
+
+    DOCTOR_COUNT = 50
+    PATIENT_COUNT = 2000
+    VISITS_PER_PATIENT = 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if not cls.env['doctor.speciality'].search([], limit=1):
+            cls.env['doctor.speciality'].create({
+                'name': 'Benchmark',
+                'code': 'BENCH',
+            })
+        cls.counts = cls.env['hr.hospital.data.generator'].generate(
+            doctor_count=cls.DOCTOR_COUNT, patient_count=cls.PATIENT_COUNT,
+            visits_per_patient=cls.VISITS_PER_PATIENT)
+
+    def test_flows(self):
+        self.assertEqual(self.counts['hr.hospital.patient'],
+                         self.PATIENT_COUNT)
+        results = self.env['hr.hospital.benchmark'].run()
+        for result in results:
+            _logger.info("Benchmark %s at %s: %.2f ms, %s queries "
+                         "(baseline %.2f ms)", result.flow, result.scale,
+                         result.duration, result.query_count,
+                         result.baseline_duration)
+        self.assertEqual(len(results), len(set(results.mapped('flow'))))
+        self.assertFalse(results.filtered('is_regression').mapped('flow'),
+                         "Flows slower than their baseline")
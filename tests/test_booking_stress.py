@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Concurrent booking test for the visit double-booking constraints."""
+
+import odoo
+from odoo import api, SUPERUSER_ID
+from odoo.tests.common import BaseCase, get_db_name, tagged
+
+
+@tagged('hr_hospital_stress', '-standard', 'post_install', '-at_install')
+class TestBookingStress(BaseCase):
+    """
+    Books visits from several threads, each with its own committed
+    cursor, so the database constraints really race. The fixtures are
+    committed too and removed in the cleanup.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.registry = odoo.registry(get_db_name())
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            speciality = env['doctor.speciality'].create({
+                'name': 'Stress Test',
+                'code': 'STRESS',
+            })
+            doctors = env['hr.hospital.doctor'].create([{
+                'first_name': 'Stress',
+                'last_name': f'Doctor {index}',
+                'license_number': f'STRESS-{index}',
+                'specialty_id': speciality.id,
+            } for index in range(3)])
+            patients = env['hr.hospital.patient'].create([{
+                'first_name': 'Stress',
+                'last_name': f'Patient {index}',
+            } for index in range(40)])
+            self.speciality_id = speciality.id
+            self.doctor_ids = doctors.ids
+            self.patient_ids = patients.ids
+        self.addCleanup(self._remove_fixtures)
+
+    def _remove_fixtures(self):
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['hr.hospital.patient.visit'].search(
+                [('doctor_id', 'in', self.doctor_ids)]).unlink()
+            env['hr.hospital.patient'].browse(self.patient_ids).unlink()
+            env['hr.hospital.doctor'].browse(self.doctor_ids).unlink()
+            env['doctor.speciality'].browse(self.speciality_id).unlink()
+
+    def test_concurrent_bookings_never_overlap(self):
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            result = env['hr.hospital.benchmark'].run_booking_stress(
+                thread_count=8, attempts=30,
+                doctor_ids=self.doctor_ids, patient_ids=self.patient_ids)
+        self.assertEqual(result['conflicts'], 0)
+        # Кожна спроба або заброньована, або відхилена без падіння потоку
+        self.assertEqual(result['booked'] + result['rejected'],
+                         result['attempts'])
+        self.assertTrue(result['booked'])
+        self.assertTrue(result['rejected'])
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Tests of the incremental disease incidence."""
+
+from datetime import date, datetime
+
+from odoo.tests.common import tagged
+
+from .common import HospitalCase
+
+
+@tagged('post_install', '-at_install')
+class TestDiseaseIncidence(HospitalCase):
+    """Diagnosis changes add their deltas to the daily incidence."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.ukraine = cls.env.ref('base.ua')
+        cls.poland = cls.env.ref('base.pl')
+        cls.patient.country_id = cls.ukraine
+        cls.other_patient.country_id = cls.poland
+        cls.other_disease = cls.env['hr.hospital.disease'].create({
+            'name': 'Other Test Disease',
+        })
+        cls.visit = cls._create_visit(datetime(2024, 1, 10, 8, 0))
+        cls.other_visit = cls._create_visit(
+            datetime(2024, 1, 10, 10, 0), patient_id=cls.other_patient.id)
+        cls.day = date(2024, 1, 10)
+
+    def _diagnose(self, visit, count=1):
+        return self.env['medical.diagnosis'].create([{
+            'visit_id': visit.id,
+            'disease_id': self.disease.id,
+        } for _index in range(count)])
+
+    def _incidence(self):
+        """{(disease, country, date): cases} of the test diseases."""
+        rows = self.env['hr.hospital.disease.incidence'].search([
+            ('disease_id', 'in', (self.disease | self.other_disease).ids),
+            ('case_count', '!=', 0),
+        ])
+        return {(row.disease_id, row.country_id, row.date): row.case_count
+                for row in rows}
+
+    def _assert_rebuild_matches(self):
+        incremental = self._incidence()
+        self.env['hr.hospital.disease.incidence'].action_rebuild()
+        self.assertEqual(self._incidence(), incremental)
+
+    def test_cases_on_create(self):
+        self._diagnose(self.visit, count=2)
+        self._diagnose(self.other_visit)
+        self.assertEqual(self._incidence(), {
+            (self.disease, self.ukraine, self.day): 2,
+            (self.disease, self.poland, self.day): 1,
+        })
+        self._assert_rebuild_matches()
+
+    def test_cases_follow_diagnosis_changes(self):
+        first, second = self._diagnose(self.visit, count=2)
+        first.visit_id = self.other_visit
+        second.disease_id = self.other_disease
+        self.assertEqual(self._incidence(), {
+            (self.disease, self.poland, self.day): 1,
+            (self.other_disease, self.ukraine, self.day): 1,
+        })
+        self._assert_rebuild_matches()
+
+        (first | second).unlink()
+        self.assertEqual(self._incidence(), {})
+
+    def test_patient_without_country_not_counted(self):
+        self.patient.country_id = False
+        self._diagnose(self.visit)
+        self.assertEqual(self._incidence(), {})
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Tests of the incremental doctor rating from visit feedback."""
+
+from datetime import datetime
+
+from odoo.exceptions import ValidationError
+from odoo.tests.common import tagged
+
+from .common import HospitalCase
+
+
+@tagged('post_install', '-at_install')
+class TestDoctorRating(HospitalCase):
+    """Feedback scores move the doctors' running sums and ratings."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.visits = cls.env['hr.hospital.patient.visit']
+        for day in (10, 11, 12):
+            cls.visits |= cls._create_visit(datetime(2024, 1, day, 8, 0),
+                                            status='completed')
+        cls.other_visit = cls._create_visit(
+            datetime(2024, 1, 10, 8, 0), status='completed',
+            doctor_id=cls.other_doctor.id)
+
+    def _feedback(self, visit, score, feedback_date=None):
+        return self.env['hr.hospital.visit.feedback'].create({
+            'visit_id': visit.id,
+            'score': score,
+            'feedback_date': feedback_date or datetime(2024, 2, 1),
+        })
+
+    def test_rating_follows_feedback(self):
+        first = self._feedback(self.visits[0], 5)
+        second = self._feedback(self.visits[1], 2)
+        self.assertEqual(self.doctor.rating_count, 2)
+        self.assertAlmostEqual(self.doctor.rating, 3.5)
+
+        second.score = 4
+        self.assertAlmostEqual(self.doctor.rating, 4.5)
+        first.unlink()
+        self.assertEqual(self.doctor.rating_count, 1)
+        self.assertAlmostEqual(self.doctor.rating, 4.0)
+
+    def test_feedback_moves_with_visit(self):
+        feedback = self._feedback(self.visits[0], 5)
+        self._feedback(self.visits[1], 1)
+        feedback.visit_id = self.other_visit
+        self.assertEqual(feedback.doctor_id, self.other_doctor)
+        self.assertAlmostEqual(self.doctor.rating, 1.0)
+        self.assertAlmostEqual(self.other_doctor.rating, 5.0)
+
+    def test_feedback_needs_completed_visit(self):
+        planned = self._create_visit(datetime(2024, 1, 20, 8, 0))
+        with self.assertRaises(ValidationError):
+            self._feedback(planned, 5)
+
+    def test_decay_matches_recompute(self):
+        self.env['ir.config_parameter'].sudo().set_param(
+            'hr_hospital.rating_half_life_days', 30)
+        self._feedback(self.visits[0], 5, datetime(2024, 1, 1))
+        self._feedback(self.visits[1], 5, datetime(2024, 3, 1))
+        self._feedback(self.visits[2], 1, datetime(2024, 7, 1))
+        # Свіжа низька оцінка переважує дві старі високі
+        rating = self.doctor.rating
+        self.assertLess(rating, 2.0)
+
+        self.env['hr.hospital.doctor'].action_recompute_rating()
+        self.assertAlmostEqual(self.doctor.rating, rating)
+        self.assertEqual(self.doctor.rating_count, 3)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Tests of the doctor workload counters and least-loaded assignment."""
+
+from datetime import datetime
+
+from odoo.tests.common import tagged
+
+from .common import HospitalCase
+
+
+@tagged('post_install', '-at_install')
+class TestDoctorWorkload(HospitalCase):
+    """Patients go to the active non-intern doctors with the least load."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.patient.personal_doctor_id = cls.doctor
+        cls.other_patient.personal_doctor_id = cls.other_doctor
+
+    def _least_loaded(self, limit=1):
+        return self.env['hr.hospital.doctor']._find_least_loaded(
+            self.speciality.id, limit=limit)
+
+    def _new_doctor(self, **vals):
+        return self.env['hr.hospital.doctor'].create(dict({
+            'first_name': 'Test',
+            'last_name': 'New Doctor',
+            'license_number': 'TEST-NEW',
+            'specialty_id': self.speciality.id,
+        }, **vals))
+
+    def test_new_doctor_is_least_loaded(self):
+        doctor = self._new_doctor()
+        self.assertEqual(doctor.panel_size, 0)
+        self.assertEqual(doctor.upcoming_visit_count, 0)
+        self.assertEqual(self._least_loaded(), doctor)
+
+    def test_archived_and_interns_skipped(self):
+        archived = self._new_doctor()
+        archived.action_archive()
+        self._new_doctor(license_number='TEST-NEW-INTERN', is_intern=True,
+                         mentor_id=self.doctor.id)
+        self.assertEqual(self._least_loaded(limit=5),
+                         self.doctor | self.other_doctor)
+
+    def test_upcoming_visits_break_ties(self):
+        self._create_visit(datetime(2024, 1, 10, 8, 0))
+        self.assertEqual(self.doctor.upcoming_visit_count, 1)
+        self.assertEqual(self._least_loaded(), self.other_doctor)
+
+    def test_counters_follow_changes(self):
+        visit = self._create_visit(datetime(2024, 1, 10, 8, 0))
+        visit.doctor_id = self.other_doctor
+        self.assertEqual(self.doctor.upcoming_visit_count, 0)
+        self.assertEqual(self.other_doctor.upcoming_visit_count, 1)
+        visit.status = 'cancelled'
+        self.assertEqual(self.other_doctor.upcoming_visit_count, 0)
+
+        self.patient.personal_doctor_id = self.other_doctor
+        self.assertEqual(self.doctor.panel_size, 0)
+        self.assertEqual(self.other_doctor.panel_size, 2)
+        self.env['hr.hospital.doctor'].action_recompute_workload()
+        self.assertEqual(self.other_doctor.panel_size, 2)
+        self.assertEqual(self.other_doctor.upcoming_visit_count, 0)
+
+    def test_auto_assign_balances_panels(self):
+        new_doctor = self._new_doctor()
+        patients = self.env['hr.hospital.patient'].create([
+            {'first_name': 'Test', 'last_name': f'New Patient {index}'}
+            for index in range(4)])
+        patients.action_auto_assign_doctor(self.speciality.id)
+        self.assertEqual(new_doctor.panel_size, 2)
+        self.assertEqual(self.doctor.panel_size, 2)
+        self.assertEqual(self.other_doctor.panel_size, 2)
+        self.assertEqual(patients.personal_doctor_id,
+                         self.doctor | self.other_doctor | new_doctor)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Tests of the doctor record rules and their access columns."""
+
+from datetime import datetime
+
+from odoo.tests.common import new_test_user, tagged
+
+from .common import HospitalCase
+
+
+@tagged('post_install', '-at_install')
+class TestHospitalAccess(HospitalCase):
+    """Doctors see their own records and those of their interns."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        groups = 'base.group_user,hr_hospital.group_hospital_doctor'
+        cls.doctor_user, cls.mentor_user, cls.other_user = [
+            new_test_user(cls.env, login=f'hospital_{name}', groups=groups)
+            for name in ('doctor', 'mentor', 'other')]
+        cls.doctor.user_id = cls.doctor_user
+        cls.other_doctor.user_id = cls.mentor_user
+        cls.intern = cls.env['hr.hospital.doctor'].create({
+            'first_name': 'Test',
+            'last_name': 'Intern',
+            'license_number': 'TEST-INTERN',
+            'specialty_id': cls.speciality.id,
+            'is_intern': True,
+            'mentor_id': cls.other_doctor.id,
+        })
+        cls.patient.personal_doctor_id = cls.doctor
+        cls.visit = cls._create_visit(datetime(2024, 1, 10, 8, 0))
+        cls.diagnosis = cls.env['medical.diagnosis'].create({
+            'visit_id': cls.visit.id,
+            'disease_id': cls.disease.id,
+        })
+
+    def _visible(self, user, records):
+        """Returns the records the user can read under the rules."""
+        return records.with_user(user).search([('id', 'in', records.ids)])
+
+    def test_doctor_sees_own_records(self):
+        for records in (self.patient, self.visit, self.diagnosis):
+            self.assertEqual(self._visible(self.doctor_user, records),
+                             records)
+            self.assertFalse(self._visible(self.other_user, records))
+
+    def test_follows_doctor_user_change(self):
+        self.doctor.user_id = self.other_user
+        for records in (self.patient, self.visit, self.diagnosis):
+            self.assertEqual(records.doctor_user_id, self.other_user)
+            self.assertEqual(self._visible(self.other_user, records),
+                             records)
+            self.assertFalse(self._visible(self.doctor_user, records))
+
+    def test_follows_visit_doctor_change(self):
+        self.visit.doctor_id = self.other_doctor
+        self.assertEqual(self.diagnosis.doctor_user_id, self.mentor_user)
+        self.assertFalse(self._visible(self.doctor_user, self.diagnosis))
+
+    def test_mentor_sees_interns_records(self):
+        self.visit.doctor_id = self.intern
+        for records in (self.visit, self.diagnosis):
+            self.assertEqual(records.mentor_user_id, self.mentor_user)
+            self.assertEqual(self._visible(self.mentor_user, records),
+                             records)
+
+    def test_follows_mentor_change(self):
+        self.visit.doctor_id = self.intern
+        new_mentor = self.env['hr.hospital.doctor'].create({
+            'first_name': 'Test',
+            'last_name': 'Mentor',
+            'license_number': 'TEST-MENTOR',
+            'user_id': self.other_user.id,
+        })
+        self.intern.mentor_id = new_mentor
+        for records in (self.visit, self.diagnosis):
+            self.assertEqual(records.mentor_user_id, self.other_user)
+            self.assertFalse(self._visible(self.mentor_user, records))
+            self.assertEqual(self._visible(self.other_user, records),
+                             records)
+
+        # Лікар, що більше не інтерн, не має ментора в правилах
+        self.intern.is_intern = False
+        self.assertFalse(self.visit.mentor_user_id)
+        self.assertFalse(self._visible(self.other_user, self.visit))
+
+    def test_follows_changes_while_archived(self):
+        self.visit.status = 'completed'
+        self.diagnosis.is_approved = True
+        archive = self.env['hr.hospital.archive']
+        archive.action_archive_history(horizon_days=0)
+        self.assertFalse(self.visit.exists())
+
+        self.doctor.user_id = self.other_user
+        self.assertEqual(archive.action_restore_history(self.patient.ids), 1)
+        for records in (self.visit, self.diagnosis):
+            self.assertEqual(records.doctor_user_id, self.other_user)
+            self.assertEqual(self._visible(self.other_user, records),
+                             records)
+            self.assertFalse(self._visible(self.doctor_user, records))
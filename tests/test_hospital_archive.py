@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Tests of the hot/cold archival of closed visits."""
+
+from datetime import datetime
+
+from odoo import fields
+from odoo.tests.common import tagged
+
+from .common import HospitalCase
+
+
+@tagged('post_install', '-at_install')
+class TestHospitalArchive(HospitalCase):
+    """Closed visits move to the archive and back without losing data."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.archive = cls.env['hr.hospital.archive']
+        cls.allergen = cls.env['hr.hospital.allergen'].create({
+            'name': 'Test Archive Allergen',
+            'keywords': 'archicillin',
+        })
+        cls.patient.allergen_ids = cls.allergen
+        cls.visit = cls._create_visit(
+            datetime(2020, 1, 10, 8, 0), status='completed',
+            recommendations='<p>Rest</p>')
+        cls.diagnosis = cls.env['medical.diagnosis'].create({
+            'visit_id': cls.visit.id,
+            'disease_id': cls.disease.id,
+            'treatment': '<p>Archicillin</p>',
+            'is_approved': True,
+        })
+        cls.feedback = cls.env['hr.hospital.visit.feedback'].create({
+            'visit_id': cls.visit.id,
+            'score': 4,
+        })
+
+    def test_round_trip(self):
+        self.archive.action_archive_history(horizon_days=30)
+        self.assertFalse(self.visit.exists())
+        self.assertFalse(self.diagnosis.exists())
+        self.assertFalse(self.feedback.exists())
+
+        self.assertEqual(self.archive._count_archived_visits(
+            self.patient.ids), {self.patient.id: 1})
+        row, = self.archive._read_archived_visits(self.patient.id)
+        self.assertEqual(row['id'], self.visit.id)
+        self.assertEqual(row['recommendations'], '<p>Rest</p>')
+        self.assertEqual([diag['id'] for diag in row['diagnoses']],
+                         self.diagnosis.ids)
+
+        self.assertEqual(
+            self.archive.action_restore_history(self.patient.ids), 1)
+        self.assertEqual(self.visit.status, 'completed')
+        self.assertEqual(self.visit.recommendations, '<p>Rest</p>')
+        self.assertEqual(self.visit.diagnosis_ids, self.diagnosis)
+        self.assertEqual(self.visit.feedback_ids, self.feedback)
+        self.assertEqual(self.diagnosis.treatment, '<p>Archicillin</p>')
+        # Конфлікти алергій відновлено скринінгом
+        self.assertEqual(self.diagnosis.allergy_conflict_ids, self.allergen)
+        self.assertFalse(self.archive._count_archived_visits(
+            self.patient.ids))
+
+    def test_pending_diagnosis_keeps_visit(self):
+        self.diagnosis.is_approved = False
+        self.archive.action_archive_history(horizon_days=30)
+        self.assertTrue(self.visit.exists())
+
+    def test_recent_and_planned_visits_stay(self):
+        recent = self._create_visit(fields.Datetime.now(),
+                                   status='completed')
+        planned = self._create_visit(datetime(2020, 2, 10, 8, 0))
+        self.archive.action_archive_history(horizon_days=30)
+        self.assertFalse(self.visit.exists())
+        self.assertTrue(recent.exists())
+        self.assertTrue(planned.exists())
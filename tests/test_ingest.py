@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Tests of the NDJSON bulk ingestion of visits."""
+
+import json
+
+from odoo.tests.common import tagged
+
+from .common import HospitalCase
+
+
+@tagged('post_install', '-at_install')
+class TestIngest(HospitalCase):
+    """Maps every non-empty NDJSON line to its own result."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name, record in (('ingest_patient', cls.patient),
+                             ('ingest_doctor', cls.doctor)):
+            cls.env['ir.model.data'].create({
+                'module': 'hr_hospital_test',
+                'name': name,
+                'model': record._name,
+                'res_id': record.id,
+            })
+
+    def _row(self, key, visit_date, **values):
+        return json.dumps(dict({
+            'idempotency_key': key,
+            'patient': 'hr_hospital_test.ingest_patient',
+            'doctor': 'hr_hospital_test.ingest_doctor',
+            'visit_date': visit_date,
+        }, **values))
+
+    def test_line_result_mapping(self):
+        body = '\n'.join([
+            self._row('test-1', '2024-05-01 10:00:00', diagnoses=[
+                {'icd10': 'Z99.TEST', 'severity': 'high'}]),
+            '',
+            '{not json',
+            self._row('test-2', '2024-05-02 10:00:00',
+                      patient='hr_hospital_test.missing'),
+            '   ',
+            self._row('test-3', '2024-05-03 10:00:00',
+                      doctor=None, doctor_license='TEST-0'),
+        ])
+        results = self.env['hr.hospital.ingest'].ingest_ndjson(body)
+
+        # Порожні рядки пропущено, номери рядків збережено
+        self.assertEqual([result['line'] for result in results], [1, 3, 4, 6])
+        self.assertEqual([result['status'] for result in results],
+                         ['created', 'error', 'error', 'created'])
+        self.assertIn('Unknown patient', results[2]['error'])
+
+        visit = self.env['hr.hospital.patient.visit'].browse(
+            results[0]['visit_id'])
+        self.assertEqual(visit.patient_id, self.patient)
+        self.assertEqual(visit.ingest_key, 'test-1')
+        self.assertEqual(visit.diagnosis_ids.ids, results[0]['diagnosis_ids'])
+        self.assertEqual(visit.diagnosis_ids.severity, 'high')
+        self.assertEqual(
+            self.env['hr.hospital.patient.visit'].browse(
+                results[3]['visit_id']).doctor_id, self.doctor)
+
+    def test_retry_is_duplicate(self):
+        body = self._row('test-retry', '2024-05-01 10:00:00')
+        ingest = self.env['hr.hospital.ingest']
+        first, = ingest.ingest_ndjson(body)
+        retry, = ingest.ingest_ndjson('\n' + body)
+        self.assertEqual(first['status'], 'created')
+        self.assertEqual(retry, {'status': 'duplicate', 'line': 2,
+                                 'visit_id': first['visit_id']})
+
+    def test_duplicate_day_in_payload(self):
+        body = '\n'.join([self._row('test-a', '2024-05-01 09:00:00'),
+                          self._row('test-b', '2024-05-01 15:00:00')])
+        results = self.env['hr.hospital.ingest'].ingest_ndjson(body)
+        self.assertEqual([result['status'] for result in results],
+                         ['created', 'error'])
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Tests of the visit double-booking constraints."""
+
+from datetime import date, datetime
+
+import psycopg2
+
+from odoo.exceptions import ValidationError
+from odoo.tests.common import tagged
+from odoo.tools import mute_logger
+
+from .common import HospitalCase
+
+
+@tagged('post_install', '-at_install')
+class TestVisitConstraints(HospitalCase):
+    """One visit per patient, doctor and clinic day; no doctor overlap."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Київ узимку: UTC+2
+        cls.env.company.partner_id.tz = 'Europe/Kiev'
+
+    def test_visit_day_in_clinic_timezone(self):
+        visit = self._create_visit(datetime(2024, 1, 10, 23, 30))
+        self.assertEqual(visit.visit_day, date(2024, 1, 11))
+
+    def test_same_clinic_day_rejected(self):
+        # 01:30 та 10:00 за Києвом, хоча дати UTC різні
+        self._create_visit(datetime(2024, 1, 10, 23, 30))
+        with self.assertRaises(ValidationError):
+            self._create_visit(datetime(2024, 1, 11, 8, 0))
+
+    def test_other_clinic_day_allowed(self):
+        # 23:00 10-го та 01:30 11-го за Києвом, одна дата UTC
+        self._create_visit(datetime(2024, 1, 10, 21, 0))
+        visit = self._create_visit(datetime(2024, 1, 10, 23, 30))
+        self.assertEqual(visit.visit_day, date(2024, 1, 11))
+
+    def test_cancelled_visit_frees_the_day(self):
+        first = self._create_visit(datetime(2024, 1, 10, 8, 0))
+        first.status = 'cancelled'
+        self._create_visit(datetime(2024, 1, 10, 12, 0))
+
+    def test_database_rejects_same_day(self):
+        self._create_visit(datetime(2024, 1, 10, 8, 0))
+        other = self._create_visit(datetime(2024, 1, 12, 8, 0))
+        # Обмеження бази ловить те, що обійшло перевірку Python
+        with self.assertRaises(psycopg2.IntegrityError), \
+                mute_logger('odoo.sql_db'):
+            self.env.cr.execute("""
+                UPDATE hr_hospital_patient_visit SET visit_day = %s
+                 WHERE id = %s
+            """, [date(2024, 1, 10), other.id])
+
+    def test_doctor_slot_overlap_rejected(self):
+        self._create_visit(datetime(2024, 1, 10, 8, 0), duration=60)
+        with self.assertRaises(psycopg2.IntegrityError), \
+                mute_logger('odoo.sql_db'):
+            self._create_visit(datetime(2024, 1, 10, 8, 30),
+                               patient_id=self.other_patient.id)
+            self.env.flush_all()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Tests of the slot search of the reschedule wizard."""
+
+from datetime import datetime, time, timedelta
+
+from odoo import fields
+from odoo.tests.common import tagged
+
+from .common import HospitalCase
+
+
+@tagged('post_install', '-at_install')
+class TestRescheduleVisitWizard(HospitalCase):
+    """Picks slots on clinic days free for the patient and the doctor."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Користувач працює в UTC, клініка — за Києвом (UTC+2/+3)
+        cls.env.user.tz = 'UTC'
+        cls.env.company.partner_id.tz = 'Europe/Kiev'
+        cls.first_day = fields.Date.context_today(cls.env.user) + \
+            timedelta(days=1)
+        # 22:00 UTC — це вже наступний день за Києвом
+        cls.env['doctor.schedule.rule'].create({
+            'doctor_id': cls.doctor.id,
+            'date_from': cls.first_day,
+            'day_sat': True,
+            'day_sun': True,
+            'start_time': 22.0,
+            'end_time': 23.0,
+        })
+
+    def test_slot_skips_busy_clinic_day(self):
+        second_day = self.first_day + timedelta(days=1)
+        # Уже є візит пацієнта до лікаря в день клініки, на який
+        # припадає перший слот розкладу
+        self._create_visit(datetime.combine(second_day, time(10)))
+        visit = self._create_visit(
+            datetime.combine(self.first_day + timedelta(days=30), time(10)))
+        wizard = self.env['reschedule.visit.wizard'].create({
+            'visit_ids': [(6, 0, visit.ids)],
+            'reschedule_reason': 'Test',
+        })
+        action = wizard.action_reschedule()
+
+        new_visit = self.env['hr.hospital.patient.visit'].search(
+            action['domain'])
+        self.assertEqual(new_visit.visit_date,
+                         datetime.combine(second_day, time(22)))
+        self.assertEqual(new_visit.visit_day, second_day + timedelta(days=1))
+        self.assertEqual(visit.status, 'cancelled')
@@ -6,3 +6,4 @@ from . import disease_report_wizard
 from . import reschedule_visit_wizard
 from . import doctor_schedule_wizard
 from . import patient_card_export_wizard
+from . import doctor_archive_wizard
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 """Defines the Disease Report Wizard."""
 
+import base64
+import csv
+import io
+from collections import Counter
+
 from odoo import models, fields, api, _
 
+from ..models.hospital_profiler import profiled
+
 
 class DiseaseReportWizard(models.TransientModel):
     """Wizard for generating a filtered list of diagnoses."""
     _name = 'disease.report.wizard'
+    _inherit = ['hr.hospital.background.mixin']
     _description = 'Disease Report Wizard'
 
     @api.model
@@ -37,13 +45,12 @@ class DiseaseReportWizard(models.TransientModel):
         ]
     )
 
-    def action_generate_report(self):
-        """
-        Повертає список діагнозів за критеріями.
-        'action', який відкриє відфільтрований список діагнозів.
-        """
-        self.ensure_one()
+    file_name = fields.Char()
+    file_data = fields.Binary(readonly=True)
 
+    def _get_report_domain(self):
+        """Domain on medical.diagnosis built from the wizard filters."""
+        self.ensure_one()
         domain = [
             ('visit_id.visit_date', '>=', self.date_start),
             ('visit_id.visit_date', '<=', self.date_end),
@@ -55,6 +62,19 @@ class DiseaseReportWizard(models.TransientModel):
         if self.country_ids:
             domain.append(('visit_id.patient_id.country_id', 'in',
                            self.country_ids.ids))
+        return domain
+
+    @profiled('disease_report_wizard.action_generate_report')
+    def action_generate_report(self):
+        """
+        Повертає список діагнозів за критеріями.
+        'action', який відкриє відфільтрований список діагнозів.
+        """
+        self.ensure_one()
+        if self.run_in_background:
+            return self._run_in_background('action_export_report_file')
+
+        domain = self._get_report_domain()
 
         action_context = {
             'group_by': 'disease_id',
@@ -70,3 +90,56 @@ class DiseaseReportWizard(models.TransientModel):
             'context': action_context,
             'target': 'current',
         }
+
+    def action_export_report_file(self):
+        """Writes the report into a CSV file ('file_data'/'file_name')."""
+        self.ensure_one()
+        diagnosis_env = self.env['medical.diagnosis']
+        domain = self._get_report_domain()
+        output = io.StringIO()
+        writer = csv.writer(output)
+
+        disease_env = self.env['hr.hospital.disease']
+        if self.report_type == 'summary':
+            diagnoses = diagnosis_env.search(domain)
+            # Кожна хвороба перекладається один раз на весь звіт
+            names = disease_env.get_translated_names(diagnoses.disease_id.ids)
+            group_key = {
+                'doctor': lambda d: d.visit_id.doctor_id.display_name,
+                'month': lambda d: d.visit_date and
+                d.visit_date.strftime('%Y-%m'),
+                'country': lambda d: d.visit_id.patient_id.country_id.name,
+            }.get(self.group_by, lambda d: names.get(d.disease_id.id))
+            counts = Counter(
+                group_key(diag) or _('Undefined') for diag in diagnoses)
+            writer.writerow(['Group', 'Count'])
+            for key, count in sorted(counts.items()):
+                writer.writerow([key, count])
+        else:
+            writer.writerow(['VisitDate', 'Disease', 'Severity',
+                             'Approved'])
+            rows = diagnosis_env.search_read(
+                domain, ['visit_date', 'disease_id', 'severity',
+                         'is_approved'], load=None)
+            names = disease_env.get_translated_names(
+                {row['disease_id'] for row in rows})
+            for row in rows:
+                writer.writerow([
+                    row['visit_date'],
+                    names.get(row['disease_id'], ''),
+                    row['severity'],
+                    row['is_approved'],
+                ])
+
+        self.write({
+            'file_data': base64.b64encode(output.getvalue().encode('utf-8')),
+            'file_name': f"disease_report_{self.date_start}_"
+                         f"{self.date_end}.csv",
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'view_mode': 'form',
+            'res_id': self.id,
+            'target': 'new',
+        }
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Defines the Doctor Archive Wizard."""
+
+from odoo import models, fields, api
+
+from ..models.hospital_profiler import profiled
+
+
+class DoctorArchiveWizard(models.TransientModel):
+    """Wizard for archiving doctors and handing their visits to another."""
+    _name = 'doctor.archive.wizard'
+    _description = 'Doctor Archive Wizard'
+
+    doctor_ids = fields.Many2many(
+        comodel_name='hr.hospital.doctor',
+        default=lambda self: self.env.context.get('active_ids')
+    )
+    replacement_doctor_id = fields.Many2one(
+        comodel_name='hr.hospital.doctor',
+        string='Replacement Doctor',
+        required=True,
+        domain="[('id', 'not in', doctor_ids)]"
+    )
+    blocking_doctor_ids = fields.Many2many(
+        comodel_name='hr.hospital.doctor',
+        relation='doctor_archive_wizard_blocking_rel',
+        compute='_compute_blocking_doctor_ids',
+        string='Doctors with Planned Visits'
+    )
+
+    @api.depends('doctor_ids')
+    def _compute_blocking_doctor_ids(self):
+        """Shows which doctors block a plain archive."""
+        for wizard in self:
+            wizard.blocking_doctor_ids = \
+                wizard.doctor_ids._get_doctors_with_planned_visits()
+
+    @profiled('doctor_archive_wizard.action_archive_and_reassign')
+    def action_archive_and_reassign(self):
+        """Reassigns planned visits and archives the doctors."""
+        self.ensure_one()
+        self.doctor_ids.action_archive_and_reassign(
+            self.replacement_doctor_id)
+        return {'type': 'ir.actions.act_window_close'}
@@ -5,10 +5,13 @@ from datetime import timedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 
+from ..models.hospital_profiler import profiled
+
 
 class DoctorScheduleWizard(models.TransientModel):
     """Wizard for mass-generating doctor schedule slots."""
     _name = 'doctor.schedule.wizard'
+    _inherit = ['hr.hospital.background.mixin']
     _description = 'Doctor Schedule Wizard'
 
     doctor_id = fields.Many2one('hr.hospital.doctor', required=True,
@@ -53,70 +56,31 @@ class DoctorScheduleWizard(models.TransientModel):
                         record.break_end_time < record.end_time):
                     raise UserError(_("Break time must be within working hours."))
 
+    @profiled('doctor_schedule_wizard.action_generate_schedule')
     def action_generate_schedule(self):
-        """Generates schedule slots based on wizard parameters."""
+        """
+        Stores the wizard parameters as one recurring schedule rule;
+        the days are expanded on read instead of being materialised.
+        """
         self.ensure_one()
-        schedule_env = self.env['doctor.schedule']
-        days_to_generate = [
-            self.day_mon, self.day_tue, self.day_wed,
-            self.day_thu, self.day_fri, self.day_sat, self.day_sun
-        ]
-
-        # Пакетне створення
-        schedule_vals_list = []
-
-        for week in range(self.week_count):
-            current_week_date = self.week_start_date + timedelta(days=week * 7)
-
-            # ISO
-            week_number = current_week_date.isocalendar()[1]
-            is_even_week = week_number % 2 == 0
-
-            # Логіка парності/непарності
-            if self.schedule_type == 'even' and not is_even_week:
-                continue
-            if self.schedule_type == 'odd' and is_even_week:
-                continue
-
-            # Якщо 'standard', або парність/непарність збігається:
-            for day_index, is_work_day in enumerate(days_to_generate):
-                if not is_work_day:
-                    continue
-
-                current_date = self.week_start_date + \
-                               timedelta(days=(week * 7) + day_index)
-
-                day_of_week_str = str(current_date.isoweekday())  # 1=Пн, 7=Нд
-
-                # Базовий слот
-                base_slot = {
-                    'doctor_id': self.doctor_id.id,
-                    'date': current_date,
-                    'day_of_week': day_of_week_str,
-                    'schedule_type': 'work',
-                }
-
-                if self.break_start_time and self.break_end_time:
-                    # 2 слоти: до і після перерви
-                    schedule_vals_list.append({
-                        **base_slot,
-                        'start_time': self.start_time,
-                        'end_time': self.break_start_time,
-                    })
-                    schedule_vals_list.append({
-                        **base_slot,
-                        'start_time': self.break_end_time,
-                        'end_time': self.end_time,
-                    })
-                else:
-                    # 1 слот (без перерви)
-                    schedule_vals_list.append({
-                        **base_slot,
-                        'start_time': self.start_time,
-                        'end_time': self.end_time,
-                    })
-
-        if schedule_vals_list:
-            schedule_env.create(schedule_vals_list)
-
+        if self.run_in_background:
+            return self._run_in_background('action_generate_schedule')
+        self.env['doctor.schedule.rule'].create({
+            'doctor_id': self.doctor_id.id,
+            'date_from': self.week_start_date,
+            'date_to': self.week_start_date +
+            timedelta(days=self.week_count * 7 - 1),
+            'week_parity': self.schedule_type,
+            'day_mon': self.day_mon,
+            'day_tue': self.day_tue,
+            'day_wed': self.day_wed,
+            'day_thu': self.day_thu,
+            'day_fri': self.day_fri,
+            'day_sat': self.day_sat,
+            'day_sun': self.day_sun,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'break_start_time': self.break_start_time,
+            'break_end_time': self.break_end_time,
+        })
         return {'type': 'ir.actions.act_window_close'}
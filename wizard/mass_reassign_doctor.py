@@ -1,16 +1,34 @@
 # -*- coding: utf-8 -*-
 """Defines the Mass Reassign Doctor Wizard."""
 
-from odoo import models, fields, api
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+from ..models.hospital_profiler import profiled
 
 
 class MassReassignDoctor(models.TransientModel):
     """Wizard for mass re-assignment of patients to a new doctor."""
     _name = 'mass.reassign.doctor.wizard'
+    _inherit = ['hr.hospital.background.mixin']
     _description = 'Mass Reassign Doctor Wizard'
 
     old_doctor_id = fields.Many2one('hr.hospital.doctor')
-    new_doctor_id = fields.Many2one('hr.hospital.doctor', required=True)
+    distribution = fields.Selection(
+        selection=[
+            ('single', 'Одному лікарю'),
+            ('balanced', 'Рівномірно між лікарями'),
+        ],
+        default='single', required=True
+    )
+    new_doctor_id = fields.Many2one('hr.hospital.doctor')
+    new_doctor_ids = fields.Many2many(
+        comodel_name='hr.hospital.doctor',
+        relation='mass_reassign_doctor_wizard_target_rel',
+        string='New Doctors',
+        domain="[('is_intern', '=', False), ('id', '!=', old_doctor_id)]",
+        help="Порожньо: всі лікарі спеціальності старого лікаря."
+    )
     patient_ids = fields.Many2many(
         comodel_name='hr.hospital.patient',
         # Динамічний домен на пацієнтів старого лікаря
@@ -36,12 +54,32 @@ class MassReassignDoctor(models.TransientModel):
             }
         }
 
+    @profiled('mass_reassign_doctor.action_reassign')
     def action_reassign(self):
         """Performs the mass re-assignment."""
         self.ensure_one()
+        if self.run_in_background:
+            return self._run_in_background('action_reassign',
+                                           chunk_field='patient_ids')
+
+        if self.distribution == 'single':
+            if not self.new_doctor_id:
+                raise UserError(_("Select the new doctor."))
+            self.patient_ids.write({
+                'personal_doctor_id': self.new_doctor_id.id
+            })
+            return {'type': 'ir.actions.act_window_close'}
 
-        self.patient_ids.write({
-            'personal_doctor_id': self.new_doctor_id.id
-        })
+        doctor_env = self.env['hr.hospital.doctor']
+        targets = self.new_doctor_ids or doctor_env._find_least_loaded(
+            self.old_doctor_id.specialty_id.id,
+            exclude_ids=self.old_doctor_id.ids,
+            limit=max(len(self.patient_ids), 1))
+        targets -= self.old_doctor_id
+        if not targets:
+            raise UserError(_("No doctors available to take the patients."))
+        for doctor, patients in \
+                targets._distribute_patients(self.patient_ids).items():
+            patients.write({'personal_doctor_id': doctor.id})
 
         return {'type': 'ir.actions.act_window_close'}
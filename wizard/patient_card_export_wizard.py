@@ -9,10 +9,13 @@ import io
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 
+from ..models.hospital_profiler import profiled
+
 
 class PatientCardExportWizard(models.TransientModel):
     """Wizard for exporting a patient's medical card."""
     _name = 'patient.card_export_wizard'
+    _inherit = ['hr.hospital.background.mixin']
     _description = 'Patient Card Export Wizard'
 
     patient_id = fields.Many2one('hr.hospital.patient', required=True)
@@ -58,6 +61,10 @@ class PatientCardExportWizard(models.TransientModel):
             'visits': []
         }
 
+        # Назви хвороб мовою картки, кожна назва - один раз
+        lang = self.language_id.code
+        disease_names = self.env['hr.hospital.disease'].get_translated_names(
+            visits.diagnosis_ids.disease_id.ids, lang)
         for visit in visits:
             visit_data = {
                 'visit_info': visit.read(
@@ -67,8 +74,12 @@ class PatientCardExportWizard(models.TransientModel):
             }
             if self.include_diagnoses:
                 diag_data = visit.diagnosis_ids.read(
-                    ['disease_id', 'description', 'treatment', 'severity']
+                    ['disease_id', 'description', 'treatment', 'severity'],
+                    load=None
                 )
+                for diag in diag_data:
+                    diag['disease_id'] = diag['disease_id'] and (
+                        diag['disease_id'], disease_names[diag['disease_id']])
                 visit_data['diagnoses'] = diag_data
 
             if self.include_recommendations:
@@ -76,13 +87,32 @@ class PatientCardExportWizard(models.TransientModel):
 
             export_data['visits'].append(visit_data)
 
+        # Архівні візити читаються з холодних таблиць
+        for row in self.env['hr.hospital.archive']._read_archived_visits(
+                self.patient_id.id, self.date_start, self.date_end, lang):
+            visit_data = {
+                'visit_info': {
+                    key: row[key] for key in ('id', 'visit_date', 'status',
+                                              'cost', 'actual_visit_date')
+                },
+                'doctor': row['doctor'],
+            }
+            if self.include_diagnoses:
+                visit_data['diagnoses'] = row['diagnoses']
+            if self.include_recommendations:
+                visit_data['recommendations'] = row['recommendations']
+            export_data['visits'].append(visit_data)
+
         return export_data
 
+    @profiled('patient_card_export_wizard.action_export_card')
     def action_export_card(self):
         """
         'file_data' and 'file_name'.
         """
         self.ensure_one()
+        if self.run_in_background:
+            return self._run_in_background('action_export_card')
         export_data = self._prepare_export_data()
 
         file_content = False
@@ -1,42 +1,177 @@
 # -*- coding: utf-8 -*-
 """Defines the Reschedule Visit Wizard."""
 
-from odoo import models, fields
+from datetime import datetime, time, timedelta
+
+import pytz
+
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+
+from ..models.hospital_profiler import profiled
+
+SLOT_SEARCH_DAYS = 60
 
 
 class RescheduleVisitWizard(models.TransientModel):
-    """Wizard for rescheduling an existing patient visit."""
+    """Wizard for rescheduling one or more planned patient visits."""
     _name = 'reschedule.visit.wizard'
     _description = 'Reschedule Visit Wizard'
 
-    visit_id = fields.Many2one(
+    visit_ids = fields.Many2many(
         comodel_name='hr.hospital.patient.visit',
         readonly=True,
-        default=lambda self: self.env.context.get('active_id')
+        default=lambda self: self.env.context.get('active_ids')
     )
     new_doctor_id = fields.Many2one('hr.hospital.doctor')
-    new_date = fields.Datetime(required=True)
+    new_date = fields.Datetime(
+        help="Залиште порожнім, щоб автоматично підібрати слоти "
+             "з розкладу лікаря."
+    )
+    slot_duration = fields.Integer(
+        string='Slot Duration (min)',
+        default=30,
+        required=True
+    )
     reschedule_reason = fields.Text(required=True)
 
+    def _get_local_tz(self):
+        return pytz.timezone(self.env.user.tz or 'UTC')
+
+    def _get_work_intervals(self, doctor_ids, date_from, date_to):
+        """
+        Returns {(doctor_id, date): [(start_time, end_time), ...]} built
+        from the schedule rules and overrides, skipping absences.
+        """
+        return self.env['doctor.schedule.rule'].get_work_intervals(
+            doctor_ids, date_from, date_to)
+
+    def _assign_slots(self, visits):
+        """Picks a free schedule slot for every visit, in date order."""
+        tz = self._get_local_tz()
+        date_from = fields.Date.context_today(self) + timedelta(days=1)
+        date_to = date_from + timedelta(days=SLOT_SEARCH_DAYS)
+        doctor_ids = list({
+            (self.new_doctor_id or visit.doctor_id).id for visit in visits
+        })
+        intervals = self._get_work_intervals(doctor_ids, date_from, date_to)
+        doctor_days = {}
+        for (doctor_id, day), day_slots in sorted(intervals.items(),
+                                                  key=lambda i: i[0][1]):
+            doctor_days.setdefault(doctor_id, []).append((day, day_slots))
+
+        # Зайняті інтервали лікарів та пари пацієнт/лікар/день клініки,
+        # той самий день, що перевіряє обмеження patient_doctor_day_uniq
+        visit_env = self.env['hr.hospital.patient.visit']
+        busy = {}
+        patient_days = set()
+        existing = visit_env.search_read([
+            ('doctor_id', 'in', doctor_ids),
+            ('status', 'in', ['planned', 'completed']),
+            ('visit_date', '>=', fields.Datetime.to_datetime(date_from)),
+            ('id', 'not in', visits.ids),
+        ], ['doctor_id', 'patient_id', 'visit_day', 'visit_date',
+            'duration'])
+        for row in existing:
+            busy.setdefault(row['doctor_id'][0], []).append((
+                row['visit_date'],
+                row['visit_date'] + timedelta(minutes=row['duration'])))
+            patient_days.add(
+                (row['patient_id'][0], row['doctor_id'][0], row['visit_day']))
+
+        step = timedelta(minutes=self.slot_duration)
+        result = {}
+        for visit in visits.sorted('visit_date'):
+            doctor_id = (self.new_doctor_id or visit.doctor_id).id
+            doctor_busy = busy.setdefault(doctor_id, [])
+            length = timedelta(minutes=visit.duration)
+            slot = self._find_free_slot(
+                doctor_id, visit.patient_id.id,
+                doctor_days.get(doctor_id, []), doctor_busy,
+                patient_days, step, length, tz, visit_env._visit_day_of)
+            if not slot:
+                raise UserError(_(
+                    "No free schedule slot found for %s in the next %s days.",
+                    visit.display_name, SLOT_SEARCH_DAYS))
+            doctor_busy.append((slot, slot + length))
+            result[visit.id] = slot
+        return result
+
+    @staticmethod
+    def _find_free_slot(doctor_id, patient_id, days, busy,
+                        patient_days, step, length, tz, visit_day_of):
+        """
+        Returns the first UTC slot start where a visit of the given length
+        overlaps none of the doctor's busy intervals and the patient has
+        no other visit with the doctor on the slot's clinic day, or False.
+        """
+        for day, day_slots in days:
+            for start_time, end_time in day_slots:
+                local_start = tz.localize(datetime.combine(day, time()) +
+                                          timedelta(hours=start_time))
+                local_end = tz.localize(datetime.combine(day, time()) +
+                                        timedelta(hours=end_time))
+                current = local_start
+                while current + length <= local_end:
+                    slot = current.astimezone(pytz.utc).replace(tzinfo=None)
+                    day_key = (patient_id, doctor_id, visit_day_of(slot))
+                    if day_key not in patient_days and \
+                            not any(start < slot + length and slot < end
+                                    for start, end in busy):
+                        patient_days.add(day_key)
+                        return slot
+                    current += step
+        return False
+
+    @profiled('reschedule_visit_wizard.action_reschedule')
     def action_reschedule(self):
-        """Reschedules the visit."""
+        """Reschedules the visits: one create for new, one write for old."""
         self.ensure_one()
-        visit = self.visit_id
-
-        # До скасування, щоб 'copy()' не скопіювала статус 'cancelled'
-        new_visit = visit.copy({
-            'visit_date': self.new_date,
-            'doctor_id': self.new_doctor_id.id or visit.doctor_id.id,
-            'status': 'planned',
-            'actual_visit_date': False,
-            'recommendations': f"<p>Перенесено з візиту: {visit.id}</p>"
-        })
+        visits = self.visit_ids.filtered(lambda v: v.status == 'planned')
+        if not visits:
+            raise UserError(_("Only planned visits can be rescheduled."))
 
-        visit.write({
+        if self.new_date:
+            doctors = [(self.new_doctor_id or visit.doctor_id).id
+                       for visit in visits]
+            if len(doctors) != len(set(doctors)):
+                raise UserError(_(
+                    "Several visits of one doctor cannot be moved to the "
+                    "same date. Leave the date empty to pick free slots "
+                    "from the doctor's schedule."))
+            new_dates = {visit.id: self.new_date for visit in visits}
+        else:
+            new_dates = self._assign_slots(visits)
+
+        # Спершу звільняємо старі слоти, щоб обмеження БД їх не враховували
+        visits.write({
             'status': 'cancelled',
-            'recommendations': (visit.recommendations or '') +
-                               f"<p>Перенесено на візит {new_visit.id}: "
-                               f"{self.reschedule_reason}</p>"
+            'reschedule_reason': self.reschedule_reason,
         })
 
-        return {'type': 'ir.actions.act_window_close'}
+        vals_list = []
+        for visit in visits:
+            doctor = self.new_doctor_id or visit.doctor_id
+            vals_list.append({
+                'patient_id': visit.patient_id.id,
+                'doctor_id': doctor.id,
+                # Ментор заповнюється лише onchange, тож передаємо явно
+                'mentor_id': doctor.mentor_id.id if doctor.is_intern
+                else False,
+                'visit_date': new_dates[visit.id],
+                'duration': visit.duration,
+                'visit_type': visit.visit_type,
+                'currency_id': visit.currency_id.id,
+                'cost': visit.cost,
+                'recommendations': visit.recommendations,
+                'origin_visit_id': visit.id,
+            })
+        new_visits = self.env['hr.hospital.patient.visit'].create(vals_list)
+
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Rescheduled Visits'),
+            'res_model': 'hr.hospital.patient.visit',
+            'view_mode': 'tree,form',
+            'domain': [('id', 'in', new_visits.ids)],
+        }